@@ -0,0 +1 @@
+# The tests import data_engineering from the root of the repository, where pytest finds this file
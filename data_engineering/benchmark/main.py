@@ -0,0 +1,380 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for benchmarking the transform functions and the SQLite load
+path on synthetic PRTR data at several scales (e.g., 1x, 10x and 100x the facilities in
+config.yaml). Each scale runs in a sandbox (a copy of the data_engineering and ancillary folders),
+so the files of the pipeline are not touched, and each benchmark runs in its own process, so its
+peak memory is not mixed with the one of the other benchmarks. The SRS lookups are answered from
+the registry of the synthetic data, so only the transform work is timed.
+'''
+
+# Importing libraries
+from data_engineering.benchmark.synthetic_prtr import calling_settings, generating_prtr_data, \
+    calling_registry, offline_srs
+from data_engineering.transform.npi_transformer import transforming_npi
+from data_engineering.transform.npri_transformer import transforming_npri
+from data_engineering.transform.tri_transformer import transforming_tri
+from data_engineering.transform.naics_normalization import normalizing_naics
+from data_engineering.transform.chemical_standardizing import normalizing_chemicals
+from data_engineering.transform.industry_sector_standardizing import normalizing_sectors
+from data_engineering.transform.database_normalization import database_normalization
+from data_engineering.load.main import load_pipeline, adding_load_arguments
+from data_engineering.transform.common import config
+from data_engineering.transform.storage import reading_table
+from data_engineering.monitoring import enabling_monitoring, monitoring, stage_reports, peak_rss_mb
+import data_engineering.transform.tri_transformer as tri_transformer
+import data_engineering.transform.chemical_standardizing as chemical_standardizing
+
+from datetime import datetime
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import tempfile
+import platform
+import statistics
+import hashlib
+import subprocess
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+logging.basicConfig(level=logging.INFO)
+
+logger = logging.getLogger(' Data engineering --> Benchmark')
+
+dir_path = os.path.dirname(os.path.realpath(__file__)) # current directory path
+package_path = f'{dir_path}/..' # data_engineering folder path
+
+
+def reading_raw_sectors():
+    '''
+    Function to read the NAICS codes of the raw TRI 3a files (the input of normalizing_naics)
+    '''
+
+    df = pd.concat([pd.read_csv(path, usecols=['PRIMARY NAICS CODE'])
+                    for path in sorted(glob.glob(f'{package_path}/extract/output/US_3a_*.csv'))],
+                   ignore_index=True)
+    df.rename(columns={'PRIMARY NAICS CODE': 'national_sector_code'}, inplace=True)
+
+    return df
+
+
+def loading_sqlite():
+    '''
+    Function to load the normalized tables into a SQLite database with the bulk load
+    '''
+
+    # The other options of the load stage keep their defaults
+    parser = argparse.ArgumentParser()
+    adding_load_arguments(parser)
+    args = parser.parse_args(['--rdbms', 'sqlite',
+                              '--db_name', 'PRTR_transfers_benchmark',
+                              '--load_method', 'bulk'])
+    load_pipeline(args)
+
+
+# Tables of the normalized database
+db_tables = list(config(f'{package_path}/../ancillary/database_tables.yaml')['table'].keys())
+
+# Benchmarks in order of execution (each one uses the outputs of the previous ones).
+# setup prepares the input of the function, which is not timed, and outputs are the
+# tables (in transform/output) whose content is hashed (the returned table if None)
+benchmarks = {
+    'transforming_npi': {'function': lambda data: transforming_npi(),
+                         'outputs': ['npi']},
+    'transforming_npri': {'function': lambda data: transforming_npri(),
+                          'outputs': ['npri']},
+    'transforming_tri': {'function': lambda data: transforming_tri(),
+                         'outputs': ['tri']},
+    'normalizing_naics': {'setup': reading_raw_sectors,
+                          'function': lambda data: normalizing_naics(data),
+                          'outputs': None},
+    'normalizing_chemicals': {'function': lambda data: normalizing_chemicals(),
+                              'outputs': ['national_to_generic_substance']},
+    'normalizing_sectors': {'function': lambda data: normalizing_sectors(),
+                            'outputs': ['national_to_generic_sector']},
+    'database_normalization': {'function': lambda data: database_normalization(),
+                               'outputs': db_tables},
+    'loading_sqlite': {'function': lambda data: loading_sqlite(),
+                       'outputs': []}
+    }
+
+
+def content_hash(df, float_decimals=6):
+    '''
+    Function to hash the content of a table: its columns, dtypes and rows, whatever
+    the order of the rows and columns. The floats are rounded, so the last bits of
+    a sum do not count as a change
+    '''
+
+    df = df[sorted(df.columns)].copy()
+    for col in df.select_dtypes(include='floating').columns:
+        df[col] = df[col].round(float_decimals)
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps([(col, str(dtype)) for col, dtype in df.dtypes.items()]).encode())
+    rows = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    digest.update(np.sort(rows).tobytes())
+
+    return digest.hexdigest()
+
+
+def running_benchmark(name, trace_memory=False):
+    '''
+    Function to run a benchmark in this process (inside the sandbox) and get its measures
+    '''
+
+    # The SRS lookups are answered from the registry of the synthetic data
+    registry = calling_registry(f'{package_path}/extract/output')
+    get_cas_by_alternative_id, get_generic_names_by_cas = offline_srs(registry)
+    tri_transformer.get_cas_by_alternative_id = get_cas_by_alternative_id
+    chemical_standardizing.get_generic_names_by_cas = get_generic_names_by_cas
+
+    benchmark = benchmarks[name]
+    data = benchmark['setup']() if 'setup' in benchmark.keys() else None
+
+    # Memory of the process before the benchmark (libraries and input)
+    baseline_rss_mb = peak_rss_mb()
+    enabling_monitoring(trace_memory=trace_memory)
+    with monitoring(name):
+        result = benchmark['function'](data)
+    measures = stage_reports()[0]
+    measures['baseline_rss_mb'] = baseline_rss_mb
+    # Each benchmark runs in its own process, so the peak of the process is the one of the benchmark
+    measures['peak_rss_mb'] = peak_rss_mb()
+
+    # Content of the outputs (after the measures)
+    if benchmark['outputs'] is None:
+        outputs = {name: result}
+    else:
+        outputs = {table: reading_table(f'{package_path}/transform/output/{table}')
+                   for table in benchmark['outputs']}
+    float_decimals = calling_settings()['regression']['float_decimals']
+    measures['outputs'] = {table: {'rows': df.shape[0],
+                                   'hash': content_hash(df, float_decimals=float_decimals)}
+                           for table, df in outputs.items()}
+
+    return measures
+
+
+def ignoring(path, names):
+    '''
+    Function to leave the outputs, caches, checkpoints and reports out of the sandbox
+    '''
+
+    if os.path.basename(path) == 'output':
+        return [name for name in names if name != '.gitkeep']
+
+    return [name for name in names if name in ['__pycache__', 'checkpoints', 'reports']]
+
+
+def preparing_sandbox(path):
+    '''
+    Function to copy the data_engineering and ancillary folders into the sandbox
+    '''
+
+    shutil.copytree(package_path, f'{path}/data_engineering', ignore=ignoring)
+    shutil.copytree(f'{package_path}/../ancillary', f'{path}/ancillary')
+
+
+def cleaning_sandbox(path):
+    '''
+    Function to remove the transform and load outputs of the sandbox (a new repetition starts
+    from the raw files)
+    '''
+
+    for folder in ['transform/output', 'load/output']:
+        output_path = f'{path}/data_engineering/{folder}'
+        for name in os.listdir(output_path):
+            if name == '.gitkeep':
+                continue
+            elif os.path.isdir(f'{output_path}/{name}'):
+                shutil.rmtree(f'{output_path}/{name}')
+            else:
+                os.remove(f'{output_path}/{name}')
+
+
+def calling_benchmark(name, sandbox, trace_memory=False):
+    '''
+    Function to run a benchmark in its own process using the data_engineering package of the sandbox
+    '''
+
+    command = [sys.executable, '-m', 'data_engineering.benchmark.main', '--running', name,
+               '--trace_memory', str(trace_memory)]
+    env = dict(os.environ, PYTHONPATH=sandbox)
+    log_path = f'{sandbox}/{name}.log'
+    with open(log_path, 'w') as log:
+        result = subprocess.run(command, cwd=sandbox, env=env, stdout=subprocess.PIPE,
+                                stderr=log, text=True)
+    if result.returncode != 0:
+        with open(log_path, 'r') as log:
+            tail = ''.join(log.readlines()[-20:])
+        raise RuntimeError(f'Error: benchmark {name} failed (see {log_path})\n{tail}')
+
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def counting_raw_data(path):
+    '''
+    Function to get the rows and megabytes of the raw files
+    '''
+
+    rows, size = 0, 0
+    for file in glob.glob(f'{path}/*.csv'):
+        with open(file, 'rb') as f:
+            rows += sum(1 for _ in f) - 1
+        size += os.path.getsize(file)
+
+    return rows, round(size / 1024 ** 2, 2)
+
+
+def summarizing(results):
+    '''
+    Function to write the summary of the benchmarks into the log
+    '''
+
+    logger.info(f' {"Benchmark":<26}{"Scale":>7}{"Raw rows":>12}{"Wall (s)":>11}{"CPU (s)":>10}'
+                f'{"RSS (MB)":>10}{"Rows out":>12}')
+    for result in results:
+        logger.info(f' {result["benchmark"]:<26}{str(result["scale"]) + "x":>7}{result["raw_rows"]:>12,}'
+                    f'{result["wall_s"]:>11.2f}{result["cpu_s"]:>10.2f}{result["peak_rss_mb"] or 0:>10.0f}'
+                    f'{result["rows_out"]:>12,}')
+
+
+def benchmarking(scales=None, names=None, repeats=None, trace_memory=False, sandbox_path=None,
+                 keeping_sandbox=False):
+    '''
+    Function to run the benchmarks at each scale. The benchmarks a benchmark needs also run,
+    but only those in names are reported. It returns the path of the results file
+    '''
+
+    settings = calling_settings()
+    scales = scales or settings['scales']
+    repeats = repeats or settings['repeats']
+    names = names or list(benchmarks.keys())
+    chain = list(benchmarks.keys())
+    chain = chain[:max(chain.index(name) for name in names) + 1]
+
+    started_at = datetime.now()
+    results = []
+    for scale in scales:
+        sandbox = tempfile.mkdtemp(prefix=f'prtr_benchmark_{scale}x_', dir=sandbox_path)
+        try:
+            preparing_sandbox(sandbox)
+            logger.info(f' Generating the synthetic data at {scale}x in {sandbox}')
+            raw_path = f'{sandbox}/data_engineering/extract/output'
+            start = time.perf_counter()
+            generating_prtr_data(raw_path, scale=scale, settings=settings)
+            generation_s = round(time.perf_counter() - start, 3)
+            raw_rows, raw_mb = counting_raw_data(raw_path)
+
+            measures = {name: [] for name in chain}
+            for repeat in range(repeats):
+                cleaning_sandbox(sandbox)
+                for name in chain:
+                    logger.info(f' Running {name} at {scale}x ({repeat + 1}/{repeats})')
+                    measures[name].append(calling_benchmark(name, sandbox, trace_memory=trace_memory))
+
+            for name in names:
+                runs = measures[name]
+                result = {'benchmark': name,
+                          'scale': scale,
+                          'raw_rows': raw_rows,
+                          'raw_mb': raw_mb,
+                          'generation_s': generation_s,
+                          'repeats': len(runs)}
+                # Median of the repetitions
+                for key in ['wall_s', 'cpu_s', 'baseline_rss_mb', 'peak_rss_mb', 'peak_traced_mb', 'rows_in', 'rows_out', 'bytes_in', 'bytes_out']:
+                    values = [run[key] for run in runs if run.get(key) is not None]
+                    median = statistics.median if key.endswith(('_s', '_mb')) else statistics.median_low
+                    result[key] = median(values) if values else None
+                # The outputs must be the same in every repetition
+                result['outputs'] = runs[-1]['outputs']
+                result['deterministic'] = all(run['outputs'] == result['outputs'] for run in runs)
+                result['runs'] = runs
+                results.append(result)
+        except Exception:
+            # The sandbox keeps the logs of the failed benchmark
+            keeping_sandbox = True
+            raise
+        finally:
+            if keeping_sandbox:
+                logger.info(f' Sandbox kept in {sandbox}')
+            else:
+                shutil.rmtree(sandbox, ignore_errors=True)
+
+    report = {'started_at': started_at.isoformat(sep=' '),
+              'finished_at': datetime.now().isoformat(sep=' '),
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'cpu_count': os.cpu_count(),
+              'trace_memory': trace_memory,
+              'settings': settings,
+              'results': results}
+    os.makedirs(f'{dir_path}/output', exist_ok=True)
+    filename = f'{dir_path}/output/benchmark_{started_at.strftime("%Y%m%d_%H%M%S")}.json'
+    with open(filename, 'w') as file:
+        json.dump(report, file, indent=2, default=str)
+
+    summarizing(results)
+    logger.info(f' Benchmark results written to {filename}')
+
+    return filename
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scales',
+                        help='Scales of the synthetic data (times the facilities in config.yaml)',
+                        nargs='+',
+                        type=int,
+                        default=None)
+    parser.add_argument('--benchmarks',
+                        help='Benchmarks to report (the benchmarks they need also run)',
+                        nargs='+',
+                        choices=list(benchmarks.keys()),
+                        type=str,
+                        default=None)
+    parser.add_argument('--repeats',
+                        help='Number of times each benchmark runs (the median is reported)',
+                        type=int,
+                        default=None)
+    parser.add_argument('--trace_memory',
+                        help='Would you like to trace the memory allocated by Python in each benchmark (slower)',
+                        choices=['True', 'False'],
+                        type=str,
+                        default='False')
+    parser.add_argument('--sandbox_path',
+                        help='Folder for the sandboxes (the temporary folder by default)',
+                        type=str,
+                        default=None)
+    parser.add_argument('--keep_sandbox',
+                        help='Would you like to keep the sandboxes (synthetic data and outputs)',
+                        choices=['True', 'False'],
+                        type=str,
+                        default='False')
+    parser.add_argument('--running',
+                        help=argparse.SUPPRESS,
+                        choices=list(benchmarks.keys()),
+                        type=str,
+                        default=None)
+
+    args = parser.parse_args()
+
+    if args.running:
+        # A benchmark run by the suite inside a sandbox
+        measures = running_benchmark(args.running, trace_memory=(args.trace_memory == 'True'))
+        print(json.dumps(measures, default=str))
+    else:
+        benchmarking(scales=args.scales,
+                     names=args.benchmarks,
+                     repeats=args.repeats,
+                     trace_memory=(args.trace_memory == 'True'),
+                     sandbox_path=args.sandbox_path,
+                     keeping_sandbox=(args.keep_sandbox == 'True'))
@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for gating the changes of the data engineering pipeline on their
+performance and outputs. The benchmarks (e.g., transforming_tri, normalizing_naics and
+database_normalization) run on the synthetic data and are compared with a stored baseline of
+their wall time, memory and content hashes of their output tables. The gate fails when a
+benchmark is slower or uses more memory than the tolerances allow, or when an output changes.
+'''
+
+# Importing libraries
+from data_engineering.benchmark.synthetic_prtr import calling_settings
+from data_engineering.benchmark.main import benchmarks, benchmarking
+
+from datetime import datetime
+import os
+import sys
+import json
+import platform
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+logging.basicConfig(level=logging.INFO)
+
+logger = logging.getLogger(' Data engineering --> Benchmark')
+
+dir_path = os.path.dirname(os.path.realpath(__file__)) # current directory path
+
+# Statuses failing the gate
+failing_status = ['slower', 'more memory', 'drift', 'nondeterministic']
+
+
+def baseline_measures(result):
+    '''
+    Function to get the measures of a benchmark result kept in the baseline. The memory
+    is the growth of the peak RSS during the benchmark (without the libraries)
+    '''
+
+    rss_mb = None
+    if (result.get('peak_rss_mb') is not None) and (result.get('baseline_rss_mb') is not None):
+        rss_mb = round(result['peak_rss_mb'] - result['baseline_rss_mb'], 1)
+
+    return {'wall_s': result['wall_s'],
+            'cpu_s': result['cpu_s'],
+            'rss_mb': rss_mb,
+            'repeats': result['repeats'],
+            'outputs': result['outputs']}
+
+
+def calling_baseline(path):
+    '''
+    Function to call the baseline (None if it was not recorded)
+    '''
+
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+def recording_baseline(report, path, baseline=None):
+    '''
+    Function to record the results of a benchmark report as the baseline. The benchmarks
+    and scales that are not in the report are kept from the previous baseline
+    '''
+
+    settings = {key: report['settings'][key] for key in ['seed', 'data', 'noise']}
+    if (baseline is None) or (baseline['settings'] != settings):
+        baseline = {'benchmarks': {}}
+    baseline.update({'recorded_at': datetime.now().isoformat(sep=' '),
+                     'python': platform.python_version(),
+                     'pandas': pd.__version__,
+                     'numpy': np.__version__,
+                     'platform': report['platform'],
+                     'cpu_count': report['cpu_count'],
+                     'settings': settings})
+    for result in report['results']:
+        baseline['benchmarks'].setdefault(result['benchmark'], {})[str(result['scale'])] =\
+            baseline_measures(result)
+
+    with open(path, 'w') as file:
+        json.dump(baseline, file, indent=2)
+    logger.info(f' Baseline written to {path}')
+
+    return baseline
+
+
+def comparing_measure(check, base, current, tolerance, minimum, worse):
+    '''
+    Function to compare a measure with the baseline. The change must go over the relative
+    tolerance and the absolute minimum to count (shorter changes are noise)
+    '''
+
+    if (base is None) or (current is None):
+        return {'check': check, 'baseline': base, 'current': current, 'change': None, 'status': 'ok'}
+    change = (current - base) / base if base > 0 else 0.0
+    if (current > base * (1 + tolerance)) and (current - base > minimum):
+        status = worse
+    elif (current < base * (1 - tolerance)) and (base - current > minimum):
+        status = 'better'
+    else:
+        status = 'ok'
+
+    return {'check': check, 'baseline': base, 'current': current, 'change': round(change, 3), 'status': status}
+
+
+def comparing_outputs(base, current):
+    '''
+    Function to compare the content hashes of the output tables with the baseline
+    '''
+
+    checks = []
+    for table in sorted(set(base.keys()) | set(current.keys())):
+        base_table, current_table = base.get(table), current.get(table)
+        status = 'ok' if (base_table is not None) and (current_table is not None)\
+            and (base_table['hash'] == current_table['hash']) else 'drift'
+        checks.append({'check': f'output {table}',
+                       'baseline': base_table['rows'] if base_table else None,
+                       'current': current_table['rows'] if current_table else None,
+                       'change': None,
+                       'status': status})
+
+    return checks
+
+
+def comparing(report, baseline, tolerances):
+    '''
+    Function to compare the results of a benchmark report with the baseline. It returns
+    the checks (benchmark, scale, check, baseline, current, change and status)
+    '''
+
+    settings = {key: report['settings'][key] for key in ['seed', 'data', 'noise']}
+    if baseline['settings'] != settings:
+        raise ValueError('Error: the baseline was recorded on other synthetic data (seed, data or noise). '
+                         'Record it again with --update_baseline True')
+    for package, version in [('python', platform.python_version()), ('pandas', pd.__version__),
+                             ('numpy', np.__version__)]:
+        if baseline.get(package) != version:
+            logger.warning(f' The baseline was recorded with {package} {baseline.get(package)} '
+                           f'and this run uses {version}')
+    if baseline.get('platform') != report['platform']:
+        logger.warning(f' The baseline was recorded on another platform ({baseline.get("platform")})')
+
+    checks = []
+    for result in report['results']:
+        current = baseline_measures(result)
+        base = baseline['benchmarks'].get(result['benchmark'], {}).get(str(result['scale']))
+        key = {'benchmark': result['benchmark'], 'scale': result['scale']}
+        if base is None:
+            checks.append({**key, 'check': 'baseline', 'baseline': None, 'current': None,
+                           'change': None, 'status': 'no baseline'})
+            continue
+        checks.append({**key, **comparing_measure('wall_s', base['wall_s'], current['wall_s'],
+                                                  tolerances['wall_s'], tolerances['min_wall_s'], 'slower')})
+        checks.append({**key, **comparing_measure('rss_mb', base['rss_mb'], current['rss_mb'],
+                                                  tolerances['rss_mb'], tolerances['min_rss_mb'], 'more memory')})
+        if not result['deterministic']:
+            checks.append({**key, 'check': 'outputs', 'baseline': None, 'current': None,
+                           'change': None, 'status': 'nondeterministic'})
+        checks += [{**key, **check} for check in comparing_outputs(base['outputs'], current['outputs'])]
+
+    return checks
+
+
+def summarizing(checks):
+    '''
+    Function to write the checks into the log
+    '''
+
+    logger.info(f' {"Benchmark":<26}{"Scale":>7}  {"Check":<36}{"Baseline":>12}{"Current":>12}'
+                f'{"Change":>9}  Status')
+    for check in checks:
+        to_text = lambda value: '-' if value is None else (f'{value:,.2f}' if isinstance(value, float) else f'{value:,}')
+        change = '-' if check['change'] is None else f'{check["change"]:+.0%}'
+        logger.info(f' {check["benchmark"]:<26}{str(check["scale"]) + "x":>7}  {check["check"][:35]:<36}'
+                    f'{to_text(check["baseline"]):>12}{to_text(check["current"]):>12}{change:>9}  {check["status"]}')
+
+
+def gating(results=None, names=None, scales=None, repeats=None, baseline_path=None,
+           tolerances=None, updating_baseline=False):
+    '''
+    Function to run the benchmarks (or take the results file) and compare them with
+    the baseline. It returns True if the gate passes
+    '''
+
+    settings = calling_settings()['regression']
+    baseline_path = baseline_path or f'{dir_path}/{settings["baseline"]}'
+    tolerances = {**settings['tolerances'], **(tolerances or {})}
+
+    # Without a baseline there is nothing to compare with, so the gate is skipped
+    baseline = calling_baseline(baseline_path)
+    if (baseline is None) and not updating_baseline:
+        logger.warning(f' Regression gate skipped: there is no baseline in {baseline_path}. '
+                       f'Record it with --update_baseline True')
+        return True
+
+    if results is None:
+        results = benchmarking(scales=scales or settings['scales'],
+                               names=names or settings['benchmarks'],
+                               repeats=repeats or settings['repeats'])
+    with open(results, 'r') as file:
+        report = json.load(file)
+
+    if updating_baseline:
+        recording_baseline(report, baseline_path, baseline=baseline)
+        return True
+
+    checks = comparing(report, baseline, tolerances)
+    summarizing(checks)
+
+    filename = os.path.join(os.path.dirname(results),
+                            os.path.basename(results).replace('benchmark_', 'regression_'))
+    with open(filename, 'w') as file:
+        json.dump({'results': results,
+                   'baseline': baseline_path,
+                   'tolerances': tolerances,
+                   'checks': checks}, file, indent=2)
+
+    failed = [check for check in checks if check['status'] in failing_status]
+    if failed:
+        logger.error(f' Regression gate failed: {len(failed)} checks ({filename})')
+    else:
+        logger.info(f' Regression gate passed ({filename})')
+
+    return not failed
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--benchmarks',
+                        help='Benchmarks of the gate (config.yaml by default)',
+                        nargs='+',
+                        choices=list(benchmarks.keys()),
+                        type=str,
+                        default=None)
+    parser.add_argument('--scales',
+                        help='Scales of the synthetic data for the gate (config.yaml by default)',
+                        nargs='+',
+                        type=int,
+                        default=None)
+    parser.add_argument('--repeats',
+                        help='Number of times each benchmark runs (config.yaml by default)',
+                        type=int,
+                        default=None)
+    parser.add_argument('--results',
+                        help='Benchmark results file to compare instead of running the benchmarks',
+                        type=str,
+                        default=None)
+    parser.add_argument('--baseline',
+                        help='Baseline file (data_engineering/benchmark/baseline.json by default)',
+                        type=str,
+                        default=None)
+    parser.add_argument('--tolerance_time',
+                        help='Relative slowdown allowed (config.yaml by default)',
+                        type=float,
+                        default=None)
+    parser.add_argument('--tolerance_memory',
+                        help='Relative memory growth allowed (config.yaml by default)',
+                        type=float,
+                        default=None)
+    parser.add_argument('--update_baseline',
+                        help='Would you like to record the run as the baseline',
+                        choices=['True', 'False'],
+                        type=str,
+                        default='False')
+
+    args = parser.parse_args()
+
+    tolerances = {}
+    if args.tolerance_time is not None:
+        tolerances['wall_s'] = args.tolerance_time
+    if args.tolerance_memory is not None:
+        tolerances['rss_mb'] = args.tolerance_memory
+
+    passed = gating(results=args.results,
+                    names=args.benchmarks,
+                    scales=args.scales,
+                    repeats=args.repeats,
+                    baseline_path=args.baseline,
+                    tolerances=tolerances,
+                    updating_baseline=(args.update_baseline == 'True'))
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,426 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for generating synthetic raw data of the PRTR systems (TRI files
+3a, 3b and 3c, NPRI transfers and disposals, and NPI transfers and substances) at a given scale of
+facilities, substances and reporting years. The files follow the column maps in the ancillary
+folder and use the national substances, sector codes, transfer classes and reliability codes that
+the transformers expect, so the transform and load stages can run on them without the internet.
+The CAS numbers and names the SRS would return are written into a registry file.
+'''
+
+# Importing libraries
+from data_engineering.transform.common import config
+
+import os
+import re
+import json
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(' Data engineering --> Benchmark')
+
+dir_path = os.path.dirname(os.path.realpath(__file__)) # current directory path
+ancillary_path = f'{dir_path}/../../ancillary' # ancillary folder path
+
+
+def calling_settings():
+    '''
+    Function to load the configuration file of the benchmark
+    '''
+
+    return config(f'{dir_path}/config.yaml')
+
+
+def cas_check_digit(digits):
+    '''
+    Function to compute the check digit of a CAS registry number
+    '''
+
+    return sum(i * int(d) for i, d in enumerate(reversed(digits), start=1)) % 10
+
+
+def generating_cas_numbers(rng, n):
+    '''
+    Function to generate n distinct CAS numbers having a valid check digit
+    '''
+
+    bodies = rng.choice(np.arange(1000, 9999999), size=n, replace=False)
+    cas_numbers = []
+    for body in bodies:
+        digits = str(body)
+        cas_numbers.append(f'{digits[:-2]}-{digits[-2:]}-{cas_check_digit(digits)}')
+
+    return cas_numbers
+
+
+def calling_catalogs():
+    '''
+    Function to call the national substances (categories), sector codes and
+    transfer classes of each PRTR system from the ancillary files
+    '''
+
+    df_chem = pd.read_csv(f'{ancillary_path}/National_to_generic_chemicals.csv',
+                          dtype={'national_substance_id': object})
+    df_chem = df_chem.loc[pd.isnull(df_chem.cas_number)]
+    df_transfer = pd.read_csv(f'{ancillary_path}/National_to_generic_transfer.csv')
+
+    # Sector codes reported by the facilities (some TRI facilities keep NAICS 2012 codes)
+    usa_2017 = pd.read_csv(f'{ancillary_path}/USA_2017_NAICS_to_ISIC_4.csv', dtype=str)['2017 NAICS']
+    usa_2012 = pd.read_csv(f'{ancillary_path}/USA_2012_to_2017_NAICS.csv')
+    usa_2012 = usa_2012.loc[usa_2012['2012 NAICS Code'] != usa_2012['2017 NAICS Code'], '2012 NAICS Code']
+    can_2017 = pd.read_csv(f'{ancillary_path}/CAN_2017_NAICS_to_ISIC_4.csv', dtype=str)['2017 NAICS']
+    anzsic = pd.read_csv(f'{ancillary_path}/2006_ANZSIC_to_ISIC_4.csv', dtype=str)['2006 ANZSIC']
+    to_codes = lambda codes: np.unique(pd.to_numeric(codes.astype(str).str.replace(r'[^0-9]+', '', regex=True)
+                                                     .str.lstrip('0'), errors='coerce').dropna().astype(int))
+
+    catalogs = {}
+    for system in ['TRI', 'NPRI', 'NPI']:
+        catalogs[system] = {
+            'categories': df_chem.loc[df_chem.prtr_system == system,
+                                      ['national_substance_id', 'national_substance_name']]
+                                .drop_duplicates(subset='national_substance_id').values.tolist(),
+            'transfer_classes': df_transfer.loc[df_transfer.prtr_system == system,
+                                                'national_transfer_class_name'].tolist()
+            }
+    catalogs['TRI']['sectors'] = to_codes(usa_2017)
+    catalogs['TRI']['old_sectors'] = to_codes(usa_2012)
+    catalogs['NPRI']['sectors'] = to_codes(can_2017)
+    catalogs['NPI']['sectors'] = to_codes(anzsic)
+
+    return catalogs
+
+
+def generating_substances(rng, system, n_substances, categories, cas_pool):
+    '''
+    Function to build the substances reported to a PRTR system: a fourth are
+    categories (no CAS number) and the others are taken from the CAS numbers
+    shared by the three systems
+    '''
+
+    n_categories = min(len(categories), n_substances // 4)
+    picked = rng.choice(len(categories), size=n_categories, replace=False)
+    substances = [{'id': categories[i][0], 'name': categories[i][1], 'cas': None} for i in picked]
+    for cas in rng.choice(cas_pool, size=n_substances - n_categories, replace=False):
+        substances.append({'id': cas, 'name': f'Synthetic substance {cas}', 'cas': cas})
+
+    # National IDs
+    for n, substance in enumerate(substances):
+        if system == 'TRI' and substance['cas']:
+            substance['id'] = substance['cas'].replace('-', '').zfill(9)
+        elif system == 'NPI':
+            # Program substance IDs (68, 83 and 84 are excluded by the transformer)
+            substance['id'] = int(substance['id']) if not substance['cas'] else 1000 + n
+
+    return pd.DataFrame(substances)
+
+
+def generating_reports(rng, n_facilities, n_substances, substances_per_facility, years):
+    '''
+    Function to get the (facility, substance, reporting year) reports. Each facility
+    reports the same substances every year
+    '''
+
+    k = min(substances_per_facility, n_substances)
+    picked = np.argsort(rng.random((n_facilities, n_substances)), axis=1)[:, :k]
+    facility = np.repeat(np.arange(n_facilities), k)
+    substance = picked.ravel()
+
+    n = facility.size
+    return pd.DataFrame({'facility': np.tile(facility, len(years)),
+                         'substance': np.tile(substance, len(years)),
+                         'reporting_year': np.repeat(years, n)})
+
+
+def generating_amounts(rng, n, mean=6.0, sigma=2.0):
+    '''
+    Function to generate transfer amounts (lognormal, as the PRTR amounts)
+    '''
+
+    return np.round(rng.lognormal(mean, sigma, size=n), 2)
+
+
+def sampling_codes(rng, codes, n, missing=0.0):
+    '''
+    Function to sample codes (e.g., basis of estimate), leaving a share of them empty
+    '''
+
+    values = rng.choice(np.array(codes, dtype=object), size=n)
+    values[rng.random(n) < missing] = None
+
+    return values
+
+
+def raw_frame(columns, n_columns, values):
+    '''
+    Function to build a raw file having n_columns, of which only the columns
+    in values (position: values) are filled
+    '''
+
+    n = len(next(iter(values.values())))
+    header = columns + [f'COLUMN {i}' for i in range(len(columns), n_columns)]
+    data = {}
+    for i in range(n_columns):
+        data[header[i]] = values[i] if i in values.keys() else np.full(n, None, dtype=object)
+    df = pd.DataFrame(data)
+
+    return df
+
+
+def writing_raw_file(df, path):
+    '''
+    Function to write a raw file and log its size
+    '''
+
+    df.to_csv(path, index=False)
+    logger.info(f' {os.path.basename(path)}: {df.shape[0]:,} rows')
+
+
+def generating_tri(rng, settings, catalogs, cas_pool, output_path, scale):
+    '''
+    Function to generate the TRI files 3a, 3b (years up to 2010) and 3c (years since 2011)
+    '''
+
+    data, noise = settings['data'], settings['noise']
+    catalog = catalogs['TRI']
+    columns_for_using = config(f'{ancillary_path}/TRI_columns_for_using.yaml')
+    n_facilities = data['facilities'] * scale
+
+    substances = generating_substances(rng, 'TRI', data['substances'], catalog['categories'], cas_pool)
+    old = rng.random(n_facilities) < 0.1
+    sectors = np.where(old,
+                       rng.choice(catalog['old_sectors'], size=n_facilities),
+                       rng.choice(catalog['sectors'], size=n_facilities))
+    facilities = np.array([f'{z:05d}SYNTH{i:05d}'[:15] for i, z in
+                           enumerate(rng.integers(10000, 99999, size=n_facilities))], dtype=object)
+
+    reports = generating_reports(rng, n_facilities, len(substances),
+                                 data['substances_per_facility'], data['years'])
+    reports['national_substance_id'] = substances['id'].values[reports.substance]
+    reports['national_substance_name'] = substances['name'].values[reports.substance]
+    secret = rng.random(reports.shape[0]) < noise['trade_secrets']
+    reports.loc[secret, 'national_substance_id'] = 'TRD SECRT'
+    reports['national_facility_id'] = facilities[reports.facility]
+    reports['national_sector_code'] = sectors[reports.facility]
+    reports['Units'] = np.where(rng.random(reports.shape[0]) < 0.05, 'Grams', 'Pounds')
+
+    basis = ['O', 'C', 'E', 'E1', 'E2', 'M', 'M1', 'M2', 'X']
+    for key in ['3a', '3b', '3c']:
+        with open(f'{ancillary_path}/TRI_File_{key}_columns.txt', 'r') as file:
+            columns = [line.strip() for line in file if line.strip()]
+        using = {int(i): name for i, name in columns_for_using[key].items()}
+        n_columns = max(len(columns), max(using.keys()) + 1)
+        position = {name: i for i, name in using.items()}
+        off_columns = [name for name in using.values()
+                       if ('Off-site' in name) and ('basis of estimate' not in name)]
+
+        for year in data['years']:
+            if ((key == '3b') and (year > 2010)) or ((key == '3c') and (year <= 2010)):
+                continue
+            df = reports.loc[reports.reporting_year == year]
+            if key != '3a':
+                # Only some of the reports have POTW transfers
+                df = df.loc[rng.random(df.shape[0]) < 0.3]
+                if df.empty:
+                    df = reports.loc[reports.reporting_year == year].iloc[:1]
+            n = df.shape[0]
+
+            values = {position[col]: df[col].values for col in ['national_facility_id', 'national_substance_id',
+                                                               'national_substance_name', 'Units',
+                                                               'national_sector_code']}
+            values[position['reporting_year']] = df['reporting_year'].values
+            if (key == '3c') and (year >= 2018):
+                reported = off_columns[1:]
+            elif key == '3c':
+                reported = off_columns[:1]
+            else:
+                reported = off_columns
+            # One to three transfer classes for each report
+            chosen = rng.integers(len(reported), size=n)
+            for j, off in enumerate(reported):
+                reported_off = (chosen == j) | (rng.random(n) < 2 / len(reported))
+                amount = np.where(reported_off, generating_amounts(rng, n), np.nan)
+                values[position[off]] = np.where(reported_off, amount, None)
+                values[position[f'{off} - basis of estimate']] = np.where(reported_off,
+                                                                          sampling_codes(rng, basis, n, missing=0.02),
+                                                                          None)
+            writing_raw_file(raw_frame(columns, n_columns, values), f'{output_path}/US_{key}_{year}.csv')
+
+    return substances
+
+
+def generating_npri(rng, settings, catalogs, cas_pool, output_path, scale):
+    '''
+    Function to generate the NPRI transfers and disposals files
+    '''
+
+    data, noise = settings['data'], settings['noise']
+    catalog = catalogs['NPRI']
+    columns_for_using = config(f'{ancillary_path}/NPRI_columns_for_using.yaml')
+    n_facilities = data['facilities'] * scale
+
+    substances = generating_substances(rng, 'NPRI', data['substances'], catalog['categories'], cas_pool)
+    sectors = rng.choice(catalog['sectors'], size=n_facilities)
+    facilities = np.arange(1, n_facilities + 1) + 1000
+
+    reports = generating_reports(rng, n_facilities, len(substances),
+                                 data['substances_per_facility'], data['years'])
+    # Some facilities do not report their sector the first year
+    missing = rng.random(n_facilities) < noise['missing_sector']
+    sector = np.where(missing[reports.facility] & (reports.reporting_year == min(data['years'])),
+                      0, sectors[reports.facility])
+
+    columns = ['Reporting_Year / Année', 'NPRI_ID / No_INRP', 'Company_Name / Dénomination_sociale_de_l\'entreprise',
+               'Facility_Name / Installation', 'NAICS / Code_SCIAN', 'NAICS Title EN / Titre Code_SCIAN',
+               'CAS_Number / No_CAS', 'Substance Name (English) / Nom de substance (Anglais)',
+               'Substance Name (French) / Nom de substance (Français)', 'Group (English) / Groupe (Anglais)',
+               'Group (French) / Groupe (Français)', 'Category (English) / Catégorie (Anglais)',
+               'Category (French) / Catégorie (Français)', 'Quantity / Quantité', 'Units / Unités',
+               'Estimation_Method / Méthode_d\'estimation']
+    units = ['tonnes'] * 16 + ['kg'] * 3 + ['grams']
+    methods = ['O', 'C', 'M', 'M1', 'M2', 'M3', 'E', 'E1', 'E2']
+    for filename in ['transfers', 'disposals']:
+        using = {int(i): name for i, name in columns_for_using[filename].items()}
+        position = {name: i for i, name in using.items()}
+        n = reports.shape[0]
+        values = {position['reporting_year']: reports.reporting_year.values,
+                  position['national_facility_id']: facilities[reports.facility],
+                  position['national_sector_code']: sector,
+                  position['national_substance_id']: substances['id'].values[reports.substance],
+                  position['national_substance_name']: substances['name'].values[reports.substance],
+                  position['national_transfer_class_name']: rng.choice(catalog['transfer_classes'], size=n),
+                  position['transfer_amount_kg']: np.round(rng.lognormal(-2.0, 2.0, size=n), 4),
+                  position['Units']: np.where(rng.random(n) < noise['teq_units'], 'g TEQ(ET)',
+                                              rng.choice(units, size=n)),
+                  position['reliability_score']: sampling_codes(rng, methods, n, missing=0.02)}
+        if filename == 'disposals':
+            values[position['Group']] = np.where(rng.random(n) < 0.5, 'On-site disposal', 'Off-site disposal')
+        else:
+            values[9] = np.where(rng.random(n) < 0.5, 'Off-site transfers for treatment',
+                                 'Off-site transfers for recycling')
+        writing_raw_file(raw_frame(columns, len(columns), values), f'{output_path}/NPRI_{filename}.csv')
+
+    return substances
+
+
+def generating_npi(rng, settings, catalogs, cas_pool, output_path, scale):
+    '''
+    Function to generate the NPI transfers and substances files
+    '''
+
+    data = settings['data']
+    catalog = catalogs['NPI']
+    columns_for_using = config(f'{ancillary_path}/NPI_columns_for_using.yaml')
+    n_facilities = data['facilities'] * scale
+
+    substances = generating_substances(rng, 'NPI', data['substances'], catalog['categories'], cas_pool)
+    sectors = rng.choice(catalog['sectors'], size=n_facilities)
+    facilities = np.arange(1, n_facilities + 1) + 1000
+
+    reports = generating_reports(rng, n_facilities, len(substances),
+                                 data['substances_per_facility'], data['years'])
+    n = reports.shape[0]
+    scores = rng.integers(1, 6, size=(n, 2))
+    position = {name: int(i) for i, name in columns_for_using['transfers'].items()}
+    values = {position['transfer_amount_kg']: generating_amounts(rng, n, mean=5.0),
+              position['national_sector_code']: sectors[reports.facility],
+              # Reporting periods run from July to June
+              position['reporting_year']: [f'{y - 1}/{y}' for y in reports.reporting_year],
+              position['reliability_score']: [f'{a},{b}' for a, b in scores],
+              position['national_facility_id']: facilities[reports.facility],
+              position['national_substance_id']: substances['id'].values[reports.substance],
+              position['national_transfer_class_name']: rng.choice(catalog['transfer_classes'], size=n)}
+    columns = ['quantity_in_kg', 'facility_name', 'business_name', 'abn', 'primary_anzsic_class_code',
+               'primary_anzsic_class_name', 'site_address_street', 'site_address_suburb', 'site_address_state',
+               'site_address_postcode', 'site_latitude', 'site_longitude', 'jurisdiction_facility_id',
+               'substance_name', 'category', 'threshold', 'report_id', 'report_type', 'report_year',
+               'estimation_method_codes', 'facility_id', 'jurisdiction', 'substance_id', 'destination']
+    writing_raw_file(raw_frame(columns, len(columns), values), f'{output_path}/NPI_transfers.csv')
+
+    position = {name: int(i) for i, name in columns_for_using['substances'].items()}
+    values = {position['cas_number']: substances['cas'].values,
+              position['national_substance_name']: substances['name'].values,
+              position['national_substance_id']: substances['id'].values}
+    columns = ['category', 'threshold_category_1', 'threshold_category_1a', 'threshold_category_1b',
+               'threshold_category_2a', 'threshold_category_2b', 'threshold_category_3', 'air_emission',
+               'water_emission', 'land_emission', 'transfer', 'units', 'synonyms', 'cas_number',
+               'substance_name', 'health_effects', 'environmental_effects', 'sources', 'notes', 'substance_id']
+    writing_raw_file(raw_frame(columns, len(columns), values), f'{output_path}/NPI_substances.csv')
+
+    return substances
+
+
+def generating_prtr_data(output_path, scale=1, settings=None):
+    '''
+    Function to generate the raw files of the three PRTR systems into output_path and
+    the registry of the answers the SRS would give (CAS number of each TRI ID and generic
+    name of each CAS number). It returns the registry
+    '''
+
+    settings = settings or calling_settings()
+    os.makedirs(output_path, exist_ok=True)
+    catalogs = calling_catalogs()
+
+    # The same CAS numbers are reported to the three systems
+    rng = np.random.default_rng([settings['seed'], scale])
+    cas_pool = generating_cas_numbers(rng, settings['data']['substances'] * 2)
+
+    substances = {}
+    for i, (system, generating) in enumerate([('TRI', generating_tri),
+                                              ('NPRI', generating_npri),
+                                              ('NPI', generating_npi)]):
+        system_rng = np.random.default_rng([settings['seed'], scale, i])
+        substances[system] = generating(system_rng, settings, catalogs, cas_pool, output_path, scale)
+
+    tri = substances['TRI'].loc[pd.notnull(substances['TRI'].cas)]
+    registry = {'tri_cas': dict(zip(tri.id.str.lstrip('0'), tri.cas)),
+                'generic_names': {cas: f'Synthetic substance {cas}' for cas in cas_pool}}
+    with open(f'{output_path}/synthetic_registry.json', 'w') as file:
+        json.dump(registry, file, indent=2)
+
+    return registry
+
+
+def calling_registry(output_path):
+    '''
+    Function to call the registry written with the synthetic data
+    '''
+
+    with open(f'{output_path}/synthetic_registry.json', 'r') as file:
+        return json.load(file)
+
+
+def offline_srs(registry):
+    '''
+    Function to get the functions answering the SRS lookups of the transformers
+    (CAS number by TRI ID and generic names by CAS number) from the registry
+    '''
+
+    def get_cas_by_alternative_id(altId, altIdType='22', substanceName=None):
+        return registry['tri_cas'].get(re.sub(r'^0+', '', str(altId)))
+
+    def get_generic_names_by_cas(cas_numbers):
+        return {cas: registry['generic_names'].get(cas) for cas in dict.fromkeys(cas for cas in cas_numbers if cas)}
+
+    return get_cas_by_alternative_id, get_generic_names_by_cas
+
+
+if __name__ == '__main__':
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale',
+                        help='Number of times the facilities at 1x (config.yaml) are generated',
+                        type=int,
+                        default=1)
+    parser.add_argument('--output',
+                        help='Folder for the raw files (data_engineering/extract/output by default)',
+                        type=str,
+                        default=f'{dir_path}/../extract/output')
+
+    args = parser.parse_args()
+
+    generating_prtr_data(args.output, scale=args.scale)
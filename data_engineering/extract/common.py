@@ -2,12 +2,40 @@
 # -*- coding: utf-8 -*-
 
 # Importing libraries
+from data_engineering.monitoring import counting
+
+from datetime import datetime
+from urllib.parse import urlparse
+from urllib.request import urlopen
+from urllib.error import HTTPError
+from collections import Counter
 import yaml
 import os
+import json
+import time
+import threading
+import logging
+import requests
 
+logger = logging.getLogger(' Data engineering --> Extract')
 
 dir_path = os.path.dirname(os.path.realpath(__file__))
 
+# Source and settings of each host, circuit breaker of each host, first
+# request of each source and unresolved items of the run
+_settings = {}
+_hosts = {}
+_sources = {}
+_unresolved = []
+_lock = threading.Lock()
+
+
+class SourceUnavailable(requests.exceptions.RequestException):
+    '''
+    Error raised without sending the request when the circuit of the host
+    is open or the deadline of the source has passed
+    '''
+
 
 def config():
     '''
@@ -19,3 +47,166 @@ def config():
         __config = yaml.load(f, Loader=yaml.FullLoader)
 
     return __config
+
+
+def calling_source(url):
+    '''
+    Function to get the source of a URL (e.g., SRS) and its timeouts,
+    deadline and circuit breaker settings (the default ones for unknown hosts)
+    '''
+
+    host = urlparse(url).netloc
+    if host in _settings.keys():
+        return (host,) + _settings[host]
+    _config = config()
+    source = host
+    for name, system in _config['system'].items():
+        hosts = [urlparse(system['url']).netloc] + _config['sources'].get(name, {}).get('hosts', [])
+        if host in hosts:
+            source = name
+            break
+    settings = {**_config['sources']['default'], **_config['sources'].get(source, {})}
+    _settings[host] = (source, settings)
+
+    return host, source, settings
+
+
+def checking_source(host, source, settings):
+    '''
+    Function to fail fast if the circuit of the host is open or the deadline
+    of the source has passed
+    '''
+
+    now = time.monotonic()
+    with _lock:
+        started = _sources.setdefault(source, now)
+        breaker = _hosts.setdefault(host, {'failures': 0, 'opened_at': None})
+        if (settings['deadline'] is not None) and (now - started > settings['deadline']):
+            raise SourceUnavailable(f'Error: the deadline of {source} ({settings["deadline"]} s) has passed')
+        if (breaker['opened_at'] is not None) and (now - breaker['opened_at'] < settings['cooldown']):
+            raise SourceUnavailable(f'Error: the circuit of {host} is open after {breaker["failures"]} failures')
+
+
+def recording_result(host, settings, failed):
+    '''
+    Function to record the result of a request to a host. The circuit opens after
+    consecutive failures, and a request is tried again once the cooldown has passed
+    '''
+
+    with _lock:
+        breaker = _hosts.setdefault(host, {'failures': 0, 'opened_at': None})
+        if not failed:
+            breaker['failures'], breaker['opened_at'] = 0, None
+            return
+        breaker['failures'] += 1
+        if breaker['failures'] >= settings['failures']:
+            if breaker['opened_at'] is None:
+                logger.warning(f' Circuit of {host} open after {breaker["failures"]} failures: its requests fail '
+                               f'fast for {settings["cooldown"]} s')
+            breaker['opened_at'] = time.monotonic()
+
+
+def requesting(url, **kwargs):
+    '''
+    Function to send a GET request (counted by the monitoring) with the timeouts,
+    deadline and circuit breaker of its source. Server errors (5xx and 429)
+    count as failures of the host, but their response is returned
+    '''
+
+    host, source, settings = calling_source(url)
+    checking_source(host, source, settings)
+    kwargs.setdefault('timeout', (settings['connect_timeout'], settings['read_timeout']))
+    try:
+        response = requests.get(url, **kwargs)
+    except requests.exceptions.RequestException:
+        recording_result(host, settings, failed=True)
+        raise
+    recording_result(host, settings, failed=(response.status_code >= 500) or (response.status_code == 429))
+    counting('requests')
+    counting('bytes_in', len(response.content))
+
+    return response
+
+
+def opening(request):
+    '''
+    Function to open a urllib request (counted by the monitoring) with the
+    timeout, deadline and circuit breaker of its source. HTTP errors
+    are raised as urllib does
+    '''
+
+    host, source, settings = calling_source(request.full_url)
+    checking_source(host, source, settings)
+    try:
+        response = urlopen(request, timeout=settings['read_timeout'])
+    except HTTPError as e:
+        recording_result(host, settings, failed=(e.code >= 500) or (e.code == 429))
+        raise
+    except OSError:
+        # Timeouts, refused connections and DNS errors
+        recording_result(host, settings, failed=True)
+        raise
+    recording_result(host, settings, failed=False)
+    counting('requests')
+
+    return response
+
+
+def unresolving(source, item, error):
+    '''
+    Function to record an item that could not be resolved by a source (e.g., a CAS
+    number without name in SRS). The items are reported in bulk at the end of the run
+    '''
+
+    # The messages of the failed requests have the URL of the item, so they are summarized by type
+    if isinstance(error, requests.exceptions.RequestException) and not isinstance(error, SourceUnavailable):
+        reason = type(error).__name__
+    else:
+        reason = str(error)
+    with _lock:
+        _unresolved.append({'source': source,
+                            'item': str(item),
+                            'reason': reason,
+                            'error': str(error)[:300]})
+
+
+def unresolved_items():
+    '''
+    Function to get the unresolved items recorded so far
+    '''
+
+    with _lock:
+        return list(_unresolved)
+
+
+def adding_unresolved(items):
+    '''
+    Function to add the unresolved items recorded by another process
+    '''
+
+    with _lock:
+        _unresolved.extend(items)
+
+
+def reporting_unresolved(path=None):
+    '''
+    Function to write the unresolved items of the run into a JSON file and summarize
+    them by source and reason in the log. It returns the path of the file
+    '''
+
+    items = unresolved_items()
+    if not items:
+        return None
+
+    path = path or f'{dir_path}/../reports'
+    os.makedirs(path, exist_ok=True)
+    filename = f'{path}/unresolved_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+    with open(filename, 'w') as file:
+        json.dump(items, file, indent=2)
+
+    by_reason = Counter((item['source'], item['reason']) for item in items)
+    logger.warning(f' {len(items):,} items could not be resolved ({filename}):')
+    for (source, reason), n_items in by_reason.most_common(10):
+        logger.warning(f' {n_items:>8,}  {source}: {reason}')
+
+    return filename
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for running the network I/O of the PRTR scrapers at the same time.
+The scrapers use blocking requests (requests and urllib, with the resumed NPRI downloads), so the I/O
+is not non-blocking: an asyncio event loop schedules the downloads on a pool of threads, one thread
+per connection of the global budget. Each download (NPI resource, NPRI file and TRI year) is a task
+that runs the blocking request on the pool once it gets a connection from the global budget and from
+the budget of its host (see connections in config.yaml), so the extract stage takes about the time
+of the slowest source instead of the sum of all of them. The stages of the downloads are nested into
+the stage of their system (npi_scraper, npri_scraper and tri_scraper), as when they run one after another.
+'''
+
+# Importing libraries
+from data_engineering.extract.common import config
+from data_engineering.extract.npi_scraper import download_npi_resource
+from data_engineering.extract.npri_scraper import visiting_npri, retrieving_data, headers
+from data_engineering.extract.tri_scraper import TRI_Scrapper
+from data_engineering.monitoring import monitoring, current_stage, nesting
+from data_engineering.profiling import profiled_stages
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import asyncio
+import logging
+
+logger = logging.getLogger(' Data engineering --> Extract')
+
+
+class ConnectionBudget:
+
+    def __init__(self, total=8, per_host=2, hosts=None):
+        self._total = asyncio.Semaphore(total)
+        self._per_host = per_host
+        self._limits = hosts or {}
+        self._hosts = dict()
+        self._executor = ThreadPoolExecutor(max_workers=total, thread_name_prefix='scraper')
+
+
+    def _host(self, url):
+        '''
+        Method for calling the semaphore of the host of a URL
+        '''
+
+        host = urlparse(url).netloc
+        if host not in self._hosts.keys():
+            self._hosts[host] = asyncio.Semaphore(self._limits.get(host, self._per_host))
+        return self._hosts[host]
+
+
+    async def running(self, url, function, *args):
+        '''
+        Method for running a blocking download on the pool of threads once
+        there is a connection left in the global budget and in the one of its host
+        '''
+
+        # The stage of the download is nested into the one of the task that runs it (its system)
+        record = current_stage()
+
+        def nested():
+            with nesting(record):
+                return function(*args)
+
+        async with self._total, self._host(url):
+            return await asyncio.get_running_loop().run_in_executor(self._executor, nested)
+
+
+    def closing(self):
+        '''
+        Method for waiting for the threads of the downloads
+        '''
+
+        self._executor.shutdown(wait=True)
+
+
+async def scraping_npi(budget):
+    '''
+    Function to download the NPI resources at the same time
+    '''
+
+    _config = config()['system']['NPI']
+    url = _config['url']
+
+    def downloading(key, id):
+        with monitoring(f'npi_scraper {key}'):
+            download_npi_resource(url, key, id)
+
+    with monitoring('npi_scraper'):
+        await asyncio.gather(*[budget.running(url, downloading, key, id)
+                               for key, id in _config['resource_id'].items()])
+
+
+async def scraping_npri(budget):
+    '''
+    Function to download the NPRI files at the same time
+    '''
+
+    def downloading(link, filenema_output):
+        with monitoring(f'npri_scraper {filenema_output}'):
+            retrieving_data(link, filenema_output, headers.copy())
+
+    with monitoring('npri_scraper'):
+        links = await budget.running(config()['system']['NPRI']['url'], visiting_npri)
+        await asyncio.gather(*[budget.running(link, downloading, link, filenema_output)
+                               for link, filenema_output in links.items()])
+
+
+async def scraping_tri(budget, keys):
+    '''
+    Function to download the TRI years at the same time
+    '''
+
+    Scrapper = TRI_Scrapper()
+    with monitoring('tri_scraper'):
+        colum_names = Scrapper.calling_tri_columns(keys)
+        zip_urls = await budget.running(config()['system']['TRI']['url'], Scrapper.calling_zip_urls)
+        await asyncio.gather(*[budget.running(zip_url, Scrapper.extracting_tri_year, year, zip_url, keys, colum_names)
+                               for year, zip_url in zip_urls.items()])
+
+
+async def scraping(keys):
+    '''
+    Function to run the scrapers of the PRTR systems in the event loop. A failed system does not
+    stop the others, and the first error is raised once all of them finish
+    '''
+
+    # A stage is profiled in the thread that runs it, and the downloads run in other threads
+    for stage in profiled_stages():
+        if stage in ['pipeline', 'extract', 'npi_scraper', 'npri_scraper', 'tri_scraper']:
+            logger.warning(f' The profile of {stage} does not cover the downloads, which run in other threads. '
+                           f'Profile their stages (e.g., "tri_scraper 2019") or run the scrapers one after another')
+
+    connections = config()['connections']
+    budget = ConnectionBudget(total=connections['total'],
+                              per_host=connections['per_host'],
+                              hosts=connections.get('hosts'))
+    try:
+        results = await asyncio.gather(scraping_npi(budget),
+                                       scraping_npri(budget),
+                                       scraping_tri(budget, keys),
+                                       return_exceptions=True)
+    finally:
+        budget.closing()
+
+    errors = [result for result in results if isinstance(result, BaseException)]
+    for system, result in zip(['NPI', 'NPRI', 'TRI'], results):
+        if isinstance(result, BaseException):
+            logger.error(f' {system} scraper failed: {type(result).__name__}: {result}')
+    if errors:
+        raise errors[0]
+
+
+def scraping_concurrently(keys=['3a', '3b', '3c']):
+    '''
+    Function to run the network I/O of the scrapers of the PRTR systems at the same time
+    '''
+
+    asyncio.run(scraping(keys))
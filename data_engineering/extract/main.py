@@ -5,29 +5,56 @@
 from data_engineering.extract.npi_scraper import download_npi
 from data_engineering.extract.npri_scraper import download_npri
 from data_engineering.extract.tri_scraper import TRI_Scrapper
+from data_engineering.extract.concurrent_scraping import scraping_concurrently
+from data_engineering.extract.common import reporting_unresolved
+from data_engineering.monitoring import monitoring
+from data_engineering.profiling import adding_profile_arguments, profiling_main
 
+import argparse
 import logging
 logging.basicConfig(level=logging.INFO)
 
 
-def scraper_pipeline():
+def scraper_pipeline(concurrent=True):
     '''
-    Function for creating the web scraping pipeline for the PRTR systems
+    Function for creating the web scraping pipeline for the PRTR systems.
+    With concurrent, the downloads of the PRTR systems run at the same time
     '''
 
     logger = logging.getLogger(' Data engineering --> Extract')
 
+    if concurrent:
+        logger.info(' Running NPI, NPRI and TRI scrapers at the same time')
+        scraping_concurrently(['3a', '3b', '3c'])
+        return
+
     logger.info(' Running NPI scraper')
-    download_npi()
+    with monitoring('npi_scraper'):
+        download_npi()
 
     logger.info(' Running NPRI scraper')
-    download_npri()
+    with monitoring('npri_scraper'):
+        download_npri()
 
     logger.info(' Running TRI scraper')
-    Scrapper = TRI_Scrapper()
-    Scrapper.extacting_tri_data_files(['3a', '3b', '3c'])
+    with monitoring('tri_scraper'):
+        Scrapper = TRI_Scrapper()
+        Scrapper.extacting_tri_data_files(['3a', '3b', '3c'])
 
 
 if __name__ == '__main__':
 
-    scraper_pipeline()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--concurrent_extraction',
+                        help='Would you like to run the downloads of the PRTR systems at the same time',
+                        choices=['True', 'False'],
+                        type=str,
+                        default='True')
+    adding_profile_arguments(parser, stages=['extract', 'npi_scraper', 'npri_scraper', 'tri_scraper'])
+    args = parser.parse_args()
+
+    try:
+        with profiling_main(args, 'extract'):
+            scraper_pipeline(concurrent=(args.concurrent_extraction == 'True'))
+    finally:
+        reporting_unresolved()
\ No newline at end of file
@@ -6,10 +6,11 @@ This is a Python script written for scraping the website that stored the Nationa
 The NLM is part of the National Institutes of Health (NIH), U.S. Department of Health and Human Services.
 '''
 # Importing libraries
-from data_engineering.extract.common import config
+from data_engineering.extract.common import config, requesting, unresolving
 
 import requests
 
+
 def looking_for_structure_details(cas_number):
     '''
     Function to obtain chemical SMILES from the U.S. NLM
@@ -22,7 +23,7 @@ def looking_for_structure_details(cas_number):
 
     # HTTP request
     try:
-        response = requests.get(f'{url}/{rn_query_string}')
+        response = requesting(f'{url}/{rn_query_string}')
         if response.status_code == 200:
             result = response.json()['results'][0]
             if (not result) or ('structureDetails' not in result.keys()):
@@ -36,6 +37,6 @@ def looking_for_structure_details(cas_number):
             return infomation
         else:
             raise ValueError(f'Error: {response.status_code}')
-    except ValueError as ve:
-        print(f'{ve} for chemical {cas_number} (NLM database)')
+    except (ValueError, requests.exceptions.RequestException) as e:
+        unresolving('NLM', f'SMILES of {cas_number}', e)
         return None
\ No newline at end of file
@@ -8,15 +8,34 @@ Transfer Register (PRTR)
 '''
 
 # Importing libraries
-from data_engineering.extract.common import config
+from data_engineering.extract.common import config, requesting
+from data_engineering.profiling import adding_profile_arguments, profiling_main
 
-import requests
+import argparse
 import pandas as pd
 import os
 
 dir_path = os.path.dirname(os.path.realpath(__file__))
 
 
+def download_npi_resource(url, key, id):
+    '''
+    Function to download a NPI resource (transfers or substances)
+    '''
+
+    # A failed download stops the extraction, since the transformers need the file
+    response = requesting(f'{url}?sql=SELECT * from "{id}"')
+    if response.status_code == 200:
+        json = response.json()
+        result = json['result']
+        records = result['records']
+        df = pd.DataFrame(records)
+        df.to_csv(f'{dir_path}/output/NPI_{key}.csv',
+                index=False)
+    else:
+        raise ValueError(f'Error: NPI {key} returned {response.status_code}')
+
+
 def download_npi():
     '''
     Function to download the NPI transfers file
@@ -27,21 +46,14 @@ def download_npi():
     resource_id = _config['resource_id']
 
     for key, id in resource_id.items():
-
-        try:
-            response = requests.get(f'{url}?sql=SELECT * from "{id}"')
-            if response.status_code == 200:
-                json = response.json()
-                result = json['result']
-                records = result['records']
-                df = pd.DataFrame(records)
-                df.to_csv(f'{dir_path}/output/NPI_{key}.csv',
-                        index=False)
-            else:
-                raise ValueError(f'Error: {response.status_code}')
-        except ValueError as ve:
-            print(ve)
+        download_npi_resource(url, key, id)
 
 
 if __name__ == '__main__':
-    download_npi()
+
+    parser = argparse.ArgumentParser()
+    adding_profile_arguments(parser, stages=['npi_scraper'])
+    args = parser.parse_args()
+
+    with profiling_main(args, 'npi_scraper'):
+        download_npi()
@@ -7,9 +7,12 @@ Inventory (NPRI) data. The NPRI is the Canadian Pollutant Release and Transfer R
 '''
 
 # Importing libraries
-from data_engineering.extract.common import config
+from data_engineering.extract.common import config, opening
+from data_engineering.monitoring import counting
+from data_engineering.profiling import adding_profile_arguments, profiling_main
 
-from urllib.request import Request, urlopen
+from urllib.request import Request
+import argparse
 import os
 import lxml.html as html
 import re
@@ -25,28 +28,30 @@ def retrieving_data(link, filenema_output, get_header):
     Function to fully recover data from NPRI .csv files
     '''
     
-    res = urlopen(Request(link, headers=get_header))
+    res = opening(Request(link, headers=get_header))
     total_length = int(res.headers['Content-Length'])
     mode = 'wb'
     retrieved_length = 0
     data = b''
     while retrieved_length < total_length:
-        with urlopen(Request(link, headers=get_header)) as response:
+        with opening(Request(link, headers=get_header)) as response:
             with open(f'{dir_path}/output/{filenema_output}.csv', mode) as file:
                 while True:
                     chunk = response.read(1024*8)
                     if not chunk:
                         break
                     file.write(chunk)
+                    counting('bytes_in', len(chunk))
                     data += chunk
         mode = 'ab'
         retrieved_length += len(data)
         get_header.update({'Range': f'bytes={retrieved_length + 1}-'})
 
 
-def download_npri():
+def visiting_npri():
     '''
-    Function to download the NPRI transfers file
+    Function to visit the NPRI website and get the link and output
+    filename of each NPRI .csv file
     '''
 
     _config = config()['system']['NPRI']
@@ -54,21 +59,31 @@ def download_npri():
     queries = _config['queries']
     tables = queries['tables']
 
-    try:
-        response = urlopen(Request(url))
-        if response.status == 200:
-            home = response.read().decode('utf-8')
-            parser = html.fromstring(home)
-            links_to_tables = parser.xpath(tables)
-            for link in links_to_tables:
-                filename = re.search(regex, link).group(1)
-                filenema_output = files[filename]
-                retrieving_data(link, filenema_output, headers.copy())
-        else:
-            raise ValueError(f'Error: {response.status_code}')
-    except ValueError as ve:
-        print(ve)
+    # Without the links there is nothing to download, so a failed visit stops the extraction
+    response = opening(Request(url))
+    if response.status == 200:
+        home = response.read().decode('utf-8')
+        parser = html.fromstring(home)
+        links_to_tables = parser.xpath(tables)
+        return {link: files[re.search(regex, link).group(1)] for link in links_to_tables}
+    else:
+        raise ValueError(f'Error: NPRI returned {response.status}')
+
+
+def download_npri():
+    '''
+    Function to download the NPRI transfers file
+    '''
+
+    for link, filenema_output in visiting_npri().items():
+        retrieving_data(link, filenema_output, headers.copy())
 
 
 if __name__ == '__main__':
-    download_npri()
+
+    parser = argparse.ArgumentParser()
+    adding_profile_arguments(parser, stages=['npri_scraper'])
+    args = parser.parse_args()
+
+    with profiling_main(args, 'npri_scraper'):
+        download_npri()
@@ -6,11 +6,12 @@ This is a Python script written for scraping the website that stored the PubChem
 '''
 
 # Importing libraries
-from data_engineering.extract.common import config
+from data_engineering.extract.common import config, requesting, unresolving
 
 import requests
 
 
+
 def processing_json(response):
     '''
     Function to process response from the HTTP requests
@@ -42,17 +43,17 @@ def looking_for_structure_details(cas_number):
 
     # HTTP request
     try:
-        response = requests.get(f'{url}/{rn_query_string}')
+        response = requesting(f'{url}/{rn_query_string}')
         if response.status_code == 200:
             return processing_json(response)
         elif response.status_code == 404:
-            response = requests.get(f'{url}/{registry_id_query_string}')
+            response = requesting(f'{url}/{registry_id_query_string}')
             if response.status_code == 200:
                 return processing_json(response)
             else:
                 raise ValueError(f'Error: {response.status_code}')
         else:
             raise ValueError(f'Error: {response.status_code}')
-    except ValueError as ve:
-        print(f'{ve} for chemical {cas_number} (PubChem database)')
+    except (ValueError, requests.exceptions.RequestException) as e:
+        unresolving('PubChem', f'SMILES of {cas_number}', e)
         return None
\ No newline at end of file
@@ -8,10 +8,15 @@ Registry Services (SRS) data. The SRS is the U.S. Environmental Protection Agenc
 '''
 
 # Importing libraries
-from data_engineering.extract.common import config
+from data_engineering.extract.common import config, requesting, unresolving
+from data_engineering.progress import progressing
 
 import requests
 
+# Names found for each CAS number in the run (None if SRS does not have it). The
+# failed lookups are not kept, so they are tried again (e.g., after a cooldown)
+_generic_names = {}
+
 def get_cas_by_alternative_id(altId='N230',
                             altIdType='22',
                             substanceName='Certain glycol ethers'):
@@ -27,18 +32,20 @@ def get_cas_by_alternative_id(altId='N230',
 
     # HTTP request
     try:
-        response = requests.get(f'{url}/{id_query_string}')
+        response = requesting(f'{url}/{id_query_string}')
         if response.status_code == 200:
             json = response.json()
             if not json:
-                result = get_cas_by_name(**{'name_query_string': name_query_string})
+                result = get_cas_by_name(**{'name_query_string': name_query_string,
+                                            'substanceName': substanceName})
             else:
                 result = json[0]['currentCasNumber']
             return result
         else:
             raise ValueError(f'Error: {response.status_code}')
-    except ValueError as ve:
-        print(ve)
+    except (ValueError, requests.exceptions.RequestException) as e:
+        unresolving('SRS', f'CAS number of {altId} ({substanceName})', e)
+        return None
 
 
 def get_cas_by_name(**kwargs):
@@ -56,7 +63,7 @@ def get_cas_by_name(**kwargs):
     
     # HTTP request
     try:
-        response = requests.get(f'{url}/{name_query_string}')
+        response = requesting(f'{url}/{name_query_string}')
         if response.status_code == 200:
             json = response.json()
             if not json:
@@ -66,15 +73,19 @@ def get_cas_by_name(**kwargs):
             return result
         else:
             raise ValueError(f'Error: {response.status_code}')
-    except ValueError as ve:
-        print(ve)
+    except (ValueError, requests.exceptions.RequestException) as e:
+        unresolving('SRS', f'CAS number of {kwargs.get("substanceName", name_query_string)}', e)
+        return None
 
 
 def get_generic_name_by_cas(casNum='1336-36-3'):
     '''
     Function to get name by cas number
     '''
-    
+
+    if casNum in _generic_names.keys():
+        return _generic_names[casNum]
+
     # Calling configuration
     _config = config()['system']['SRS']
     url = _config['url']
@@ -82,15 +93,31 @@ def get_generic_name_by_cas(casNum='1336-36-3'):
 
     # HTTP request
     try:
-        response = requests.get(f'{url}/{cas_query_string}')
+        response = requesting(f'{url}/{cas_query_string}')
         if response.status_code == 200:
             json = response.json()
             if not json:
                 result = None
             else:
                 result = json[0]['systematicName']
+            _generic_names[casNum] = result
             return result
         else:
             raise ValueError(f'Error: {response.status_code}')
-    except ValueError as ve:
-        print(ve)
\ No newline at end of file
+    except (ValueError, requests.exceptions.RequestException) as e:
+        unresolving('SRS', f'Name of {casNum}', e)
+        return None
+
+
+def get_generic_names_by_cas(cas_numbers):
+    '''
+    Function to get the names for many CAS numbers in one pass. Each unique CAS number
+    is searched only once (the names found are kept for the whole run) and missing CAS
+    numbers are not searched
+    '''
+
+    unique_cas_numbers = dict.fromkeys(cas for cas in cas_numbers if cas)
+    names = {casNum: get_generic_name_by_cas(casNum=casNum)
+             for casNum in progressing(unique_cas_numbers, 'Generic names (SRS)')}
+
+    return names
\ No newline at end of file
@@ -7,10 +7,12 @@ data. The TRI is the US Pollutant Release and Transfer Register (PRTR)
 '''
 
 # Importing libraries
-from data_engineering.extract.common import config
+from data_engineering.extract.common import config, requesting
+from data_engineering.monitoring import monitoring
+from data_engineering.profiling import adding_profile_arguments, profiling_main
 
+import argparse
 import os
-import requests
 import lxml.html as html
 import re
 import pandas as pd
@@ -34,21 +36,19 @@ class TRI_Scrapper:
 
         regex = re.compile(r'https://.*/US_([0-9]{4}).zip')
 
-        try:
-            response = requests.get(self._url)
-            if response.status_code == 200:
-                home = response.content.decode('utf-8')
-                parser = html.fromstring(home)
-                links = parser.xpath(self._queries['options'])
-                zip_urls = dict()
-                for link in links:
-                   year = re.search(regex, link).group(1)
-                   zip_urls.update({year: link})
-                return zip_urls
-            else:
-                raise ValueError(f'Error: {response.status_code}')
-        except ValueError as ve:
-            print(ve)
+        # Without the links there is nothing to download, so a failed visit stops the extraction
+        response = requesting(self._url)
+        if response.status_code == 200:
+            home = response.content.decode('utf-8')
+            parser = html.fromstring(home)
+            links = parser.xpath(self._queries['options'])
+            zip_urls = dict()
+            for link in links:
+               year = re.search(regex, link).group(1)
+               zip_urls.update({year: link})
+            return zip_urls
+        else:
+            raise ValueError(f'Error: TRI returned {response.status_code}')
     
 
     def _calling_tri_columns(self, key):
@@ -63,20 +63,33 @@ class TRI_Scrapper:
         return columns            
 
 
-    def extacting_tri_data_files(self, keys):
+    def calling_zip_urls(self):
         '''
-        Method for extracting information for each TRI file by year
+        Method for calling the URL of the zip file of each TRI year
+        '''
+
+        return self._visit()
+
+
+    def calling_tri_columns(self, keys):
+        '''
+        Method for calling the column names of the TRI files
         '''
 
-        # Calling the file sorted column names
         colum_names = dict()
         for key in keys:
             colum_names.update({key: self._calling_tri_columns(key)})
 
-        # Unzipping and organizing the TRI files
-        zip_urls = self._visit()
-        for year, zip_url in zip_urls.items():
-            zip_file = requests.get(zip_url)
+        return colum_names
+
+
+    def extracting_tri_year(self, year, zip_url, keys, colum_names):
+        '''
+        Method for extracting information for each TRI file of a year
+        '''
+
+        with monitoring(f'tri_scraper {year}'):
+            zip_file = requesting(zip_url)
             for key in keys:
                 if (key == '3a') or ((key == '3b') and (int(year) <= 2010)) or ((key == '3c') and (int(year) >= 2011)):
                     with zipfile.ZipFile(io.BytesIO(zip_file.content)) as z_file:
@@ -98,10 +111,39 @@ class TRI_Scrapper:
                     while not existing:
                         existing = os.path.exists(f'{self._dir_path}/output/US_{key}_{year}.csv')
                     os.remove(f'{self._dir_path}/output/US_{key}_{year}.txt')
+
+
+    def extracting_tri_years(self, keys):
+        '''
+        Method for extracting information for each TRI file by year. Each year
+        is yielded as soon as its files are written
+        '''
+
+        # Calling the file sorted column names
+        colum_names = self.calling_tri_columns(keys)
+
+        # Unzipping and organizing the TRI files
+        zip_urls = self.calling_zip_urls()
+        for year, zip_url in zip_urls.items():
+            self.extracting_tri_year(year, zip_url, keys, colum_names)
+            yield int(year)
+
+
+    def extacting_tri_data_files(self, keys):
+        '''
+        Method for extracting information for each TRI file by year
+        '''
+
+        for _ in self.extracting_tri_years(keys):
+            pass
         
 
 if __name__ == '__main__':
 
+    parser = argparse.ArgumentParser()
+    adding_profile_arguments(parser, stages=['tri_scraper'])
+    args = parser.parse_args()
 
-    Scrapper = TRI_Scrapper()
-    Scrapper.extacting_tri_data_files(['3a', '3b', '3c'])
\ No newline at end of file
+    with profiling_main(args, 'tri_scraper'):
+        Scrapper = TRI_Scrapper()
+        Scrapper.extacting_tri_data_files(['3a', '3b', '3c'])
\ No newline at end of file
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for building the summary tables and the reporting view of
+the PRTR_transfers database at load time. The summary tables keep the transfer totals and
+the amount-weighted reliability by country, year, transfer class, sector and substance,
+so the figures and dashboards read a few thousand records instead of the transfer records.
+'''
+
+# Importing libraries
+from sqlalchemy import MetaData, Table, Column, Index, Integer, String, Float, DateTime
+from sqlalchemy import select, delete, func
+
+import time
+import logging
+
+logger = logging.getLogger(' Data engineering --> Load')
+
+metadata = MetaData()
+
+transfer_summary = Table('transfer_summary', metadata,
+                         Column('country', String(3)),
+                         Column('reporting_year', Integer()),
+                         Column('generic_transfer_class_id', String(3)),
+                         Column('generic_sector_code', Integer()),
+                         Column('generic_substance_id', String(20)),
+                         Column('transfer_amount_kg', Float()),
+                         Column('weighted_reliability_score', Float()),
+                         Column('number_of_records', Integer()),
+                         Column('created_at', DateTime(), server_default=func.current_timestamp()),
+                         Index('ix_transfer_summary_year_country', 'reporting_year', 'country'),
+                         Index('ix_transfer_summary_substance', 'generic_substance_id'))
+
+transfer_class_summary = Table('transfer_class_summary', metadata,
+                               Column('country', String(3)),
+                               Column('reporting_year', Integer()),
+                               Column('generic_transfer_class_id', String(3)),
+                               Column('transfer_amount_kg', Float()),
+                               Column('weighted_reliability_score', Float()),
+                               Column('number_of_records', Integer()),
+                               Column('created_at', DateTime(), server_default=func.current_timestamp()))
+
+summary_tables = [transfer_summary, transfer_class_summary]
+
+report_view = 'transfer_record_report'
+
+
+def report_select(tables):
+    '''
+    Function to get the denormalized transfer records (one row per record with the
+    names of its country, sector, substance and transfer class)
+    '''
+
+    record = tables['transfer_record']
+    ngs = tables['national_generic_substance']
+    substance = tables['generic_substance']
+    national_substance = tables['national_substance']
+    prtr_system = tables['prtr_system']
+    facility = tables['facility']
+    ngsector = tables['national_generic_sector']
+    sector = tables['generic_sector']
+    ngtc = tables['national_generic_transfer_class']
+    transfer_class = tables['generic_transfer_class']
+
+    return select(record.c.transfer_record_id,
+                  record.c.reporting_year,
+                  prtr_system.c.country,
+                  prtr_system.c.prtr_system,
+                  facility.c.national_facility_id,
+                  sector.c.generic_sector_code,
+                  sector.c.generic_sector_name,
+                  substance.c.generic_substance_id,
+                  substance.c.generic_substance_name,
+                  substance.c.cas_number,
+                  transfer_class.c.generic_transfer_class_id,
+                  transfer_class.c.generic_transfer_class_name,
+                  transfer_class.c.transfer_class_wm_hierarchy_name,
+                  record.c.transfer_amount_kg,
+                  record.c.reliability_score)\
+        .select_from(
+            record
+            .join(ngs, record.c.national_generic_substance_id == ngs.c.national_generic_substance_id)
+            .join(substance, ngs.c.generic_substance_id == substance.c.generic_substance_id)
+            .join(national_substance, ngs.c.national_substance_prtr_system_id == national_substance.c.national_substance_prtr_system_id)
+            .join(prtr_system, national_substance.c.prtr_system == prtr_system.c.prtr_system)
+            .join(facility, record.c.national_facility_and_generic_sector_id == facility.c.national_facility_and_generic_sector_id)
+            .join(ngsector, facility.c.national_generic_sector_id == ngsector.c.national_generic_sector_id)
+            .join(sector, ngsector.c.generic_sector_code == sector.c.generic_sector_code)
+            .join(ngtc, record.c.national_generic_transfer_class_id == ngtc.c.national_generic_transfer_class_id)
+            .join(transfer_class, ngtc.c.generic_transfer_class_id == transfer_class.c.generic_transfer_class_id)
+            )
+
+
+def weighted_reliability(amount, score):
+    '''
+    Function to get the reliability score weighted by the transferred amount
+    '''
+
+    return func.sum(amount * score) / func.nullif(func.sum(amount), 0)
+
+
+def building_summaries(tables, Engine):
+    '''
+    Function to build (or refresh) the summary tables in a single transaction
+    '''
+
+    start = time.perf_counter()
+    report = report_select(tables).subquery()
+    keys = ['country', 'reporting_year', 'generic_transfer_class_id',
+            'generic_sector_code', 'generic_substance_id']
+    values = ['transfer_amount_kg', 'weighted_reliability_score', 'number_of_records']
+    with Engine.begin() as connection:
+        for table in summary_tables:
+            table.create(connection, checkfirst=True)
+            connection.execute(delete(table))
+
+        connection.execute(transfer_summary.insert().from_select(
+            keys + values,
+            select(*[report.c[key] for key in keys],
+                   func.sum(report.c.transfer_amount_kg),
+                   weighted_reliability(report.c.transfer_amount_kg, report.c.reliability_score),
+                   func.count())
+            .group_by(*[report.c[key] for key in keys])
+            ))
+
+        # The coarser summary comes from the finer one
+        keys = ['country', 'reporting_year', 'generic_transfer_class_id']
+        connection.execute(transfer_class_summary.insert().from_select(
+            keys + values,
+            select(*[transfer_summary.c[key] for key in keys],
+                   func.sum(transfer_summary.c.transfer_amount_kg),
+                   func.sum(transfer_summary.c.transfer_amount_kg * transfer_summary.c.weighted_reliability_score) /
+                   func.nullif(func.sum(transfer_summary.c.transfer_amount_kg), 0),
+                   func.sum(transfer_summary.c.number_of_records))
+            .group_by(*[transfer_summary.c[key] for key in keys])
+            ))
+    elapsed = time.perf_counter() - start
+
+    logger.info(f' Summary tables built in {elapsed:.2f} s')
+
+
+def report_definition(tables, dialect):
+    '''
+    Function to get the SELECT statement of the reporting view for a dialect
+    '''
+
+    return str(report_select(tables).compile(dialect=dialect,
+                                             compile_kwargs={'literal_binds': True}))
+
+
+def replacing_report_view(tables, connection):
+    '''
+    Function to create (or replace) the reporting view in the transaction of a connection
+    '''
+
+    definition = report_definition(tables, connection.dialect)
+    if connection.dialect.name == 'mysql':
+        connection.exec_driver_sql(f'CREATE OR REPLACE VIEW {report_view} AS {definition}')
+    else:
+        # DDL is transactional, and the columns of the view may change their types
+        connection.exec_driver_sql(f'DROP VIEW IF EXISTS {report_view}')
+        connection.exec_driver_sql(f'CREATE VIEW {report_view} AS {definition}')
+
+
+def creating_report_view(tables, Engine):
+    '''
+    Function to create (or replace) the reporting view
+    '''
+
+    with Engine.begin() as connection:
+        replacing_report_view(tables, connection)
+
+
+def dropping_report_view(Engine):
+    '''
+    Function to drop the reporting view (PostgreSQL does not drop the tables used by a view)
+    '''
+
+    with Engine.begin() as connection:
+        connection.exec_driver_sql(f'DROP VIEW IF EXISTS {report_view}')
@@ -6,8 +6,10 @@ from sqlalchemy_utils import database_exists, create_database
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
+import os
 
 Base = declarative_base()
+dir_path = os.path.dirname(os.path.realpath(__file__)) # current directory path
 
 
 def create_engine_session(password,
@@ -22,16 +24,21 @@ def create_engine_session(password,
 
     if rdbms == 'mysql':
         url = f'{rdbms}+pymysql://{username}:{password}@{host}:{port}/{db_name}?charset=utf8mb4'
-    else:
+    elif rdbms == 'postgresql':
         url = f'{rdbms}+psycopg2://{username}:{password}@{host}:{port}/{db_name}'
+    else:
+        url = f'sqlite:///{dir_path}/output/{db_name}.db'
 
     if not database_exists(url):
         create_database(url)
 
     if rdbms == 'mysql':
-        Engine = create_engine(url)
-    else:
+        # local_infile allows the bulk load with LOAD DATA LOCAL INFILE
+        Engine = create_engine(url, connect_args={'local_infile': True})
+    elif rdbms == 'postgresql':
         Engine = create_engine(url, client_encoding='utf8')
+    else:
+        Engine = create_engine(url)
 
 
     Session = sessionmaker(bind=Engine)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for the blue/green load of the PRTR_transfers database.
+The tables are loaded into a staging schema (PostgreSQL), a staging database (MySQL) or a
+staging file (SQLite), validated there, and swapped in at once, so the readers of the live
+database never see empty or half-loaded tables and a failed load leaves them untouched.
+'''
+
+# Importing libraries
+from data_engineering.load.base import create_engine_session
+
+from sqlalchemy import select, func, inspect
+from sqlalchemy.orm import sessionmaker
+
+import os
+import logging
+
+logger = logging.getLogger(' Data engineering --> Load')
+
+
+def staging_target(Engine, password, rdbms, username, host, port, db_name):
+    '''
+    Function to get the engine and session that write into the staging area
+    '''
+
+    if rdbms == 'sqlite':
+        Target, Session = create_engine_session(password,
+                                rdbms=rdbms,
+                                username=username,
+                                host=host,
+                                port=port,
+                                db_name=f'{db_name}_staging')
+        return Target, Session
+
+    staging = staging_name(rdbms, db_name)
+    quote = Engine.dialect.identifier_preparer.quote
+    with Engine.begin() as connection:
+        if rdbms == 'mysql':
+            connection.exec_driver_sql(f'CREATE DATABASE IF NOT EXISTS {quote(staging)} CHARACTER SET utf8mb4')
+        else:
+            connection.exec_driver_sql(f'CREATE SCHEMA IF NOT EXISTS {quote(staging)}')
+
+    # The tables without schema are written into the staging schema
+    Target = Engine.execution_options(schema_translate_map={None: staging})
+    Session = sessionmaker(bind=Target)
+
+    return Target, Session
+
+
+def staging_name(rdbms, db_name):
+    '''
+    Function to get the name of the staging schema (PostgreSQL) or database (MySQL)
+    '''
+
+    if rdbms == 'mysql':
+        return f'{db_name}_staging'
+    else:
+        return 'staging'
+
+
+def partition_names(connection, schema, table_name):
+    '''
+    Function to get the partitions of a PostgreSQL table (compact schema), which
+    do not move with their table to another schema
+    '''
+
+    return [row[0] for row in connection.exec_driver_sql(
+        '''SELECT child.relname
+           FROM pg_inherits
+           JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+           JOIN pg_class AS parent ON parent.oid = pg_inherits.inhparent
+           JOIN pg_namespace ON pg_namespace.oid = parent.relnamespace
+           WHERE pg_namespace.nspname = %(schema)s AND parent.relname = %(table)s''',
+        {'schema': schema, 'table': table_name}
+        ).fetchall()]
+
+
+def validating_load(tables, expected, Target):
+    '''
+    Function to check the number of records of each staged table and that
+    every foreign key refers to an existing record
+    '''
+
+    with Target.connect() as connection:
+        for name, table in tables.items():
+            n_records = connection.execute(select(func.count()).select_from(table)).scalar()
+            if n_records != expected[name]:
+                raise ValueError(f'Error: {name} has {n_records} records but {expected[name]} were loaded')
+
+            for fk in table.foreign_keys:
+                parent = fk.column.table
+                orphans = connection.execute(
+                    select(func.count())
+                    .select_from(table.outerjoin(parent, fk.parent == fk.column))
+                    .where(fk.parent.isnot(None), fk.column.is_(None))
+                    ).scalar()
+                if orphans:
+                    raise ValueError(f'Error: {orphans} records of {name} refer to missing records of {parent.name}')
+
+    logger.info(' The staged tables passed the validation')
+
+
+def swapping(tables, Engine, Target, rdbms, db_name, replacing_views=None):
+    '''
+    Function to swap the staged tables into the live database in a single step.
+    replacing_views(connection) creates the views on the swapped tables in the same
+    step (PostgreSQL views follow their tables into the retired schema, which is dropped)
+    '''
+
+    if rdbms == 'sqlite':
+        # The views go with the staged file
+        if replacing_views is not None:
+            with Target.begin() as connection:
+                replacing_views(connection)
+        # Replacing the file is atomic, and open connections keep reading the old one
+        live, staged = Engine.url.database, Target.url.database
+        Target.dispose()
+        Engine.dispose()
+        os.replace(staged, live)
+        logger.info(f' The staged tables were swapped into {db_name}')
+        return
+
+    quote = Engine.dialect.identifier_preparer.quote
+    staging = staging_name(rdbms, db_name)
+    with Engine.begin() as connection:
+        live = connection.dialect.default_schema_name
+        existing = set(inspect(connection).get_table_names())
+        if rdbms == 'mysql':
+            retired = f'{db_name}_retired'
+            connection.exec_driver_sql(f'DROP DATABASE IF EXISTS {quote(retired)}')
+            connection.exec_driver_sql(f'CREATE DATABASE {quote(retired)}')
+            # A single RENAME TABLE statement is atomic
+            renames = [f'{quote(live)}.{quote(table.name)} TO {quote(retired)}.{quote(table.name)}'
+                       for table in tables if table.name in existing]
+            renames += [f'{quote(staging)}.{quote(table.name)} TO {quote(live)}.{quote(table.name)}'
+                        for table in tables]
+            connection.exec_driver_sql(f'RENAME TABLE {", ".join(renames)}')
+        else:
+            retired = 'retired'
+            # DDL is transactional in PostgreSQL, so the swap commits at once
+            connection.exec_driver_sql(f'DROP SCHEMA IF EXISTS {quote(retired)} CASCADE')
+            connection.exec_driver_sql(f'CREATE SCHEMA {quote(retired)}')
+            for table in tables:
+                if table.name in existing:
+                    for name in [table.name] + partition_names(connection, live, table.name):
+                        connection.exec_driver_sql(f'ALTER TABLE {quote(live)}.{quote(name)} SET SCHEMA {quote(retired)}')
+                for name in [table.name] + partition_names(connection, staging, table.name):
+                    connection.exec_driver_sql(f'ALTER TABLE {quote(staging)}.{quote(name)} SET SCHEMA {quote(live)}')
+        if replacing_views is not None:
+            replacing_views(connection)
+
+    with Engine.begin() as connection:
+        if rdbms == 'mysql':
+            connection.exec_driver_sql(f'DROP DATABASE IF EXISTS {quote(retired)}')
+        else:
+            connection.exec_driver_sql(f'DROP SCHEMA IF EXISTS {quote(retired)} CASCADE')
+
+    logger.info(f' The staged tables were swapped into {db_name}')
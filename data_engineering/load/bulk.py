@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for bulk loading the tables of the PRTR_transfers database.
+PostgreSQL uses COPY FROM STDIN, MySQL uses LOAD DATA LOCAL INFILE (batched multi-row
+inserts if the server does not allow it), and other RDBMSs use batched inserts through the
+SQLAlchemy Core.
+'''
+
+# Importing libraries
+from data_engineering.monitoring import counting
+
+from sqlalchemy import Integer
+
+import os
+import io
+import time
+import tempfile
+import logging
+import pandas as pd
+from datetime import datetime
+
+logger = logging.getLogger(' Data engineering --> Load')
+
+
+def preparing_records(df, table):
+    '''
+    Function to keep only the table columns and give the values
+    that are not in the files (e.g., created_at)
+    '''
+
+    df = df[[col.name for col in table.columns if col.name in df.columns]].copy()
+    # created_at is left to the server if it has a server default (compact schema)
+    if ('created_at' in table.columns.keys()) and ('created_at' not in df.columns)\
+            and (table.c.created_at.server_default is None):
+        df['created_at'] = datetime.now()
+
+    # Integer columns having missing values must not be written as floats (e.g., 12.0)
+    for col in table.columns:
+        if (col.name in df.columns) and isinstance(getattr(col.type, 'impl', col.type), Integer):
+            df[col.name] = pd.to_numeric(df[col.name]).astype('Int64')
+
+    return df
+
+
+def batching(df, batch_size):
+    '''
+    Function to split a table into batches of rows
+    '''
+
+    for start in range(0, df.shape[0], batch_size):
+        yield df.iloc[start:start + batch_size]
+
+
+def qualified_name(table, connection):
+    '''
+    Function to get the table name including the schema, if any
+    '''
+
+    schema = connection.schema_for_object(table)
+    if schema:
+        return f'{schema}.{table.name}'
+    else:
+        return table.name
+
+
+def copying_postgresql(df, table, connection, batch_size):
+    '''
+    Function to load a table into PostgreSQL with COPY FROM STDIN
+    '''
+
+    cols = ', '.join(df.columns)
+    statement = f"COPY {qualified_name(table, connection)} ({cols}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    cursor = connection.connection.cursor()
+    for df_batch in batching(df, batch_size):
+        buffer = io.StringIO()
+        df_batch.to_csv(buffer, index=False, header=False, na_rep='\\N')
+        buffer.seek(0)
+        cursor.copy_expert(statement, buffer)
+    cursor.close()
+
+
+def loading_data_mysql(df, table, connection, batch_size):
+    '''
+    Function to load a table into MySQL with LOAD DATA LOCAL INFILE
+    '''
+
+    # Backslashes are the escape character for LOAD DATA
+    df = df.copy()
+    for col in df.select_dtypes(include='object').columns:
+        df[col] = df[col].where(pd.isnull(df[col]), df[col].astype(str).str.replace('\\', '\\\\', regex=False))
+
+    cols = ', '.join(df.columns)
+    for df_batch in batching(df, batch_size):
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False,
+                                         encoding='utf-8', newline='') as file:
+            df_batch.to_csv(file, index=False, header=False, na_rep='\\N')
+        path = file.name.replace('\\', '/')
+        statement = f"""LOAD DATA LOCAL INFILE '{path}'
+                        INTO TABLE {qualified_name(table, connection)}
+                        CHARACTER SET utf8mb4
+                        FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+                        LINES TERMINATED BY '\\n'
+                        ({cols})"""
+        try:
+            connection.exec_driver_sql(statement)
+        finally:
+            os.remove(file.name)
+
+
+def inserting_records(df, table, connection, batch_size):
+    '''
+    Function to load a table with batched inserts (executemany) through the SQLAlchemy Core
+    '''
+
+    for df_batch in batching(df, batch_size):
+        records = df_batch.astype(object).where(pd.notnull(df_batch), None).to_dict('records')
+        connection.execute(table.insert(), records)
+
+
+def loading_records(df, table, connection, batch_size=10000):
+    '''
+    Function to load the records on an open connection using the fastest path
+    available for the RDBMS
+    '''
+
+    dialect = connection.dialect
+    if (dialect.name == 'postgresql') and (dialect.driver == 'psycopg2'):
+        copying_postgresql(df, table, connection, batch_size)
+    elif dialect.name == 'mysql':
+        try:
+            with connection.begin_nested():
+                loading_data_mysql(df, table, connection, batch_size)
+        except Exception as e:
+            logger.warning(f' LOAD DATA LOCAL INFILE is not available ({e}). Using batched inserts for {table.name}')
+            inserting_records(df, table, connection, batch_size)
+    else:
+        inserting_records(df, table, connection, batch_size)
+
+
+def bulk_loading(df, table, Engine, batch_size=10000):
+    '''
+    Function to bulk load a table using the fastest path available for the RDBMS
+    '''
+
+    df = preparing_records(df, table)
+
+    start = time.perf_counter()
+    with Engine.begin() as connection:
+        loading_records(df, table, connection, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+
+    rate = df.shape[0] / elapsed if elapsed > 0 else float('inf')
+    counting('rows_out', df.shape[0])
+    logger.info(f' {df.shape[0]} records loaded into {table.name} in {elapsed:.2f} s ({rate:.0f} records/s)')
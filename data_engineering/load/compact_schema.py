@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for building a compact variant of the PRTR_transfers schema:
+small integer types for the reporting years and reliability scores, created_at filled by the
+server when each record is inserted, and (PostgreSQL) transfer_record partitioned by range of
+reporting_year, so the queries filtering years only scan their partitions.
+'''
+
+# Importing libraries
+from data_engineering.load.bulk import qualified_name
+
+from sqlalchemy import MetaData, Table, Column, ForeignKey, Index, SmallInteger, func
+from sqlalchemy.dialects import mysql
+
+# Compact types by column name
+compact_types = {'reporting_year': SmallInteger(),
+                 'reliability_score': SmallInteger().with_variant(mysql.TINYINT(unsigned=True), 'mysql')}
+
+
+def compact_column(col, primary_key=False):
+    '''
+    Function to copy a column with its compact type and defaults
+    '''
+
+    foreign_keys = [ForeignKey(fk.target_fullname,
+                               ondelete=fk.ondelete,
+                               onupdate=fk.onupdate) for fk in col.foreign_keys]
+    kwargs = {'primary_key': col.primary_key or primary_key,
+              'nullable': col.nullable and not primary_key,
+              'unique': col.unique,
+              'autoincrement': col.autoincrement}
+    if col.name == 'created_at':
+        # Evaluated by the server for each record, not once when the module is imported
+        kwargs['server_default'] = func.current_timestamp()
+
+    return Column(col.name, compact_types.get(col.name, col.type), *foreign_keys, **kwargs)
+
+
+def compacting_tables(tables, partitioning=False):
+    '''
+    Function to get a copy of the tables (name: SQLAlchemy table) with the compact schema.
+    With partitioning, transfer_record is partitioned by range of reporting_year (PostgreSQL),
+    which needs reporting_year in its primary key
+    '''
+
+    metadata = MetaData()
+    compact = {}
+    for name, table in tables.items():
+        kwargs = {}
+        partitioned = partitioning and (table.name == 'transfer_record')
+        if partitioned:
+            kwargs['postgresql_partition_by'] = 'RANGE (reporting_year)'
+        cols = [compact_column(col, primary_key=(partitioned and col.name == 'reporting_year'))
+                for col in table.columns]
+        compact_table = Table(table.name, metadata, *cols, **kwargs)
+        for index in table.indexes:
+            Index(index.name, *[compact_table.c[col.name] for col in index.columns])
+        compact[name] = compact_table
+
+    return compact
+
+
+def is_partitioned(table):
+    '''
+    Function to know if a table is partitioned in PostgreSQL
+    '''
+
+    return bool(table.dialect_options['postgresql']['partition_by'])
+
+
+def creating_partitions(table, years, Engine):
+    '''
+    Function to create a partition per reporting year (if it does not exist yet) and a
+    default partition for the years without one
+    '''
+
+    if (Engine.dialect.name != 'postgresql') or not is_partitioned(table):
+        return
+
+    with Engine.begin() as connection:
+        parent = qualified_name(table, connection)
+        schema = connection.schema_for_object(table)
+        prefix = f'{schema}.' if schema else ''
+        connection.exec_driver_sql(f'CREATE TABLE IF NOT EXISTS {prefix}{table.name}_default PARTITION OF {parent} DEFAULT')
+        for year in sorted(set(int(year) for year in years)):
+            connection.exec_driver_sql(f'''CREATE TABLE IF NOT EXISTS {prefix}{table.name}_y{year}
+                                           PARTITION OF {parent}
+                                           FOR VALUES FROM ({year}) TO ({year + 1})''')
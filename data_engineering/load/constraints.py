@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for deferring the foreign keys and secondary indexes of the
+PRTR_transfers database until the tables are loaded. Building them once over the loaded
+tables is cheaper than checking and updating them for each inserted record.
+'''
+
+# Importing libraries
+from data_engineering.load.bulk import qualified_name
+
+from sqlalchemy.schema import CreateTable, AddConstraint
+
+import time
+import logging
+
+logger = logging.getLogger(' Data engineering --> Load')
+
+
+def creating_table(table, Engine):
+    '''
+    Function to create a table without its secondary indexes and foreign keys.
+    SQLite cannot add foreign keys to existing tables, but it does not check them while loading
+    '''
+
+    if Engine.dialect.name == 'sqlite':
+        include_foreign_key_constraints = None
+    else:
+        include_foreign_key_constraints = []
+
+    with Engine.begin() as connection:
+        if not Engine.dialect.has_table(connection, table.name,
+                                        schema=connection.schema_for_object(table)):
+            connection.execute(CreateTable(table,
+                            include_foreign_key_constraints=include_foreign_key_constraints))
+
+
+def building_constraints(tables, Engine):
+    '''
+    Function to build the secondary indexes and to add (and so validate) the foreign keys
+    after loading the tables
+    '''
+
+    start = time.perf_counter()
+    with Engine.begin() as connection:
+        # The indexes go first so they can be used while validating the foreign keys
+        for table in tables:
+            for index in table.indexes:
+                index.create(connection)
+
+        for table in tables:
+            if Engine.dialect.name == 'sqlite':
+                violations = connection.exec_driver_sql(f'PRAGMA foreign_key_check({table.name})').fetchall()
+                if violations:
+                    raise ValueError(f'Error: {len(violations)} records of {table.name} do not meet the foreign keys')
+            else:
+                for constraint in table.foreign_key_constraints:
+                    connection.execute(AddConstraint(constraint))
+    elapsed = time.perf_counter() - start
+
+    logger.info(f' Indexes and foreign keys built in {elapsed:.2f} s')
+
+
+def analyzing(tables, Engine):
+    '''
+    Function to update the statistics used by the query planner
+    '''
+
+    with Engine.begin() as connection:
+        if Engine.dialect.name == 'sqlite':
+            connection.exec_driver_sql('ANALYZE')
+        elif Engine.dialect.name == 'mysql':
+            names = ', '.join(qualified_name(table, connection) for table in tables)
+            connection.exec_driver_sql(f'ANALYZE TABLE {names}')
+        else:
+            for table in tables:
+                connection.exec_driver_sql(f'ANALYZE {qualified_name(table, connection)}')
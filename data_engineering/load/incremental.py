@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for the incremental load of the PRTR_transfers database.
+The incoming records are staged in a temporary table and upserted on the table keys
+(ON CONFLICT for PostgreSQL and SQLite, ON DUPLICATE KEY for MySQL), while the transfer
+records are only replaced for the reporting years and PRTR systems being refreshed.
+'''
+
+# Importing libraries
+from data_engineering.monitoring import counting
+from data_engineering.load.bulk import preparing_records, loading_records
+
+from sqlalchemy import MetaData, Table, Column, select, delete, true
+from sqlalchemy.dialects import postgresql, mysql, sqlite
+
+import time
+import logging
+import pandas as pd
+
+logger = logging.getLogger(' Data engineering --> Load')
+
+dialect_inserts = {'postgresql': postgresql.insert,
+                   'mysql': mysql.insert,
+                   'sqlite': sqlite.insert}
+
+
+def staging_table(table, connection):
+    '''
+    Function to create a temporary table with the columns of table (without constraints).
+    Temporary tables do not end the open transaction in MySQL
+    '''
+
+    staging = Table(f'{table.name}_staging', MetaData(),
+                    *[Column(col.name, col.type) for col in table.columns],
+                    prefixes=['TEMPORARY'])
+    staging.create(connection)
+
+    return staging
+
+
+def conflict_keys(table, cols):
+    '''
+    Function to get the key of the table for the upsert: the primary key if the
+    records bring it, or else the unique columns (e.g., prtr_system)
+    '''
+
+    keys = [col.name for col in table.primary_key.columns]
+    if not set(keys) <= set(cols):
+        keys = [col.name for col in table.columns if col.unique]
+    if not keys:
+        raise ValueError(f'Error: table {table.name} does not have a key for the upsert')
+
+    return keys
+
+
+def upserting(table, staging, cols, connection):
+    '''
+    Function to insert the staged records, updating those whose key is already in the table
+    '''
+
+    dialect = connection.dialect.name
+    if dialect not in dialect_inserts.keys():
+        raise ValueError(f'Error: the incremental load is not supported for {dialect}')
+
+    keys = conflict_keys(table, cols)
+    updates = [col for col in cols if (col not in keys) and (col != 'created_at')]
+
+    # SQLite needs a WHERE clause for telling the upsert from a join in INSERT ... SELECT
+    statement = dialect_inserts[dialect](table).from_select(
+        cols,
+        select(*[staging.c[col] for col in cols]).where(true())
+        )
+    if dialect == 'mysql':
+        updates = updates or keys
+        statement = statement.on_duplicate_key_update(
+            {col: statement.inserted[col] for col in updates}
+            )
+    elif updates:
+        statement = statement.on_conflict_do_update(
+            index_elements=keys,
+            set_={col: statement.excluded[col] for col in updates}
+            )
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=keys)
+    connection.execute(statement)
+
+
+def attaching_prtr_system(df, df_national_generic_substance, df_national_substance):
+    '''
+    Function to get the PRTR system of each transfer record through its substance
+    '''
+
+    systems = pd.merge(df_national_generic_substance[['national_generic_substance_id',
+                                                      'national_substance_prtr_system_id']],
+                       df_national_substance[['national_substance_prtr_system_id',
+                                              'prtr_system']],
+                       on='national_substance_prtr_system_id',
+                       how='left')
+    systems = systems.drop_duplicates(subset='national_generic_substance_id')\
+        .set_index('national_generic_substance_id')['prtr_system']
+    df['prtr_system'] = df.national_generic_substance_id.map(systems)
+
+    return df
+
+
+def deleting_partitions(table, partitions, connection):
+    '''
+    Function to delete the transfer records of the (reporting year, PRTR system) partitions
+    '''
+
+    national_generic_substance = table.metadata.tables['national_generic_substance']
+    national_substance = table.metadata.tables['national_substance']
+    for reporting_year, prtr_system in partitions:
+        substances = select(national_generic_substance.c.national_generic_substance_id)\
+            .join(national_substance,
+                  national_generic_substance.c.national_substance_prtr_system_id ==
+                  national_substance.c.national_substance_prtr_system_id)\
+            .where(national_substance.c.prtr_system == prtr_system)
+        connection.execute(
+            delete(table).where(table.c.reporting_year == int(reporting_year),
+                                table.c.national_generic_substance_id.in_(substances))
+            )
+
+
+def incremental_loading(df, table, Engine, batch_size=10000, partitions=None):
+    '''
+    Function to upsert the records of a table. partitions is a list of
+    (reporting year, PRTR system) whose transfer records are replaced
+    '''
+
+    df = preparing_records(df, table)
+    cols = list(df.columns)
+
+    start = time.perf_counter()
+    with Engine.begin() as connection:
+        staging = staging_table(table, connection)
+        loading_records(df, staging, connection, batch_size=batch_size)
+        if partitions is not None:
+            deleting_partitions(table, partitions, connection)
+        upserting(table, staging, cols, connection)
+        staging.drop(connection)
+    elapsed = time.perf_counter() - start
+
+    rate = df.shape[0] / elapsed if elapsed > 0 else float('inf')
+    counting('rows_out', df.shape[0])
+    logger.info(f' {df.shape[0]} records upserted into {table.name} in {elapsed:.2f} s ({rate:.0f} records/s)')
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for recording what the load stage wrote into the database
+(load_manifest.json): the database and the number of records of each table. The pipeline
+uses it for knowing if the database still has the tables of the last load.
+'''
+
+# Importing libraries
+from sqlalchemy import select, func, table
+
+from datetime import datetime
+
+import os
+import json
+import logging
+
+logger = logging.getLogger(' Data engineering --> Load')
+
+
+def counting_records(names, Engine):
+    '''
+    Function to get the number of records of each table in the database
+    '''
+
+    with Engine.connect() as connection:
+        return {name: connection.execute(select(func.count()).select_from(table(name))).scalar()
+                for name in names}
+
+
+def writing_manifest(tables, Engine, database, path):
+    '''
+    Function to write the manifest of a load: the database (RDBMS, host, port and name),
+    the time of the load and the number of records of each table
+    '''
+
+    manifest = {'database': database,
+                'loaded_at': datetime.now().isoformat(sep=' '),
+                'tables': counting_records([table.name for table in tables], Engine)}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump(manifest, file, indent=2)
+
+    return manifest
+
+
+def checking_manifest(Engine, database, path):
+    '''
+    Function to check that the database still has the tables of the load in the
+    manifest, with the same number of records (False if it cannot be checked)
+    '''
+
+    if not os.path.exists(path):
+        return False
+    with open(path, 'r') as file:
+        manifest = json.load(file)
+    if manifest['database'] != database:
+        return False
+
+    try:
+        n_records = counting_records(list(manifest['tables'].keys()), Engine)
+    except Exception as e:
+        # e.g., the database or a table was dropped
+        logger.info(f' The tables of the last load cannot be counted: {e}')
+        return False
+    changed = [name for name, n in manifest['tables'].items() if n_records[name] != n]
+    if changed:
+        logger.info(f' The database does not have the records of the last load in {", ".join(changed)}')
+        return False
+
+    return True
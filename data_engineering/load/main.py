@@ -10,15 +10,32 @@ from data_engineering.load.substance import NationalGenericSubstance, NationalSu
 from data_engineering.load.transfer import NationalGenericTransferClass, NationalTransferClass, GenericTransferClass
 from data_engineering.load.chemical import GenericSubstanceChemicalInCategory, ChemicalInCategory
 from data_engineering.load.base import Base, create_engine_session
+from data_engineering.load.bulk import bulk_loading
+from data_engineering.load.parallel import parallel_loading
+from data_engineering.load.incremental import incremental_loading, attaching_prtr_system
+from data_engineering.load.constraints import creating_table, building_constraints, analyzing
+from data_engineering.load.blue_green import staging_target, validating_load, swapping
+from data_engineering.load.sql_dump import dumping_database
+from data_engineering.load.snapshot import exporting_snapshot
+from data_engineering.load.load_manifest import writing_manifest, checking_manifest
+from data_engineering.load.compact_schema import compacting_tables, creating_partitions
+from data_engineering.load.aggregates import summary_tables, building_summaries, creating_report_view, dropping_report_view, replacing_report_view, report_view, report_definition
+from data_engineering.transform.storage import reading_table, setting_file_format
+from data_engineering.transform.key_registry import committing_registries
+from data_engineering.monitoring import monitoring, counting
+from data_engineering.progress import progressing
+from data_engineering.profiling import adding_profile_arguments, profiling_main
 
+from functools import partial
+from itertools import chain
 import pandas as pd
 import os
-import zipfile
 import argparse
 import logging
 logging.basicConfig(level=logging.INFO)
 
 dir_path = os.path.dirname(os.path.realpath(__file__)) # current directory path
+manifest_path = f'{dir_path}/output/load_manifest.json'
 
 # Dictionary to associate each table file with each table in the SQL database
 Dic_tables = {'generic_sector': GenericSector,
@@ -37,22 +54,29 @@ Dic_tables = {'generic_sector': GenericSector,
               'transfer_record': TransferRecord}
 
 
-def function_to_create_zip(filename):
+def selecting_partitions(df, df_national_generic_substance, df_national_substance,
+                        reporting_years=None, prtr_systems=None):
     '''
-    Function to create a zip file for .sql files
+    Function to keep the transfer records of the reporting years and PRTR systems
+    to refresh, and to get these (reporting year, PRTR system) partitions
     '''
 
-    with zipfile.ZipFile(f'{dir_path}/output/{filename}.zip', 'w') as zipObj2:
-        zipObj2.write(f'{dir_path}/output/{filename}.sql',
-                    os.path.basename(f'{dir_path}/output/{filename}.sql'),
-                    compress_type=zipfile.ZIP_DEFLATED)
+    df = attaching_prtr_system(df, df_national_generic_substance, df_national_substance)
+    if reporting_years:
+        df = df[df.reporting_year.isin(reporting_years)]
+    if prtr_systems:
+        df = df[df.prtr_system.isin(prtr_systems)]
+    partitions = list(df[['reporting_year', 'prtr_system']]\
+                    .drop_duplicates()\
+                    .itertuples(index=False, name=None))
 
-    os.remove(f'{dir_path}/output/{filename}.sql')
+    return df.drop(columns=['prtr_system']), partitions
 
 
-def load_pipeline(args):
+def load_pipeline(args, tables=None):
     '''
-    Function for creating the load pipeline for the PRTR systems
+    Function for creating the load pipeline for the PRTR systems. tables yields
+    (name, data frame) from the transform stage; by default the tables are read from the files
     '''
 
     logger = logging.getLogger(' Data engineering --> Load')
@@ -64,6 +88,26 @@ def load_pipeline(args):
     port = args.port
     db_name = args.db_name
     sql_file = args.sql_file
+    load_method = args.load_method
+    batch_size = args.batch_size
+    n_workers = args.n_workers
+    load_mode = args.load_mode
+    reporting_years = args.reporting_years
+    prtr_systems = args.prtr_systems
+    # The foreign keys and indexes are only deferred when the bulk load fills new tables
+    deferred_constraints = (args.deferred_constraints == 'True') and\
+                        (load_mode == 'full') and (load_method == 'bulk')
+    # The blue/green load fills a staging area with all the tables before the swap
+    blue_green = (args.blue_green == 'True') and (load_mode == 'full')
+    aggregates = args.aggregates == 'True'
+    setting_file_format(args.file_format)
+
+    # SQLAlchemy table for each table file (the ORM load needs the schema of the models)
+    db_tables = {filename: Object.__table__ for filename, Object in Dic_tables.items()}
+    if (args.compact_schema == 'True') and (load_method == 'bulk'):
+        db_tables = compacting_tables(db_tables,
+                                    partitioning=(args.partitioning == 'True') and (rdbms == 'postgresql'))
+    sql_tables = list(db_tables.values())
 
     Engine, Session = create_engine_session(password,
                             rdbms=rdbms,
@@ -72,44 +116,160 @@ def load_pipeline(args):
                             port=port,
                             db_name=db_name)
 
-    for filename in reversed(list(Dic_tables.keys())):
-        Object = Dic_tables[filename]
-        Object.__table__.drop(Engine, checkfirst=True)
+    # Target is the database (or staging area) the tables are written into
+    if blue_green:
+        Target, Session = staging_target(Engine, password,
+                                        rdbms=rdbms,
+                                        username=username,
+                                        host=host,
+                                        port=port,
+                                        db_name=db_name)
+    else:
+        Target = Engine
+
+    # The live tables are not dropped until the transform stage has built the first table
+    if tables is not None:
+        first = next(tables, None)
+        if first is None:
+            raise ValueError('Error: the transform stage did not build any table')
+        tables = chain([first], tables)
+
+    # The incremental load keeps the tables and upserts the incoming records
+    if load_mode == 'full':
+        if not blue_green:
+            dropping_report_view(Engine)
+        for table in reversed(sql_tables + summary_tables):
+            table.drop(Target, checkfirst=True)
 
     # Saving each table
-    for filename, Object in Dic_tables.items():
-        Object.__table__.create(Engine, checkfirst=True)
-        session = Session()
-        path = f'{dir_path}/../transform/output/{filename}.csv'
-        df = pd.read_csv(path, encoding='utf-8')
-        df = df.where((pd.notnull(df)), None)
-        logger.info(f' Loading table {filename} into the {db_name} database')
-        # Saving each record by table
-        for _, row in df.iterrows():
-            context = row.to_dict()
-            instance = Object(**context)
-            session.add(instance)
-        session.commit()
-        session.close()
+    n_records = {}
+    dimensions = {}
+    def loading_table(filename, df=None):
+        with monitoring(f'loading {filename}'):
+            Object = Dic_tables[filename]
+            table = db_tables[filename]
+            if deferred_constraints:
+                creating_table(table, Target)
+            else:
+                table.create(Target, checkfirst=True)
+            if df is None:
+                df = reading_table(f'{dir_path}/../transform/output/{filename}')
+            if 'reporting_year' in df.columns:
+                creating_partitions(table, df.reporting_year.unique(), Target)
+            n_records[filename] = df.shape[0]
+            # The substances give the PRTR system of the transfer records (incremental load)
+            if filename in ['national_generic_substance', 'national_substance']:
+                dimensions[filename] = df
+            logger.info(f' Loading table {filename} into the {db_name} database')
+            if load_mode == 'incremental':
+                partitions = None
+                if filename == 'transfer_record':
+                    df, partitions = selecting_partitions(df,
+                                                dimensions['national_generic_substance'],
+                                                dimensions['national_substance'],
+                                                reporting_years=reporting_years,
+                                                prtr_systems=prtr_systems)
+                incremental_loading(df, table, Target,
+                                    batch_size=batch_size, partitions=partitions)
+            elif load_method == 'bulk':
+                bulk_loading(df, table, Target, batch_size=batch_size)
+            else:
+                session = Session()
+                df = df.where((pd.notnull(df)), None)
+                # Saving each record by table
+                for _, row in progressing(df.iterrows(), f'ORM load of {filename}', total=df.shape[0]):
+                    context = row.to_dict()
+                    instance = Object(**context)
+                    session.add(instance)
+                session.commit()
+                counting('rows_out', df.shape[0])
+                session.close()
+
+    # SQLite allows only one writer at a time
+    if rdbms == 'sqlite':
+        n_workers = 1
+
+    # The tables without pending foreign keys are loaded concurrently
+    parallel_loading(db_tables,
+                     loading_table,
+                     n_workers=n_workers,
+                     items=tables)
+
+    if deferred_constraints:
+        with monitoring('building constraints'):
+            building_constraints(sql_tables, Target)
+    if load_method == 'bulk':
+        with monitoring('analyzing'):
+            analyzing(sql_tables, Target)
+
+    # Summary tables for the figures and dashboards (swapped with the other tables)
+    if aggregates:
+        with monitoring('building summaries'):
+            building_summaries(db_tables, Target)
+        sql_tables = sql_tables + summary_tables
+
+    # The live tables are only replaced by validated tables, and the view is
+    # replaced in the same step (PostgreSQL views follow the tables they use)
+    if blue_green:
+        with monitoring('validating and swapping'):
+            validating_load(db_tables, n_records, Target)
+            swapping(sql_tables, Engine, Target, rdbms, db_name,
+                     replacing_views=partial(replacing_report_view, db_tables) if aggregates else None)
+    elif aggregates:
+        creating_report_view(db_tables, Engine)
+
+    # The IDs allocated by the database normalization are kept once their tables are loaded
+    committing_registries()
+    writing_manifest(sql_tables, Engine, loaded_database(args), manifest_path)
 
     if sql_file == 'True':
-        if rdbms == 'mysql':
-            exporting_string = f'mysqldump -u {username} -p{password} {db_name} > {dir_path}/output/{db_name}_v_MySQL.sql'
-            zipping_string = f'{db_name}_v_MySQL'
-        elif rdbms == 'postgresql':
-            exporting_string = f'pg_dump -U {username} -h {host} {db_name} -W > {dir_path}/output/{db_name}_v_PostgreSQL.sql'
-            zipping_string = f'{db_name}_v_PostgreSQL'
+        rdbms_names = {'mysql': 'MySQL', 'postgresql': 'PostgreSQL', 'sqlite': 'SQLite'}
+        with monitoring('dumping database'):
+            dumping_database(sql_tables, Engine,
+                            f'{dir_path}/output/{db_name}_v_{rdbms_names[rdbms]}',
+                            compression=args.sql_compression,
+                            views={report_view: report_definition(db_tables, Engine.dialect)} if aggregates else None)
 
-        os.system(exporting_string)
-        function_to_create_zip(zipping_string)
+    # Snapshot for querying the database without a server
+    if args.snapshot != 'None':
+        with monitoring('exporting snapshot'):
+            exporting_snapshot(sql_tables, Engine,
+                            f'{dir_path}/output/{db_name}_snapshot',
+                            snapshot_format=args.snapshot)
 
 
-if __name__ == '__main__':
+def loaded_database(args):
+    '''
+    Function to get the database the load writes into
+    '''
+
+    return {'rdbms': args.rdbms, 'host': args.host, 'port': args.port, 'db_name': args.db_name}
+
+
+def checking_load(args):
+    '''
+    Function to check that the database still has the tables of the last load
+    '''
+
+    Engine, Session = create_engine_session(args.password,
+                            rdbms=args.rdbms,
+                            username=args.username,
+                            host=args.host,
+                            port=args.port,
+                            db_name=args.db_name)
+
+    return checking_manifest(Engine, loaded_database(args), manifest_path)
+
+
+def adding_load_arguments(parser):
+    '''
+    Function to add the options of the load stage to a parser, so the
+    scripts running load_pipeline take all of them
+    '''
 
-    parser = argparse.ArgumentParser()
     parser.add_argument('--rdbms',
                         help='The Relational Database Management System (RDBMS) you would like to use',
-                        choices=['mysql', 'postgresql'],
+                        choices=['mysql', 'postgresql', 'sqlite'],
                         type=str,
                         default='mysql')
     parser.add_argument('--password',
@@ -136,7 +296,84 @@ if __name__ == '__main__':
                         choices=['True', 'False'],
                         type=str,
                         default='False')
+    parser.add_argument('--sql_compression',
+                        help='Compression of the .SQL file',
+                        choices=['gzip', 'zstd'],
+                        type=str,
+                        default='gzip')
+    parser.add_argument('--snapshot',
+                        help='Would you like to obtain a snapshot file of the database (SQLite file or Parquet directory)',
+                        choices=['None', 'sqlite', 'parquet'],
+                        type=str,
+                        default='None')
+    parser.add_argument('--compact_schema',
+                        help='Would you like to use the compact schema (small integers and server timestamps) for the bulk load',
+                        choices=['True', 'False'],
+                        type=str,
+                        default='False')
+    parser.add_argument('--partitioning',
+                        help='Would you like to partition transfer_record by reporting year (PostgreSQL and compact schema)',
+                        choices=['True', 'False'],
+                        type=str,
+                        default='False')
+    parser.add_argument('--file_format',
+                        help='The format of the files handed over between the transform and load stages',
+                        choices=['parquet', 'feather', 'csv'],
+                        type=str,
+                        default='parquet')
+    parser.add_argument('--load_method',
+                        help='Method for loading the tables: bulk (COPY, LOAD DATA or batched inserts) or orm (one object per record)',
+                        choices=['bulk', 'orm'],
+                        type=str,
+                        default='bulk')
+    parser.add_argument('--batch_size',
+                        help='Number of records per batch for the bulk load',
+                        type=int,
+                        default=10000)
+    parser.add_argument('--n_workers',
+                        help='Number of tables loaded at the same time',
+                        type=int,
+                        default=4)
+    parser.add_argument('--load_mode',
+                        help='Load mode: full (drop and create the tables) or incremental (upsert the records)',
+                        choices=['full', 'incremental'],
+                        type=str,
+                        default='full')
+    parser.add_argument('--reporting_years',
+                        help='Reporting years whose transfer records are replaced by the incremental load (all by default)',
+                        nargs='+',
+                        type=int,
+                        default=None)
+    parser.add_argument('--prtr_systems',
+                        help='PRTR systems whose transfer records are replaced by the incremental load (all by default)',
+                        nargs='+',
+                        choices=['NPI', 'NPRI', 'TRI'],
+                        type=str,
+                        default=None)
+    parser.add_argument('--deferred_constraints',
+                        help='Would you like to build the foreign keys and indexes after the bulk load',
+                        choices=['True', 'False'],
+                        type=str,
+                        default='True')
+    parser.add_argument('--blue_green',
+                        help='Would you like to load into a staging area and swap it with the live tables',
+                        choices=['True', 'False'],
+                        type=str,
+                        default='False')
+    parser.add_argument('--aggregates',
+                        help='Would you like to build the summary tables and the reporting view',
+                        choices=['True', 'False'],
+                        type=str,
+                        default='False')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    adding_load_arguments(parser)
+    adding_profile_arguments(parser)
 
     args = parser.parse_args()
 
-    load_pipeline(args)
+    with profiling_main(args, 'load'):
+        load_pipeline(args)
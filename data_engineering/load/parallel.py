@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for loading the tables of the PRTR_transfers database
+concurrently. The foreign keys in the SQLAlchemy metadata give the dependencies between
+tables, so each table starts as soon as the tables it refers to have been committed.
+'''
+
+# Importing libraries
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import logging
+
+logger = logging.getLogger(' Data engineering --> Load')
+
+
+def dependency_graph(tables):
+    '''
+    Function to get the tables each table depends on through its foreign keys.
+    tables is a dictionary with the name and the SQLAlchemy table
+    '''
+
+    names = {table.name: name for name, table in tables.items()}
+    graph = {}
+    for name, table in tables.items():
+        parents = {names[fk.column.table.name] for fk in table.foreign_keys
+                   if fk.column.table.name in names.keys()}
+        parents.discard(name)
+        graph[name] = parents
+
+    return graph
+
+
+def parallel_loading(tables, loading_function, n_workers=4, items=None):
+    '''
+    Function to run loading_function(name, df) for each table on a pool of threads,
+    following the dependency graph of the tables. items yields (name, data frame), e.g.,
+    from the transform stage; by default df is None and the tables are read from the files.
+    At most n_workers tables are held (loading or waiting for their parents) when the
+    parents come first; otherwise the tables are held until their parents arrive
+    '''
+
+    graph = dependency_graph(tables)
+    if items is None:
+        items = ((name, None) for name in tables.keys())
+    done = set()
+    running = {}
+    waiting = {}
+
+    def submitting(executor):
+        for name in list(waiting.keys()):
+            if graph[name] <= done:
+                running[executor.submit(loading_function, name, waiting.pop(name))] = name
+
+    def collecting():
+        finished, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+        for future in finished:
+            name = running.pop(future)
+            try:
+                future.result()
+            except Exception:
+                # The tables waiting for this one cannot be loaded
+                for pending in running.keys():
+                    pending.cancel()
+                logger.error(f' Loading table {name} failed')
+                raise
+            done.add(name)
+
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        for name, df in items:
+            waiting[name] = df
+            submitting(executor)
+            # Bounded memory: no more tables are taken while n_workers tables are held. A table
+            # whose parents have not arrived yet does not stop it, since they are needed to go on
+            while running and (len(running) + len(waiting) >= n_workers):
+                collecting()
+                submitting(executor)
+        while running:
+            collecting()
+            submitting(executor)
+
+    if waiting or (len(done) < len(graph)):
+        raise ValueError(f'Error: circular foreign keys or missing tables between {sorted(set(graph.keys()) - done)}')
@@ -12,7 +12,7 @@ class PRTRSystem(Base):
     __tablename__ = 'prtr_system'
 
     id = Column(Integer(), primary_key=True, autoincrement=True)
-    prtr_system = Column(String(5), nullable=False)
+    prtr_system = Column(String(5), nullable=False, unique=True)
     country = Column(String(3), nullable=False)
     industry_classification_system = Column(String(10), nullable=False)
     created_at = Column(DateTime(), default=datetime.now())
@@ -5,12 +5,19 @@
 from data_engineering.load.base import Base
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship
 
 
 class TransferRecord(Base):
     __tablename__ = 'transfer_record'
+    # Indexes for the analytical queries (substance x year, facility x year, transfer class)
+    __table_args__ = (Index('ix_transfer_record_substance_year',
+                            'national_generic_substance_id', 'reporting_year'),
+                      Index('ix_transfer_record_facility_year',
+                            'national_facility_and_generic_sector_id', 'reporting_year'),
+                      Index('ix_transfer_record_transfer_class',
+                            'national_generic_transfer_class_id', 'reporting_year'),)
 
     transfer_record_id = Column(Integer(), primary_key=True)
     reporting_year = Column(Integer(), nullable=False)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for exporting the PRTR_transfers database as a portable
+snapshot that can be queried without a database server: a SQLite file (with the indexes)
+or a directory of Parquet files described by a manifest (manifest.json).
+'''
+
+# Importing libraries
+from data_engineering.load.sql_dump import database_rows
+from data_engineering.load.constraints import creating_table, building_constraints, analyzing
+
+from sqlalchemy import create_engine, Integer, Float, DateTime, Numeric
+from datetime import datetime
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(' Data engineering --> Load')
+
+
+def arrow_type(col):
+    '''
+    Function to get the Arrow type for a column of the database
+    '''
+
+    col_type = getattr(col.type, 'impl', col.type)
+    if isinstance(col_type, Integer):
+        return pa.int64()
+    elif isinstance(col_type, (Float, Numeric)):
+        return pa.float64()
+    elif isinstance(col_type, DateTime):
+        return pa.timestamp('us')
+    else:
+        return pa.string()
+
+
+def file_hash(path):
+    '''
+    Function to get the SHA-256 of a file
+    '''
+
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 ** 2), b''):
+            sha256.update(block)
+
+    return sha256.hexdigest()
+
+
+def snapshot_sqlite(tables, Engine, path, batch_size=10000):
+    '''
+    Function to copy the tables into a SQLite file with their indexes
+    '''
+
+    Snapshot = create_engine(f'sqlite:///{path}')
+    for table in tables:
+        creating_table(table, Snapshot)
+
+    for table in tables:
+        batches = database_rows(table, Engine, batch_size=batch_size)
+        cols = next(batches)
+        with Snapshot.begin() as connection:
+            # The snapshot is rebuilt from scratch if something fails
+            connection.exec_driver_sql('PRAGMA synchronous = OFF')
+            for rows in batches:
+                connection.execute(table.insert(), [dict(zip(cols, row)) for row in rows])
+
+    building_constraints(tables, Snapshot)
+    analyzing(tables, Snapshot)
+    Snapshot.dispose()
+
+
+def snapshot_parquet(tables, Engine, path, batch_size=10000):
+    '''
+    Function to write each table into a Parquet file and the schema of the
+    database (columns, keys, records and file hashes) into manifest.json
+    '''
+
+    os.makedirs(path)
+    manifest = {'database': 'PRTR_transfers',
+                'created_at': datetime.now().isoformat(sep=' '),
+                'format': 'parquet',
+                'tables': {}}
+    for table in tables:
+        schema = pa.schema([(col.name, arrow_type(col)) for col in table.columns])
+        filename = f'{table.name}.parquet'
+        batches = database_rows(table, Engine, batch_size=batch_size)
+        cols = next(batches)
+        n_records = 0
+        writer = pq.ParquetWriter(f'{path}/{filename}', schema, compression='zstd')
+        try:
+            for rows in batches:
+                values = list(zip(*rows))
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(values[i], type=schema.field(col).type) for i, col in enumerate(cols)],
+                    schema=schema))
+                n_records += len(rows)
+            if n_records == 0:
+                writer.write_table(schema.empty_table())
+        finally:
+            writer.close()
+
+        manifest['tables'][table.name] = {
+            'file': filename,
+            'records': n_records,
+            'sha256': file_hash(f'{path}/{filename}'),
+            'columns': [{'name': col.name,
+                         'type': str(col.type),
+                         'nullable': col.nullable} for col in table.columns],
+            'primary_key': [col.name for col in table.primary_key.columns],
+            'foreign_keys': [{'column': fk.parent.name,
+                              'references': f'{fk.column.table.name}.{fk.column.name}'}
+                             for fk in table.foreign_keys],
+            'indexes': [{'name': index.name,
+                         'columns': [col.name for col in index.columns]}
+                        for index in table.indexes]
+            }
+
+    with open(f'{path}/manifest.json', 'w') as file:
+        json.dump(manifest, file, indent=2)
+
+
+def exporting_snapshot(tables, Engine, path, snapshot_format='sqlite', batch_size=10000):
+    '''
+    Function to export a snapshot of the tables. The snapshot is built next to its
+    final path and moved there once complete
+    '''
+
+    if snapshot_format == 'sqlite':
+        path = f'{path}.sqlite'
+    building_path = f'{path}.building'
+    if os.path.isdir(building_path):
+        shutil.rmtree(building_path)
+    elif os.path.exists(building_path):
+        os.remove(building_path)
+
+    start = time.perf_counter()
+    if snapshot_format == 'sqlite':
+        snapshot_sqlite(tables, Engine, building_path, batch_size=batch_size)
+        os.replace(building_path, path)
+    else:
+        snapshot_parquet(tables, Engine, building_path, batch_size=batch_size)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.replace(building_path, path)
+    elapsed = time.perf_counter() - start
+
+    logger.info(f' Snapshot exported to {os.path.basename(path)} in {elapsed:.2f} s')
+
+    return path
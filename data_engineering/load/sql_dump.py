@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for exporting the PRTR_transfers database as a compressed .sql
+file without the client binaries (mysqldump or pg_dump). The statements are streamed from the
+database (or from data frames) into a gzip stream compressed by several threads, or into a
+zstd stream (zstandard package), without an intermediate uncompressed file.
+'''
+
+# Importing libraries
+from data_engineering.load.bulk import preparing_records
+
+from sqlalchemy import select
+from sqlalchemy.schema import CreateTable, CreateIndex, DropTable
+
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from datetime import datetime, date
+import os
+import gzip
+import math
+import numbers
+import time
+import logging
+import pandas as pd
+
+logger = logging.getLogger(' Data engineering --> Load')
+
+extensions = {'gzip': 'gz',
+              'zstd': 'zst'}
+
+
+def sql_literal(value, dialect_name):
+    '''
+    Function to write a value as a SQL literal
+    '''
+
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, numbers.Integral):
+        return str(int(value))
+    if isinstance(value, numbers.Real):
+        return 'NULL' if math.isnan(value) else repr(float(value))
+    if isinstance(value, (datetime, date)):
+        return f"'{value.isoformat(sep=' ') if isinstance(value, datetime) else value.isoformat()}'"
+    value = str(value).replace("'", "''")
+    # Backslashes are escape characters in MySQL strings
+    if dialect_name == 'mysql':
+        value = value.replace('\\', '\\\\')
+
+    return f"'{value}'"
+
+
+def copy_value(value):
+    '''
+    Function to write a value in the text format of COPY
+    '''
+
+    if value is None:
+        return '\\N'
+    if isinstance(value, numbers.Real) and math.isnan(value):
+        return '\\N'
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    value = str(value)
+
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def insert_statements(table, cols, batches, dialect):
+    '''
+    Function to yield one multi-row INSERT statement per batch of rows
+    '''
+
+    preparer = dialect.identifier_preparer
+    cols = ', '.join(preparer.quote(col) for col in cols)
+    for rows in batches:
+        values = ',\n'.join('(' + ', '.join(sql_literal(value, dialect.name) for value in row) + ')'
+                            for row in rows)
+        yield f'INSERT INTO {preparer.quote(table.name)} ({cols}) VALUES\n{values};\n'
+
+
+def copy_statements(table, cols, batches, dialect):
+    '''
+    Function to yield a PostgreSQL COPY block (as pg_dump does)
+    '''
+
+    preparer = dialect.identifier_preparer
+    cols = ', '.join(preparer.quote(col) for col in cols)
+    yield f'COPY {preparer.quote(table.name)} ({cols}) FROM stdin;\n'
+    for rows in batches:
+        yield ''.join('\t'.join(copy_value(value) for value in row) + '\n' for row in rows)
+    yield '\\.\n'
+
+
+def database_rows(table, Engine, batch_size=1000):
+    '''
+    Function to stream the rows of a table from the database in batches
+    '''
+
+    yield [col.name for col in table.columns]
+    with Engine.connect() as connection:
+        result = connection.execution_options(stream_results=True)\
+            .execute(select(*table.columns))
+        for rows in result.partitions(batch_size):
+            yield rows
+
+
+def frame_rows(df, table, batch_size=1000):
+    '''
+    Function to get the rows of a data frame in batches. The columns not in the
+    data frame (e.g., autoincrement IDs) are left to their defaults
+    '''
+
+    df = preparing_records(df, table)
+    yield list(df.columns)
+    for start in range(0, df.shape[0], batch_size):
+        df_batch = df.iloc[start:start + batch_size]
+        yield list(df_batch.astype(object).where(pd.notnull(df_batch), None)
+                   .itertuples(index=False, name=None))
+
+
+def dump_statements(tables, sources, dialect, statement='insert', views=None):
+    '''
+    Function to yield the statements of the dump: schema, records (parents first), indexes
+    and views. sources has a function per table name giving its columns and then its batches
+    of rows, and views the SELECT statement per view name
+    '''
+
+    views = views or {}
+
+    yield f'-- PRTR_transfers dump ({dialect.name}) created on {datetime.now().isoformat(sep=" ")}\n'
+    if dialect.name == 'mysql':
+        yield 'SET NAMES utf8mb4;\nSET FOREIGN_KEY_CHECKS = 0;\n'
+    yield 'BEGIN;\n'
+
+    # PostgreSQL does not drop the tables used by a view
+    for name in views:
+        yield f'DROP VIEW IF EXISTS {name};\n'
+    for table in reversed(tables):
+        yield f'{str(DropTable(table, if_exists=True).compile(dialect=dialect)).strip()};\n'
+    for table in tables:
+        yield f'{str(CreateTable(table).compile(dialect=dialect)).strip()};\n'
+        # Partitioned tables (compact schema) need a partition for their records
+        if (dialect.name == 'postgresql') and table.dialect_options['postgresql']['partition_by']:
+            yield f'CREATE TABLE {table.name}_default PARTITION OF {table.name} DEFAULT;\n'
+
+    for table in tables:
+        batches = sources[table.name]()
+        cols = next(batches)
+        if (statement == 'copy') and (dialect.name == 'postgresql'):
+            yield from copy_statements(table, cols, batches, dialect)
+        else:
+            yield from insert_statements(table, cols, batches, dialect)
+
+    for table in tables:
+        for index in table.indexes:
+            yield f'{str(CreateIndex(index).compile(dialect=dialect)).strip()};\n'
+
+    for name, definition in views.items():
+        yield f'CREATE VIEW {name} AS {definition};\n'
+
+    yield 'COMMIT;\n'
+    if dialect.name == 'mysql':
+        yield 'SET FOREIGN_KEY_CHECKS = 1;\n'
+
+
+def chunking(statements, chunk_size=4 * 1024 ** 2):
+    '''
+    Function to group the statements into encoded chunks of about chunk_size bytes
+    '''
+
+    chunk, size = [], 0
+    for text in statements:
+        data = text.encode('utf-8')
+        chunk.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            yield b''.join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield b''.join(chunk)
+
+
+def writing_compressed(path, statements, compression='gzip', n_threads=None):
+    '''
+    Function to write the statements into a compressed file. gzip chunks are compressed
+    by several threads and written in order as members of one gzip file
+    '''
+
+    n_threads = n_threads or os.cpu_count() or 1
+    with open(path, 'wb') as file:
+        if compression == 'zstd':
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError('Error: the zstandard package is needed for zstd compression')
+            compressor = zstandard.ZstdCompressor(level=3, threads=n_threads)
+            with compressor.stream_writer(file, closefd=False) as writer:
+                for chunk in chunking(statements):
+                    writer.write(chunk)
+        else:
+            # zlib releases the GIL, so the chunks are compressed at the same time
+            with ThreadPoolExecutor(max_workers=n_threads) as executor:
+                pending = deque()
+                for chunk in chunking(statements):
+                    pending.append(executor.submit(gzip.compress, chunk, 6))
+                    # Bounded memory: the oldest chunk is written before taking more
+                    while len(pending) > 2 * n_threads:
+                        file.write(pending.popleft().result())
+                while pending:
+                    file.write(pending.popleft().result())
+
+
+def dumping_database(tables, Engine, path, compression='gzip',
+                    statement=None, batch_size=1000, frames=None, views=None):
+    '''
+    Function to export the tables (parents first) and views as a compressed .sql file. The records
+    are taken from frames (name: data frame) if given, or else streamed from the database.
+    PostgreSQL uses COPY blocks by default and the other RDBMSs multi-row INSERTs
+    '''
+
+    dialect = Engine.dialect
+    statement = statement or ('copy' if dialect.name == 'postgresql' else 'insert')
+    sources = {}
+    for table in tables:
+        if frames is not None:
+            sources[table.name] = lambda table=table: frame_rows(frames[table.name], table, batch_size)
+        else:
+            sources[table.name] = lambda table=table: database_rows(table, Engine, batch_size)
+
+    path = f'{path}.sql.{extensions[compression]}'
+    start = time.perf_counter()
+    writing_compressed(path, dump_statements(tables, sources, dialect, statement=statement, views=views),
+                       compression=compression)
+    elapsed = time.perf_counter() - start
+
+    logger.info(f' Database exported to {os.path.basename(path)} in {elapsed:.2f} s')
+
+    return path
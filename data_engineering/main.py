@@ -4,7 +4,14 @@
 # Importing libraries
 from data_engineering.extract.main import scraper_pipeline
 from data_engineering.transform.main import tramsform_pipeline
-from data_engineering.load.main import load_pipeline
+from data_engineering.load.main import load_pipeline, adding_load_arguments
+from data_engineering.transform.storage import setting_file_format
+from data_engineering.pipeline import stages, running_stages
+from data_engineering.overlapping import overlapping_pipeline
+from data_engineering.extract.common import reporting_unresolved
+from data_engineering.monitoring import enabling_monitoring, monitoring, writing_report
+from data_engineering.progress import enabling_progress, disabling_progress
+from data_engineering.profiling import enabling_profiling, disabling_profiling, adding_profile_arguments
 
 import logging
 import argparse
@@ -19,48 +26,146 @@ def data_engineering_pipeline(args):
 
     logger.info(' Starting data engineering')
 
-    # Calling web scraping pipeline
-    scraper_pipeline()
+    # Setting the format for the files handed over between stages
+    setting_file_format(args.file_format)
 
-    # Calling database transforming pipeline
-    tramsform_pipeline()
+    # Measuring each step for the run report
+    if args.run_report == 'True':
+        enabling_monitoring(trace_memory=(args.trace_memory == 'True'))
 
-    # Calling database loading pipeline
-    load_pipeline(args)
+    # Items done, items per second and ETA of the long-running loops
+    if args.progress != 'None':
+        enabling_progress(mode=args.progress,
+                          path=args.progress_file,
+                          interval=args.progress_interval)
+
+    # Profiles of the chosen stages
+    if args.profile != 'None':
+        enabling_profiling(profiler=args.profile,
+                           stages=args.profile_stages,
+                           top=args.profile_top)
+
+    try:
+        with monitoring('pipeline'):
+            running_pipeline(args)
+    finally:
+        disabling_progress()
+        disabling_profiling()
+        # The items that the sources could not resolve (e.g., SRS lookups after a timeout)
+        reporting_unresolved()
+        writing_report(args=args)
+
+
+def running_pipeline(args):
+    '''
+    Function for running the extract, transform and load stages
+    '''
+
+    # The stages that are up to date are taken from their checkpoints
+    if args.checkpoints == 'True':
+        running_stages(args, rerun=args.rerun)
+        return
+
+    # Calling web scraping pipeline. With overlapping, the transformers of the PRTR
+    # systems take the raw files as soon as they are extracted
+    overlapping = (args.overlapping == 'True')
+    if overlapping:
+        with monitoring('extract and transform'):
+            overlapping_pipeline(queue_size=args.queue_size)
+    else:
+        with monitoring('extract'):
+            scraper_pipeline(concurrent=(args.concurrent_extraction == 'True'))
+
+    if args.streaming == 'True':
+        # The normalized tables go from the transform stage into the database
+        with monitoring('transform'):
+            tables = tramsform_pipeline(streaming=True,
+                                        save_files=(args.save_files == 'True'),
+                                        parallel=(args.parallel_transform == 'True'),
+                                        systems=not overlapping)
+        # The database normalization runs while the tables are loaded
+        with monitoring('normalization and load'):
+            load_pipeline(args, tables=tables)
+    else:
+        # Calling database transforming pipeline
+        with monitoring('transform'):
+            tramsform_pipeline(parallel=(args.parallel_transform == 'True'),
+                               systems=not overlapping)
+
+        # Calling database loading pipeline
+        with monitoring('load'):
+            load_pipeline(args)
     
 
 if __name__ == '__main__':
 
     parser = argparse.ArgumentParser()
-    parser.add_argument('--rdbms',
-                        help='The Relational Database Management System (RDBMS) you would like to use',
-                        choices=['mysql', 'postgresql'],
+    adding_load_arguments(parser)
+    parser.add_argument('--parallel_transform',
+                        help='Would you like to run the transformers of the PRTR systems in parallel processes',
+                        choices=['True', 'False'],
                         type=str,
-                        default='mysql')
-    parser.add_argument('--password',
-                        help='The password for using the RDBMS',
-                        type=str)
-    parser.add_argument('--username',
-                        help='The username for using the RDBMS',
+                        default='True')
+    parser.add_argument('--concurrent_extraction',
+                        help='Would you like to run the downloads of the PRTR systems at the same time (in a pool of threads)',
+                        choices=['True', 'False'],
                         type=str,
-                        default='root')
-    parser.add_argument('--host',
-                        help='The computer hosting for the database',
+                        default='True')
+    parser.add_argument('--overlapping',
+                        help='Would you like to transform the raw files of the PRTR systems while the next ones are extracted',
+                        choices=['True', 'False'],
                         type=str,
-                        default='127.0.0.1')
-    parser.add_argument('--port',
-                        help='Port used by the database engine',
+                        default='False')
+    parser.add_argument('--queue_size',
+                        help='Number of raw files (systems or TRI years) that can wait for the transformers when overlapping',
+                        type=int,
+                        default=2)
+    parser.add_argument('--streaming',
+                        help='Would you like to load the normalized tables straight from the transform stage',
+                        choices=['True', 'False'],
                         type=str,
-                        default='3306')
-    parser.add_argument('--db_name',
-                        help='Database name',
+                        default='False')
+    parser.add_argument('--save_files',
+                        help='Would you like to save the normalized tables as files when streaming',
+                        choices=['True', 'False'],
                         type=str,
-                        default='PRTR_transfers')
-    parser.add_argument('--sql_file',
-                        help='Would you like to obtain .SQL file',
+                        default='False')
+    parser.add_argument('--run_report',
+                        help='Would you like to obtain a report of the time, memory, rows and requests of each step',
+                        choices=['True', 'False'],
+                        type=str,
+                        default='True')
+    parser.add_argument('--trace_memory',
+                        help='Would you like to trace the memory allocated by Python in each step (slower)',
                         choices=['True', 'False'],
                         type=str,
                         default='False')
+    parser.add_argument('--progress',
+                        help='Where to report the progress of the long-running loops: console (log) or prometheus (metrics file)',
+                        choices=['None', 'console', 'prometheus'],
+                        type=str,
+                        default='None')
+    parser.add_argument('--progress_file',
+                        help='Path of the metrics file for the prometheus progress (data_engineering/reports/progress.prom by default)',
+                        type=str,
+                        default=None)
+    parser.add_argument('--progress_interval',
+                        help='Seconds between progress reports',
+                        type=float,
+                        default=10.0)
+    parser.add_argument('--checkpoints',
+                        help='Would you like to run the pipeline as a graph of stages that skips the stages having an up-to-date checkpoint',
+                        choices=['True', 'False'],
+                        type=str,
+                        default='False')
+    parser.add_argument('--rerun',
+                        help='Stages to run even if their checkpoints are up to date (e.g., the scrapers for downloading new data)',
+                        nargs='+',
+                        choices=list(stages.keys()),
+                        type=str,
+                        default=None)
+
+    adding_profile_arguments(parser)
 
     args = parser.parse_args()
 
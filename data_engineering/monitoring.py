@@ -0,0 +1,404 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for measuring the performance of each extract, transform and
+load step of the data engineering pipeline: wall and CPU time, memory (tracemalloc peak and RSS),
+rows and bytes in and out, and network requests. The measures are written into a JSON run report
+and summarized in the log at the end of the run. Nothing is measured when it is not enabled.
+'''
+
+# Importing libraries
+from data_engineering.profiling import profiling
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+import os
+import sys
+import json
+import time
+import platform
+import threading
+import tracemalloc
+import asyncio
+import logging
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows
+
+logger = logging.getLogger(' Data engineering --> Monitoring')
+
+dir_path = os.path.dirname(os.path.realpath(__file__)) # current directory path
+
+counter_names = ['rows_in', 'rows_out', 'bytes_in', 'bytes_out', 'requests']
+
+_run = {'enabled': False,
+        'trace_memory': False,
+        'started_at': None,
+        'stages': []}
+_lock = threading.Lock()
+_local = threading.local()
+_main_stack = []
+# Innermost stage of each asyncio task (the tasks of an event loop share its thread)
+_task_stage = ContextVar('task_stage', default=None)
+
+
+def enabling_monitoring(trace_memory=False):
+    '''
+    Function to start measuring the stages. tracemalloc slows down the memory
+    allocations, so it is only used with trace_memory
+    '''
+
+    _run['enabled'] = True
+    _run['trace_memory'] = trace_memory
+    _run['started_at'] = datetime.now().isoformat(sep=' ')
+    _run['stages'] = []
+    _main_stack.clear()
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def _stack():
+    '''
+    Function to get the stages being measured by the current thread. The stages of
+    a worker thread are nested into the stage the main thread is measuring
+    '''
+
+    if threading.current_thread() is threading.main_thread():
+        return _main_stack
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def _in_task():
+    '''
+    Function to know if the current thread is running an asyncio task
+    '''
+
+    try:
+        return asyncio.current_task() is not None
+    except RuntimeError:
+        return False
+
+
+@contextmanager
+def _pushing(record):
+    '''
+    Context manager to make a stage the innermost one of the current asyncio
+    task (a new task starts from the one of the task that created it) or thread
+    '''
+
+    if _in_task():
+        token = _task_stage.set(record)
+        try:
+            yield
+        finally:
+            _task_stage.reset(token)
+        return
+    stack = _stack()
+    stack.append(record)
+    try:
+        yield
+    finally:
+        stack.pop()
+
+
+def _current():
+    '''
+    Function to get the innermost stage being measured (None if there is none)
+    '''
+
+    if _in_task() and (_task_stage.get() is not None):
+        return _task_stage.get()
+    stack = _stack()
+    if stack:
+        return stack[-1]
+    elif _main_stack:
+        return _main_stack[-1]
+    else:
+        return None
+
+
+def current_stage():
+    '''
+    Function to get the innermost stage being measured by the current thread
+    '''
+
+    return _current()
+
+
+@contextmanager
+def nesting(record):
+    '''
+    Context manager to nest the stages measured by a worker thread into a stage (e.g., the one
+    that started the thread) instead of the one the main thread is measuring at the time
+    '''
+
+    if record is None:
+        yield
+        return
+    with _pushing(record):
+        yield
+
+
+def reading_status(field):
+    '''
+    Function to get a memory field (e.g., VmRSS) of the process status of Linux (MB),
+    None if there is no /proc
+    '''
+
+    try:
+        with open('/proc/self/status', 'r') as file:
+            for line in file:
+                if line.startswith(f'{field}:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb():
+    '''
+    Function to get the peak resident set size of the process (MB)
+    '''
+
+    # The high-water mark of Linux starts again with each program (ru_maxrss
+    # keeps the one of the parent process, e.g., for a subprocess)
+    peak = reading_status('VmHWM')
+    if peak is not None:
+        return peak
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes in Linux and bytes in macOS
+    return round(peak / (1024 ** 2 if sys.platform == 'darwin' else 1024), 1)
+
+
+def counting(name, value=1):
+    '''
+    Function to add a value to a counter (e.g., rows_in) of the stage being
+    measured and of the stages it is nested into
+    '''
+
+    if not _run['enabled']:
+        return
+    record = _current()
+    with _lock:
+        while record is not None:
+            record['counters'][name] = record['counters'].get(name, 0) + value
+            record = record['parent']
+
+
+@contextmanager
+def monitoring(stage):
+    '''
+    Context manager to measure a stage (a step of the pipeline). The stage
+    is also profiled if it was chosen for profiling
+    '''
+
+    with profiling(stage), measuring_stage(stage):
+        yield
+
+
+@contextmanager
+def measuring_stage(stage):
+    '''
+    Context manager to measure a stage
+    '''
+
+    if not _run['enabled']:
+        yield
+        return
+
+    parent = _current()
+    record = {'stage': stage,
+              'parent': parent,
+              'depth': 0 if parent is None else parent['depth'] + 1,
+              'status': 'running',
+              'counters': {}}
+    with _lock:
+        _run['stages'].append(record)
+    if _run['trace_memory']:
+        # The peak of the parents so far is kept before measuring the one of this stage
+        peak = tracemalloc.get_traced_memory()[1]
+        ancestor = parent
+        while ancestor is not None:
+            ancestor['traced_peak'] = max(ancestor.get('traced_peak', 0), peak)
+            ancestor = ancestor['parent']
+        tracemalloc.reset_peak()
+    rss_start = reading_status('VmRSS')
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        with _pushing(record):
+            yield
+        record['status'] = 'ok'
+    except BaseException as e:
+        record['status'] = 'failed'
+        record['error'] = f'{type(e).__name__}: {e}'
+        raise
+    finally:
+        record['wall_s'] = round(time.perf_counter() - wall_start, 3)
+        record['cpu_s'] = round(time.process_time() - cpu_start, 3)
+        # The RSS the stage left (the peak of the process is reported once for the run)
+        rss_end = reading_status('VmRSS')
+        record['rss_delta_mb'] = None if (rss_start is None) or (rss_end is None) else round(rss_end - rss_start, 1)
+        if _run['trace_memory']:
+            record['traced_peak'] = max(record.get('traced_peak', 0), tracemalloc.get_traced_memory()[1])
+
+
+def monitoring_settings():
+    '''
+    Function to get the settings for measuring the stages run by another
+    process (None if the stages are not measured)
+    '''
+
+    if not _run['enabled']:
+        return None
+    return {'trace_memory': _run['trace_memory']}
+
+
+def adding_stages(reports):
+    '''
+    Function to add the measures of the stages run by another process (e.g., a transformer)
+    to the stage being measured. The counters are added to the stages they are nested into
+    '''
+
+    if not _run['enabled']:
+        return
+    parent = _current()
+    records = {}
+    for report in reports:
+        record_parent = records.get(report['parent'], parent)
+        record = {'stage': report['stage'],
+                  'parent': record_parent,
+                  'depth': 0 if record_parent is None else record_parent['depth'] + 1,
+                  'status': report['status'],
+                  'counters': {name: report[name] for name in counter_names if report[name]}}
+        if 'wall_s' in report:
+            record['wall_s'] = report['wall_s']
+            record['cpu_s'] = report['cpu_s']
+            record['rss_delta_mb'] = report['rss_delta_mb']
+        if 'peak_traced_mb' in report:
+            record['traced_peak'] = report['peak_traced_mb'] * 1024 ** 2
+        if 'error' in report:
+            record['error'] = report['error']
+        records[report['stage']] = record
+        with _lock:
+            _run['stages'].append(record)
+            # The counters of the nested stages are already in the first stage of the process
+            if report['parent'] is None:
+                ancestor = parent
+                while ancestor is not None:
+                    for name, value in record['counters'].items():
+                        ancestor['counters'][name] = ancestor['counters'].get(name, 0) + value
+                    ancestor = ancestor['parent']
+
+
+def skipping(stage):
+    '''
+    Function to record a stage that did not run (e.g., up to date)
+    '''
+
+    if not _run['enabled']:
+        return
+    parent = _current()
+    with _lock:
+        _run['stages'].append({'stage': stage,
+                               'parent': parent,
+                               'depth': 0 if parent is None else parent['depth'] + 1,
+                               'status': 'skipped',
+                               'counters': {}})
+
+
+def stage_report(record):
+    '''
+    Function to get the measures of a stage for the run report
+    '''
+
+    report = {'stage': record['stage'],
+              'parent': None if record['parent'] is None else record['parent']['stage'],
+              'depth': record['depth'],
+              'status': record['status']}
+    if 'wall_s' in record:
+        report['wall_s'] = record['wall_s']
+        report['cpu_s'] = record['cpu_s']
+        report['cpu_utilization'] = round(record['cpu_s'] / record['wall_s'], 2) if record['wall_s'] else None
+        report['rss_delta_mb'] = record['rss_delta_mb']
+        if 'traced_peak' in record:
+            report['peak_traced_mb'] = round(record['traced_peak'] / 1024 ** 2, 1)
+    for name in counter_names:
+        report[name] = record['counters'].get(name, 0)
+    if 'error' in record:
+        report['error'] = record['error']
+
+    return report
+
+
+def stage_reports():
+    '''
+    Function to get the measures of the stages measured so far
+    '''
+
+    return [stage_report(record) for record in _run['stages']]
+
+
+def summarizing(stages, peak_rss=None):
+    '''
+    Function to write the human summary of the run report into the log
+    '''
+
+    logger.info(f' {"Stage":<46}{"Status":>9}{"Wall (s)":>11}{"CPU (s)":>10}{"+RSS (MB)":>11}'
+                f'{"Rows in":>12}{"Rows out":>12}{"Requests":>10}')
+    for stage in stages:
+        name = f'{"  " * stage["depth"]}{stage["stage"]}'[:45]
+        if stage['status'] == 'skipped':
+            logger.info(f' {name:<46}{stage["status"]:>9}')
+            continue
+        delta = '-' if stage['rss_delta_mb'] is None else f'{stage["rss_delta_mb"]:+.0f}'
+        logger.info(f' {name:<46}{stage["status"]:>9}{stage["wall_s"]:>11.2f}{stage["cpu_s"]:>10.2f}'
+                    f'{delta:>11}'
+                    f'{stage["rows_in"]:>12,}{stage["rows_out"]:>12,}'
+                    f'{stage["requests"]:>10,}')
+    if peak_rss is not None:
+        logger.info(f' Peak RSS of the process: {peak_rss:,.0f} MB')
+
+
+def writing_report(path=None, args=None):
+    '''
+    Function to write the JSON run report (one file per run, for following
+    the trends across runs) and its summary. It returns the path of the report
+    '''
+
+    if not _run['enabled']:
+        return None
+
+    path = path or f'{dir_path}/reports'
+    os.makedirs(path, exist_ok=True)
+    finished_at = datetime.now()
+    stages = stage_reports()
+    report = {'started_at': _run['started_at'],
+              'finished_at': finished_at.isoformat(sep=' '),
+              'status': 'failed' if any(stage['status'] in ['failed', 'running'] for stage in stages) else 'ok',
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'cpu_count': os.cpu_count(),
+              'trace_memory': _run['trace_memory'],
+              # Peak RSS of this process (the transformers run in parallel processes have their own)
+              'peak_rss_mb': peak_rss_mb(),
+              # The password is not written into the report
+              'args': {key: value for key, value in vars(args).items() if key != 'password'} if args else {},
+              'stages': stages}
+
+    filename = f'{path}/run_{finished_at.strftime("%Y%m%d_%H%M%S")}.json'
+    with open(filename, 'w') as file:
+        json.dump(report, file, indent=2, default=str)
+
+    summarizing(stages, peak_rss=report['peak_rss_mb'])
+    logger.info(f' Run report written to {filename}')
+
+    return filename
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for overlapping the extract and transform stages of the data
+engineering pipeline. The scrapers run in a thread that puts each raw file (NPI, NPRI and each TRI
+year) on a bounded queue as soon as it is written, and the transformers take them as they arrive,
+so the downloads run while the files already downloaded are transformed. When the queue is full,
+the scrapers wait (backpressure), and the raw TRI files of a year are removed once it is transformed,
+so the number of raw files on disk is bounded by the size of the queue.
+'''
+
+# Importing libraries
+from data_engineering.extract.npi_scraper import download_npi
+from data_engineering.extract.npri_scraper import download_npri
+from data_engineering.extract.tri_scraper import TRI_Scrapper
+from data_engineering.transform.npi_transformer import transforming_npi
+from data_engineering.transform.npri_transformer import transforming_npri
+from data_engineering.transform.tri_transformer import transforming_tri_year, combining_tri_years
+from data_engineering.monitoring import monitoring, current_stage, nesting
+
+import os
+import glob
+import queue
+import threading
+import logging
+
+logger = logging.getLogger(' Data engineering --> Extract and transform')
+
+dir_path = os.path.dirname(os.path.realpath(__file__)) # current directory path
+
+_done = object()
+
+
+def putting(items, item, stop):
+    '''
+    Function to put an item on the queue, waiting while it is full. It returns
+    False if the consumer stopped in the meantime
+    '''
+
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+
+    return False
+
+
+def queueing(iterable, queue_size=2, name='producer'):
+    '''
+    Function to iterate over the items of an iterable produced by a worker thread. The items
+    wait on a queue of queue_size items, so the producer waits when the consumer is behind.
+    An error of the producer is raised in the consumer
+    '''
+
+    items = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    record = current_stage()
+
+    def producing():
+        # The stages of the producer are nested into the stage that started it
+        with nesting(record):
+            try:
+                for item in iterable:
+                    if not putting(items, (item, None), stop):
+                        break
+                else:
+                    putting(items, (_done, None), stop)
+            except BaseException as e:
+                putting(items, (_done, e), stop)
+            finally:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+
+    producer = threading.Thread(target=producing, name=name, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is _done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+
+def extracting_files():
+    '''
+    Function to extract the raw files of the PRTR systems. It yields the system
+    and the year (TRI) as soon as the files are written
+    '''
+
+    logger.info(' Running NPI scraper')
+    with monitoring('npi_scraper'):
+        download_npi()
+    yield 'NPI', None
+
+    logger.info(' Running NPRI scraper')
+    with monitoring('npri_scraper'):
+        download_npri()
+    yield 'NPRI', None
+
+    logger.info(' Running TRI scraper')
+    Scrapper = TRI_Scrapper()
+    for year in Scrapper.extracting_tri_years(['3a', '3b', '3c']):
+        yield 'TRI', year
+
+
+def removing_tri_files(year):
+    '''
+    Function to remove the raw TRI files of a year once it is transformed
+    '''
+
+    for filepath in glob.glob(f'{dir_path}/extract/output/US_*_{year}.csv'):
+        os.remove(filepath)
+
+
+def overlapping_pipeline(queue_size=2):
+    '''
+    Function for running the scrapers and the transformers of the PRTR systems
+    at the same time. queue_size is the number of raw files (systems or TRI years)
+    that can wait for the transformers
+    '''
+
+    years = []
+    df_cas_searched = None
+    for system, year in queueing(extracting_files(), queue_size=queue_size, name='scrapers'):
+        if system == 'NPI':
+            logger.info(' Running NPI transformer')
+            with monitoring('npi_transformer'):
+                transforming_npi()
+        elif system == 'NPRI':
+            logger.info(' Running NPRI transformer')
+            with monitoring('npri_transformer'):
+                transforming_npri()
+        else:
+            logger.info(f' Running TRI transformer for {year}')
+            with monitoring(f'tri_transformer {year}'):
+                df_cas_searched = transforming_tri_year(year, df_cas_searched)
+            removing_tri_files(year)
+            years.append(year)
+
+    # The TRI years are combined in order, as the TRI transformer does
+    logger.info(' Combining TRI years')
+    with monitoring('tri_transformer'):
+        combining_tri_years(sorted(years))
@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for running the data engineering pipeline as a graph of stages.
+Each stage declares the stages it needs, its input files and its output files. The outputs are
+checkpointed under a hash of the code of the stage, its inputs and the outputs of the stages it
+needs, so a re-run skips the stages that are up to date and resumes from the first invalid one.
+A stage writing outside the files (the load) also checks that what it wrote is still there.
+'''
+
+# Importing libraries
+from data_engineering.extract.npi_scraper import download_npi
+from data_engineering.extract.npri_scraper import download_npri
+from data_engineering.extract.tri_scraper import TRI_Scrapper
+from data_engineering.transform.npi_transformer import transforming_npi
+from data_engineering.transform.npri_transformer import transforming_npri
+from data_engineering.transform.tri_transformer import transforming_tri
+from data_engineering.transform.chemical_standardizing import normalizing_chemicals
+from data_engineering.transform.industry_sector_standardizing import normalizing_sectors
+from data_engineering.transform.database_normalization import database_normalization
+from data_engineering.transform.common import config
+from data_engineering.transform.storage import file_extension
+from data_engineering.load.main import load_pipeline, checking_load
+from data_engineering.load.snapshot import file_hash
+from data_engineering.monitoring import monitoring, skipping
+
+from datetime import datetime
+import os
+import glob
+import json
+import shutil
+import hashlib
+import inspect
+import importlib
+import logging
+
+logger = logging.getLogger(' Data engineering')
+
+dir_path = os.path.dirname(os.path.realpath(__file__)) # current directory path
+checkpoint_path = f'{dir_path}/checkpoints'
+
+# Options that do not change what is loaded (the password is not kept in the checkpoints)
+runner_options = ['password', 'checkpoints', 'rerun', 'streaming', 'save_files', 'run_report',
+                  'trace_memory', 'progress', 'progress_file', 'progress_interval',
+                  'profile', 'profile_stages', 'profile_top', 'parallel_transform',
+                  'concurrent_extraction', 'overlapping', 'queue_size']
+
+# Tables of the normalized database (outputs of the database normalization)
+db_tables = list(config(f'{dir_path}/../ancillary/database_tables.yaml')['table'].keys())
+
+# Stages in order of execution. The paths are relative to this directory and
+# {ext} is the extension of the files handed over between the transform and load stages
+stages = {
+    'npi_scraper': {'function': lambda args: download_npi(),
+                    'code': 'data_engineering.extract.npi_scraper',
+                    'needs': [],
+                    'inputs': ['extract/config.yaml'],
+                    'outputs': ['extract/output/NPI_*.csv']},
+    'npri_scraper': {'function': lambda args: download_npri(),
+                     'code': 'data_engineering.extract.npri_scraper',
+                     'needs': [],
+                     'inputs': ['extract/config.yaml'],
+                     'outputs': ['extract/output/NPRI_*.csv']},
+    'tri_scraper': {'function': lambda args: TRI_Scrapper().extacting_tri_data_files(['3a', '3b', '3c']),
+                    'code': 'data_engineering.extract.tri_scraper',
+                    'needs': [],
+                    'inputs': ['extract/config.yaml',
+                               '../ancillary/TRI_File_*_columns.txt'],
+                    'outputs': ['extract/output/US_*.csv']},
+    'npi_transformer': {'function': lambda args: transforming_npi(),
+                        'code': 'data_engineering.transform.npi_transformer',
+                        'needs': ['npi_scraper'],
+                        'inputs': ['transform/config.yaml',
+                                   '../ancillary/NPI_columns_for_using.yaml',
+                                   '../ancillary/DQ_Reliability_Scores.csv'],
+                        'outputs': ['transform/output/npi.{ext}']},
+    'npri_transformer': {'function': lambda args: transforming_npri(),
+                         'code': 'data_engineering.transform.npri_transformer',
+                         'needs': ['npri_scraper'],
+                         'inputs': ['transform/config.yaml',
+                                    '../ancillary/NPRI_columns_for_using.yaml',
+                                    '../ancillary/DQ_Reliability_Scores.csv',
+                                    '../ancillary/CAN_*_NAICS.csv'],
+                         'outputs': ['transform/output/npri.{ext}']},
+    'tri_transformer': {'function': lambda args: transforming_tri(),
+                        'code': 'data_engineering.transform.tri_transformer',
+                        'needs': ['tri_scraper'],
+                        'inputs': ['transform/config.yaml',
+                                   'extract/config.yaml',
+                                   '../ancillary/TRI_columns_for_using.yaml',
+                                   '../ancillary/DQ_Reliability_Scores.csv',
+                                   '../ancillary/USA_*_NAICS.csv'],
+                        'outputs': ['transform/output/tri.{ext}']},
+    'chemical_standardizing': {'function': lambda args: normalizing_chemicals(),
+                               'code': 'data_engineering.transform.chemical_standardizing',
+                               'needs': ['npi_transformer', 'npri_transformer', 'tri_transformer'],
+                               'inputs': ['transform/config.yaml',
+                                          'extract/config.yaml',
+                                          '../ancillary/National_to_generic_chemicals.csv'],
+                               'outputs': ['transform/output/national_to_generic_substance.{ext}']},
+    'sector_standardizing': {'function': lambda args: normalizing_sectors(),
+                             'code': 'data_engineering.transform.industry_sector_standardizing',
+                             'needs': ['npi_transformer', 'npri_transformer', 'tri_transformer'],
+                             'inputs': ['transform/config.yaml',
+                                        '../ancillary/Dictionary_to_crosswalk_to_isic.yaml',
+                                        '../ancillary/*_to_ISIC_4.csv',
+                                        '../ancillary/ISIC_4.csv'],
+                             'outputs': ['transform/output/national_to_generic_sector.{ext}']},
+    'database_normalization': {'function': lambda args: database_normalization(),
+                               'code': 'data_engineering.transform.database_normalization',
+                               'needs': ['npi_transformer', 'npri_transformer', 'tri_transformer',
+                                         'chemical_standardizing', 'sector_standardizing'],
+                               'inputs': ['transform/config.yaml',
+                                          '../ancillary/database_tables.yaml',
+                                          '../ancillary/National_to_generic_transfer.csv',
+                                          '../ancillary/Chemicals_in_categories.csv'],
+                               # The key registries (transform/output/key_registry) are kept by the load
+                               # and not by the checkpoints, so they are not in the keys of the stages
+                               'outputs': [f'transform/output/{table}.{{ext}}' for table in db_tables]},
+    'load': {'function': lambda args: load_pipeline(args),
+             'code': 'data_engineering.load.main',
+             'needs': ['database_normalization'],
+             'inputs': [],
+             # The manifest has the number of records of each table, and the stage is
+             # only up to date while the database still has them
+             'outputs': ['load/output/load_manifest.json'],
+             'current': lambda args: checking_load(args),
+             'params': lambda args: {key: value for key, value in vars(args).items()
+                                     if key not in runner_options}}
+    }
+
+
+def code_version(module_name):
+    '''
+    Function to get the hash of the source code of a module and of
+    the modules of this package it uses
+    '''
+
+    modules = set()
+    pending = [module_name]
+    while pending:
+        name = pending.pop()
+        if name in modules:
+            continue
+        modules.add(name)
+        for obj in vars(importlib.import_module(name)).values():
+            dependency = obj.__name__ if inspect.ismodule(obj) else getattr(obj, '__module__', None)
+            if isinstance(dependency, str) and dependency.startswith('data_engineering.'):
+                pending.append(dependency)
+
+    sha256 = hashlib.sha256()
+    for name in sorted(modules):
+        sha256.update(name.encode('utf-8'))
+        with open(importlib.import_module(name).__file__, 'rb') as file:
+            sha256.update(file.read())
+
+    return sha256.hexdigest()
+
+
+def matching_files(patterns):
+    '''
+    Function to get the files (relative paths) matching the patterns of a stage
+    '''
+
+    files = []
+    for pattern in patterns:
+        pattern = pattern.format(ext=file_extension())
+        files += [os.path.relpath(path, dir_path)
+                  for path in sorted(glob.glob(f'{dir_path}/{pattern}'))]
+
+    return files
+
+
+def stage_key(name, stage, digests, args):
+    '''
+    Function to get the key of the checkpoint of a stage
+    '''
+
+    content = {'stage': name,
+               'code': code_version(stage['code']),
+               'file_format': file_extension(),
+               'params': stage['params'](args) if 'params' in stage else {},
+               'inputs': {path: file_hash(f'{dir_path}/{path}') for path in matching_files(stage['inputs'])},
+               'needs': {need: digests[need] for need in stage['needs']}}
+
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def calling_checkpoint(name, key):
+    '''
+    Function to call the manifest of a checkpoint (None if it does not exist)
+    '''
+
+    manifest_path = f'{checkpoint_path}/{name}/{key}/manifest.json'
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r') as file:
+        return json.load(file)
+
+
+def checkpointing(name, stage, key):
+    '''
+    Function to copy the outputs of a stage into its checkpoint. The checkpoint is built next
+    to its final path and moved there once complete, and replaces the older ones of the stage
+    '''
+
+    stage_path = f'{checkpoint_path}/{name}'
+    building_path = f'{stage_path}/{key}.building'
+    if os.path.isdir(building_path):
+        shutil.rmtree(building_path)
+    os.makedirs(building_path)
+
+    files = {}
+    for pattern in stage['outputs']:
+        matches = matching_files([pattern])
+        if not matches:
+            raise ValueError(f'Error: stage {name} did not write {pattern.format(ext=file_extension())}')
+        for path in matches:
+            os.makedirs(os.path.dirname(f'{building_path}/files/{path}'), exist_ok=True)
+            shutil.copy2(f'{dir_path}/{path}', f'{building_path}/files/{path}')
+            files[path] = file_hash(f'{dir_path}/{path}')
+
+    manifest = {'stage': name,
+                'key': key,
+                'created_at': datetime.now().isoformat(sep=' '),
+                'files': files,
+                'digest': hashlib.sha256(json.dumps(files, sort_keys=True).encode('utf-8')).hexdigest()}
+    with open(f'{building_path}/manifest.json', 'w') as file:
+        json.dump(manifest, file, indent=2)
+
+    for old in os.listdir(stage_path):
+        if old != f'{key}.building':
+            shutil.rmtree(f'{stage_path}/{old}')
+    os.replace(building_path, f'{stage_path}/{key}')
+
+    return manifest
+
+
+def restoring_checkpoint(name, manifest):
+    '''
+    Function to put back the outputs of a stage (e.g., removed by a later stage) from its checkpoint
+    '''
+
+    for path, sha256 in manifest['files'].items():
+        if os.path.exists(f'{dir_path}/{path}') and (file_hash(f'{dir_path}/{path}') == sha256):
+            continue
+        logger.info(f' Restoring {path} from the checkpoint of {name}')
+        os.makedirs(os.path.dirname(f'{dir_path}/{path}'), exist_ok=True)
+        shutil.copy2(f'{checkpoint_path}/{name}/{manifest["key"]}/files/{path}', f'{dir_path}/{path}')
+
+
+def running_stages(args, rerun=None):
+    '''
+    Function to run the stages that are not up to date. rerun has the
+    stages to run even if they are up to date (e.g., to download new data)
+    '''
+
+    rerun = rerun or []
+    manifests = {}
+    digests = {}
+    for name, stage in stages.items():
+        for need in stage['needs']:
+            if need not in manifests:
+                raise ValueError(f'Error: stage {name} needs {need}, which is not run before it')
+
+        key = stage_key(name, stage, digests, args)
+        manifest = calling_checkpoint(name, key)
+        if (manifest is not None) and ('current' in stage) and (name not in rerun):
+            if not stage['current'](args):
+                logger.info(f' Stage {name} has a checkpoint, but what it wrote has changed')
+                manifest = None
+        if (manifest is not None) and (name not in rerun):
+            logger.info(f' Stage {name} is up to date')
+            skipping(name)
+        else:
+            for need in stage['needs']:
+                restoring_checkpoint(need, manifests[need])
+            logger.info(f' Running stage {name}')
+            with monitoring(name):
+                stage['function'](args)
+            manifest = checkpointing(name, stage, key)
+        manifests[name] = manifest
+        digests[name] = manifest['digest']
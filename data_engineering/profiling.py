@@ -0,0 +1,388 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for profiling the chosen stages of the data engineering pipeline
+with cProfile (deterministic, every function call), a sampling profiler (the call stack of the
+stage every few milliseconds, with a low overhead) or tracemalloc (memory allocated by each line).
+The profiles are written into a directory per run, and the top hot functions (or lines) of each
+stage are summarized in the log. Nothing is profiled when it is not enabled.
+'''
+
+# Importing libraries
+from contextlib import contextmanager
+from collections import Counter
+from datetime import datetime
+import os
+import io
+import re
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+import logging
+
+logger = logging.getLogger(' Data engineering --> Profiling')
+
+dir_path = os.path.dirname(os.path.realpath(__file__)) # current directory path
+
+profilers = ['cprofile', 'sampling', 'memory']
+
+_profiling = {'profiler': None,
+              'stages': None,
+              'path': None,
+              'top': 20,
+              'interval': 0.005,
+              'profiles': []}
+# Only one stage is profiled at a time (e.g., nested stages or tables loaded by several threads)
+_active = threading.Lock()
+
+
+def enabling_profiling(profiler='cprofile', stages=None, path=None, top=20, interval=0.005):
+    '''
+    Function to start profiling the stages (the whole pipeline by default). path is the
+    directory of the profiles (a new directory in data_engineering/reports/profiles by default)
+    '''
+
+    if profiler not in profilers:
+        raise ValueError(f'Error: profiler {profiler} is not supported')
+    _profiling['profiler'] = profiler
+    _profiling['stages'] = stages or ['pipeline']
+    _profiling['path'] = path or f'{dir_path}/reports/profiles/run_{datetime.now().strftime("%Y%m%d_%H%M%S")}'
+    _profiling['top'] = top
+    _profiling['interval'] = interval
+    _profiling['profiles'] = []
+    os.makedirs(_profiling['path'], exist_ok=True)
+
+
+def disabling_profiling():
+    '''
+    Function to stop profiling and write the index of the profiles of the run
+    '''
+
+    if _profiling['profiler'] is None:
+        return
+    with open(f'{_profiling["path"]}/index.json', 'w') as file:
+        json.dump({'profiler': _profiling['profiler'],
+                   'stages': _profiling['stages'],
+                   'profiles': _profiling['profiles']}, file, indent=2)
+    logger.info(f' Profiles written to {_profiling["path"]}')
+    _profiling['profiler'] = None
+
+
+def profiling_settings():
+    '''
+    Function to get the settings for profiling the stages run by another
+    process (None if profiling is not enabled)
+    '''
+
+    if _profiling['profiler'] is None:
+        return None
+    return {key: _profiling[key] for key in ['profiler', 'stages', 'path', 'top', 'interval']}
+
+
+def profiled_stages():
+    '''
+    Function to get the stages chosen for profiling (none if profiling is not enabled)
+    '''
+
+    if _profiling['profiler'] is None:
+        return []
+    return list(_profiling['stages'])
+
+
+def profile_reports():
+    '''
+    Function to get the profiles written so far
+    '''
+
+    return list(_profiling['profiles'])
+
+
+def adding_profiles(profiles):
+    '''
+    Function to add the profiles written by another process to the index of the run
+    '''
+
+    _profiling['profiles'] += profiles
+
+
+@contextmanager
+def profiling(stage):
+    '''
+    Context manager to profile a stage if it is one of the chosen stages
+    '''
+
+    if (_profiling['profiler'] is None) or (stage not in _profiling['stages']):
+        yield
+        return
+    if not _active.acquire(blocking=False):
+        logger.warning(f' {stage} is not profiled (another stage is being profiled)')
+        yield
+        return
+
+    filename = f'{_profiling["path"]}/{re.sub(r"[^A-Za-z0-9_.-]+", "_", stage)}'
+    profile = {'cprofile': profiling_calls,
+               'sampling': profiling_samples,
+               'memory': profiling_memory}[_profiling['profiler']]
+    try:
+        with profile(stage, filename):
+            yield
+    finally:
+        _active.release()
+
+
+def writing_summary(stage, filename, sections):
+    '''
+    Function to write the summary of the top hot functions (or lines) of a stage into a text
+    file and the log. sections is a list of (title, header, rows)
+    '''
+
+    lines = []
+    logger.info(f' Top of {stage} ({_profiling["profiler"]}):')
+    for title, header, rows in sections:
+        lines += [title, header] + rows + ['']
+        logger.info(f' {title}')
+        for line in [header] + rows[:_profiling['top']]:
+            logger.info(f' {line}')
+    with open(f'{filename}.txt', 'w') as file:
+        file.write('\n'.join(lines))
+    _profiling['profiles'].append({'stage': stage,
+                                   'summary': f'{filename}.txt'})
+
+
+def function_name(filename, line, name):
+    '''
+    Function to write a function as name (file:line)
+    '''
+
+    return f'{name} ({os.path.basename(filename)}:{line})'
+
+
+def pipeline_function(filename):
+    '''
+    Function to tell whether a function belongs to the data engineering package
+    '''
+
+    return os.path.realpath(filename).startswith(dir_path)
+
+
+@contextmanager
+def profiling_calls(stage, filename):
+    '''
+    Context manager to profile a stage with cProfile. The profile can be
+    opened with pstats or snakeviz (.prof)
+    '''
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(f'{filename}.prof')
+
+        stats = pstats.Stats(profile, stream=io.StringIO()).stats
+        n_rows = _profiling['top'] * 5
+        header = f'{"Calls":>12}{"Own (s)":>12}{"Total (s)":>12}  Function'
+        to_row = lambda function, measures: f'{measures[1]:>12,}{measures[2]:>12.3f}{measures[3]:>12.3f}  '\
+                                            f'{function_name(*function)}'
+        pipeline = sorted([item for item in stats.items() if pipeline_function(item[0][0])],
+                          key=lambda item: item[1][3], reverse=True)
+        functions = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)
+        writing_summary(stage, filename,
+                        [('Pipeline functions by total time', header,
+                          [to_row(*item) for item in pipeline[:n_rows]]),
+                         ('All functions by own time', header,
+                          [to_row(*item) for item in functions[:n_rows]])])
+        _profiling['profiles'][-1]['profile'] = f'{filename}.prof'
+
+
+def sampling_stacks(thread_id, samples, stop, interval):
+    '''
+    Function run by the sampling thread: it counts the call stacks
+    (file, line, function) of a thread
+    '''
+
+    while not stop.wait(interval):
+        frame = sys._current_frames().get(thread_id)
+        stack = []
+        while frame is not None:
+            stack.append((frame.f_code.co_filename, frame.f_code.co_firstlineno, frame.f_code.co_name))
+            frame = frame.f_back
+        if stack:
+            samples[tuple(reversed(stack))] += 1
+
+
+@contextmanager
+def profiling_samples(stage, filename):
+    '''
+    Context manager to profile a stage by sampling its call stack. The stacks are written
+    in the collapsed format of the flame graphs (e.g., flamegraph.pl or speedscope)
+    '''
+
+    samples = Counter()
+    stop = threading.Event()
+    sampler = threading.Thread(target=sampling_stacks,
+                               args=(threading.get_ident(), samples, stop, _profiling['interval']),
+                               name='sampling profiler', daemon=True)
+    start = time.perf_counter()
+    sampler.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        sampler.join()
+        elapsed = time.perf_counter() - start
+
+        with open(f'{filename}.collapsed', 'w') as file:
+            for stack, count in samples.most_common():
+                file.write(f'{";".join(function_name(*function) for function in stack)} {count}\n')
+
+        # Own samples (function on top of the stack) and total samples (function in the stack)
+        total = sum(samples.values()) or 1
+        own, inclusive = Counter(), Counter()
+        for stack, count in samples.items():
+            own[stack[-1]] += count
+            for function in set(stack):
+                inclusive[function] += count
+        n_rows = _profiling['top'] * 5
+        header = f'{"Own":>9}{"Total":>9}  Function ({total:,} samples in {elapsed:.1f} s)'
+        to_row = lambda function: f'{own[function] / total:>9.1%}{inclusive[function] / total:>9.1%}  '\
+                                  f'{function_name(*function)}'
+        pipeline = sorted([function for function in inclusive.keys() if pipeline_function(function[0])],
+                          key=lambda function: inclusive[function], reverse=True)
+        functions = sorted(own.keys(), key=lambda function: own[function], reverse=True)
+        writing_summary(stage, filename,
+                        [('Pipeline functions by total samples', header,
+                          [to_row(function) for function in pipeline[:n_rows]]),
+                         ('All functions by own samples', header,
+                          [to_row(function) for function in functions[:n_rows]])])
+        _profiling['profiles'][-1]['profile'] = f'{filename}.collapsed'
+
+
+def snapshotting_peak(snapshots, stop, interval, ignoring):
+    '''
+    Function run by the memory sampling thread: it takes a snapshot of the traced
+    memory each time it grows over the last snapshot by 10 % (i.e., close to the peak)
+    '''
+
+    while not stop.wait(interval):
+        current = tracemalloc.get_traced_memory()[0]
+        if current > snapshots['size'] * 1.1:
+            snapshots['peak'] = tracemalloc.take_snapshot().filter_traces(ignoring)
+            snapshots['size'] = current
+
+
+def pipeline_lines(snapshot, before):
+    '''
+    Function to attribute the memory of a snapshot (over the one before the stage)
+    to the innermost lines of the data engineering package in the tracebacks
+    '''
+
+    sizes, blocks = Counter(), Counter()
+    for difference in snapshot.compare_to(before, 'traceback'):
+        if difference.size_diff <= 0:
+            continue
+        line = next((frame for frame in reversed(difference.traceback) if pipeline_function(frame.filename)),
+                    None)
+        if line is not None:
+            sizes[(line.filename, line.lineno)] += difference.size_diff
+            blocks[(line.filename, line.lineno)] += difference.count_diff
+
+    return [f'{size / 1024 ** 2:>12.2f}{blocks[line]:>12,}  {os.path.basename(line[0])}:{line[1]}'
+            for line, size in sizes.most_common(_profiling['top'] * 5)]
+
+
+@contextmanager
+def profiling_memory(stage, filename):
+    '''
+    Context manager to profile the memory allocated by each line of a stage with
+    tracemalloc. The snapshot close to the peak can be opened with tracemalloc.Snapshot.load
+    '''
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(25)
+    tracemalloc.reset_peak()
+    ignoring = [tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>')]
+    before = tracemalloc.take_snapshot().filter_traces(ignoring)
+    snapshots = {'peak': before, 'size': tracemalloc.get_traced_memory()[0]}
+    stop = threading.Event()
+    sampler = threading.Thread(target=snapshotting_peak,
+                               args=(snapshots, stop, max(_profiling['interval'], 0.05), ignoring),
+                               name='memory profiler', daemon=True)
+    sampler.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        sampler.join()
+        peak = tracemalloc.get_traced_memory()[1]
+        after = tracemalloc.take_snapshot().filter_traces(ignoring)
+        if started:
+            tracemalloc.stop()
+        snapshots['peak'].dump(f'{filename}.tracemalloc')
+
+        header = f'{"Size (MB)":>12}{"Blocks":>12}  Line'
+        to_rows = lambda differences: [f'{difference.size_diff / 1024 ** 2:>12.2f}{difference.count_diff:>12,}  '
+                                       f'{os.path.basename(difference.traceback[-1].filename)}:'
+                                       f'{difference.traceback[-1].lineno}'
+                                       for difference in differences[:_profiling['top'] * 5]]
+        writing_summary(stage, filename,
+                        [(f'Pipeline lines by memory held close to the peak (peak of {peak / 1024 ** 2:.1f} MB, '
+                          f'{snapshots["size"] / 1024 ** 2:.1f} MB in the snapshot)',
+                          header, pipeline_lines(snapshots['peak'], before)),
+                         ('All lines by memory held close to the peak', header,
+                          to_rows(snapshots['peak'].compare_to(before, 'lineno'))),
+                         ('All lines by memory allocated and not freed at the end of the stage', header,
+                          to_rows(after.compare_to(before, 'lineno')))])
+        _profiling['profiles'][-1]['profile'] = f'{filename}.tracemalloc'
+
+
+def adding_profile_arguments(parser, stages=None):
+    '''
+    Function to add the profiling options to the parser of a __main__. stages
+    are the stages that can be chosen (the first one is profiled by default)
+    '''
+
+    parser.add_argument('--profile',
+                        help='Would you like to profile the stages with cProfile, a sampling profiler or tracemalloc (memory)',
+                        choices=['None'] + profilers,
+                        type=str,
+                        default='None')
+    parser.add_argument('--profile_stages',
+                        help='Stages to profile',
+                        nargs='+',
+                        choices=stages,
+                        type=str,
+                        default=stages[:1] if stages else None)
+    parser.add_argument('--profile_top',
+                        help='Number of hot functions (or lines) in the summary of each stage',
+                        type=int,
+                        default=20)
+
+
+@contextmanager
+def profiling_main(args, stage):
+    '''
+    Context manager for the __main__ of a stage: it profiles the stage if --profile is given
+    '''
+
+    if args.profile == 'None':
+        yield
+        return
+    logging.basicConfig(level=logging.INFO)
+    enabling_profiling(profiler=args.profile,
+                       stages=args.profile_stages or [stage],
+                       top=args.profile_top)
+    try:
+        with profiling(stage):
+            yield
+    finally:
+        disabling_profiling()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for following the long-running loops of the data engineering
+pipeline (e.g., the SRS lookups or the record-by-record ORM load): items done, items per second
+and estimated time left, written into the log (console) or into a metrics file in the Prometheus
+textfile format (e.g., for the textfile collector of the node exporter). A thread reports every few
+seconds, so a loop waiting on a stalled endpoint shows up as a falling rate. When the progress is
+not enabled, the loops iterate over their items as they are.
+'''
+
+# Importing libraries
+import os
+import re
+import time
+import threading
+import logging
+
+logger = logging.getLogger(' Data engineering --> Progress')
+
+dir_path = os.path.dirname(os.path.realpath(__file__)) # current directory path
+
+_progress = {'mode': None,
+             'path': None,
+             'interval': 10.0,
+             'tasks': {}}
+_lock = threading.Lock()
+_stop = threading.Event()
+_reporter = []
+
+
+def enabling_progress(mode='console', path=None, interval=10.0):
+    '''
+    Function to start reporting the progress of the loops every interval seconds.
+    mode is console (log) or prometheus (metrics file written into path)
+    '''
+
+    if mode not in ['console', 'prometheus']:
+        raise ValueError(f'Error: progress mode {mode} is not supported')
+    _progress['mode'] = mode
+    _progress['path'] = path or f'{dir_path}/reports/progress.prom'
+    _progress['interval'] = interval
+    if mode == 'prometheus':
+        os.makedirs(os.path.dirname(os.path.abspath(_progress['path'])), exist_ok=True)
+
+    _stop.clear()
+    reporter = threading.Thread(target=_reporting_loop, name='progress', daemon=True)
+    reporter.start()
+    _reporter.append(reporter)
+
+
+def disabling_progress():
+    '''
+    Function to stop reporting the progress (after a last report)
+    '''
+
+    if _progress['mode'] is None:
+        return
+    _stop.set()
+    while _reporter:
+        _reporter.pop().join()
+    reporting()
+    _progress['mode'] = None
+
+
+def progress_settings(suffix=None):
+    '''
+    Function to get the settings for reporting the progress of another process (None if the
+    progress is not reported). The metrics file of the process takes the suffix, so the
+    processes do not replace the file of each other
+    '''
+
+    if _progress['mode'] is None:
+        return None
+    path = _progress['path']
+    if suffix is not None:
+        root, extension = os.path.splitext(path)
+        path = f'{root}_{suffix}{extension}'
+    return {'mode': _progress['mode'],
+            'path': path,
+            'interval': _progress['interval']}
+
+
+def _reporting_loop():
+    '''
+    Function run by the reporting thread
+    '''
+
+    while not _stop.wait(_progress['interval']):
+        reporting()
+
+
+def progressing(iterable, task, total=None):
+    '''
+    Function to follow the progress of a loop over an iterable. total is
+    the number of items (taken from the iterable if it has a length)
+    '''
+
+    if _progress['mode'] is None:
+        return iterable
+    if total is None:
+        try:
+            total = len(iterable)
+        except TypeError:
+            total = None
+
+    return _progressing(iterable, task, total)
+
+
+def _progressing(iterable, task, total):
+    '''
+    Function to yield the items of an iterable and count them
+    '''
+
+    now = time.monotonic()
+    state = {'task': task,
+             'done': 0,
+             'total': total,
+             'started': now,
+             'running': True,
+             'last_done': 0,
+             'last_time': now,
+             'rate': 0.0,
+             'updated_at': time.time()}
+    with _lock:
+        _progress['tasks'][task] = state
+
+    try:
+        for item in iterable:
+            yield item
+            state['done'] += 1
+    finally:
+        state['running'] = False
+        reporting(task)
+        # The metrics file keeps the finished tasks, and the log reports them once
+        if _progress['mode'] == 'console':
+            with _lock:
+                _progress['tasks'].pop(task, None)
+
+
+def measuring(state, now):
+    '''
+    Function to get the rate (items per second since the last report)
+    and the estimated time left (seconds) of a task
+    '''
+
+    done = state['done']
+    elapsed = now - state['last_time']
+    if elapsed > 0:
+        state['rate'] = (done - state['last_done']) / elapsed
+    if done > state['last_done']:
+        state['updated_at'] = time.time()
+    state['last_done'], state['last_time'] = done, now
+
+    if (state['total'] is None) or not state['running']:
+        eta = None
+    elif state['rate'] > 0:
+        eta = (state['total'] - done) / state['rate']
+    else:
+        eta = float('inf')
+
+    return eta
+
+
+def formatting_time(seconds):
+    '''
+    Function to write a number of seconds as h:mm:ss
+    '''
+
+    if seconds is None:
+        return '-'
+    if seconds == float('inf'):
+        return 'stalled'
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+
+    return f'{hours}:{minutes:02d}:{seconds:02d}'
+
+
+def reporting(task=None):
+    '''
+    Function to report the progress of a task (all the tasks by default)
+    '''
+
+    if _progress['mode'] is None:
+        return
+    now = time.monotonic()
+    with _lock:
+        tasks = list(_progress['tasks'].values())
+        if _progress['mode'] == 'console':
+            for state in tasks:
+                if (task is not None) and (state['task'] != task):
+                    continue
+                if (task is None) and not state['running']:
+                    continue
+                eta = measuring(state, now)
+                total = f'/{state["total"]:,}' if state['total'] is not None else ''
+                if state['running']:
+                    logger.info(f' {state["task"]}: {state["done"]:,}{total} items, '
+                                f'{state["rate"]:.1f} items/s, ETA {formatting_time(eta)}')
+                else:
+                    elapsed = now - state['started']
+                    logger.info(f' {state["task"]}: {state["done"]:,}{total} items in '
+                                f'{formatting_time(elapsed)} ({state["done"] / elapsed if elapsed else 0:.1f} items/s)')
+        else:
+            for state in tasks:
+                if state['running'] or (state['task'] == task):
+                    state['eta'] = measuring(state, now)
+            writing_metrics(tasks)
+
+
+def metric_label(value):
+    '''
+    Function to escape a value of a Prometheus label
+    '''
+
+    return re.sub(r'(["\\])', r'\\\1', str(value)).replace('\n', '\\n')
+
+
+def writing_metrics(tasks):
+    '''
+    Function to write the metrics of the tasks in the Prometheus textfile format. The
+    file is replaced at once, so the collector never reads it half written
+    '''
+
+    metrics = [('prtr_progress_items_done', 'Items done by the loop', lambda s: s['done']),
+               ('prtr_progress_items_total', 'Items of the loop', lambda s: s['total']),
+               ('prtr_progress_items_per_second', 'Items per second since the last report', lambda s: s['rate']),
+               ('prtr_progress_eta_seconds', 'Estimated seconds left', lambda s: s.get('eta')),
+               ('prtr_progress_last_item_timestamp_seconds', 'Unix time of the last item done', lambda s: s['updated_at']),
+               ('prtr_progress_running', 'Whether the loop is running', lambda s: int(s['running']))]
+    lines = []
+    for name, description, value in metrics:
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} gauge']
+        for state in tasks:
+            metric = value(state)
+            if metric is None:
+                continue
+            metric = '+Inf' if metric == float('inf') else (f'{metric:.3f}' if isinstance(metric, float) else str(metric))
+            lines.append(f'{name}{{task="{metric_label(state["task"])}"}} {metric}')
+
+    path = _progress['path']
+    with open(f'{path}.tmp', 'w') as file:
+        file.write('\n'.join(lines) + '\n')
+    os.replace(f'{path}.tmp', path)
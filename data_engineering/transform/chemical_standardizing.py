@@ -2,9 +2,12 @@
 # -*- coding: utf-8 -*-
 
 # Importing libraries
-from data_engineering.extract.srs_scraper import get_generic_name_by_cas
+from data_engineering.extract.srs_scraper import get_generic_names_by_cas
 from data_engineering.transform.common import opening_files
+from data_engineering.transform.storage import saving_table
+from data_engineering.profiling import adding_profile_arguments, profiling_main
 
+import argparse
 import os
 import pandas as pd
 
@@ -39,16 +42,21 @@ def normalizing_chemicals():
     idx = df_chem[pd.notnull(df_chem.cas_number)].index.tolist()
     df_chem.generic_substance_id.iloc[idx] = df_chem.cas_number.iloc[idx].str.replace('-', '')
     
-    # Looking for generic names
-    df_chem.generic_substance_name = df_chem.apply(lambda row: row['generic_substance_name']
-                                    if row['generic_substance_name']
-                                    else get_generic_name_by_cas(casNum=row['cas_number']),
-                                    axis=1)
+    # Looking for generic names (only once for each unique CAS number)
+    idx = ~(df_chem.generic_substance_name.fillna('').astype(bool))
+    cas_numbers = df_chem.loc[idx & pd.notnull(df_chem.cas_number), 'cas_number'].unique()
+    generic_names = get_generic_names_by_cas(cas_numbers)
+    df_chem.loc[idx, 'generic_substance_name'] = df_chem.loc[idx, 'cas_number'].map(generic_names)
 
     # Saving the transformed data
-    df_chem.to_csv(f'{dir_path}/output/national_to_generic_substance.csv', sep=',', index=False)
+    saving_table(df_chem, f'{dir_path}/output/national_to_generic_substance')
 
 
 if __name__ == '__main__':
-    
-    normalizing_chemicals()
\ No newline at end of file
+
+    parser = argparse.ArgumentParser()
+    adding_profile_arguments(parser, stages=['chemical_standardizing'])
+    args = parser.parse_args()
+
+    with profiling_main(args, 'chemical_standardizing'):
+        normalizing_chemicals()
\ No newline at end of file
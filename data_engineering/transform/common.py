@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 
 # Importing libraries
+from data_engineering.transform.storage import reading_table
+
 import yaml
 import os
 import pandas as pd
@@ -47,12 +49,12 @@ def opening_files(usecols=['national_substance_name',
 
     # Searching for PRTR files
     output_path = f'{dir_path}/output'
-    list_of_files = ['tri.csv', 'npi.csv', 'npri.csv']
+    list_of_files = ['tri', 'npi', 'npri']
         
     # Concatenating information from PRTR files
     df = pd.DataFrame()
     for file in list_of_files:
-        df_aux = pd.read_csv(f'{output_path}/{file}', usecols=usecols,
+        df_aux = reading_table(f'{output_path}/{file}', columns=usecols,
                             dtype=dtype)
         df_aux.drop_duplicates(keep='first', inplace=True)
         if 'tri' in file:
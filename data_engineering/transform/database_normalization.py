@@ -3,35 +3,55 @@
 
 # Importing libraries
 from data_engineering.transform.common import config
+from data_engineering.transform.storage import saving_table, reading_table, removing_table
+from data_engineering.transform.key_allocation import factorizing_keys, mapping_dimension, first_records, sorting_rows
+from data_engineering.transform.key_registry import registering_keys
+from data_engineering.profiling import adding_profile_arguments, profiling_main
 
+import argparse
 import os
+import numpy as np
 import pandas as pd
 
 
 dir_path = os.path.dirname(os.path.realpath(__file__))
 
-def calling_transformed_files(path, csv_from_path=['npi', 'npri', 'tri']):
+def calling_transformed_files(path, csv_from_path=['npi', 'npri', 'tri'],
+                            file_format=None, removing=True):
     '''
-    Function to call and concatenate all PRTRs or calling other files
+    Function to call and concatenate all PRTRs or calling other files.
+    The ancillary files are kept (removing=False)
     '''
 
     df = pd.DataFrame()
     for file in csv_from_path:
-        df_u = pd.read_csv(f'{path}/{file}.csv', dtype={'national_substance_id': object})
+        df_u = reading_table(f'{path}/{file}', dtype={'national_substance_id': object},
+                            file_format=file_format)
         df = pd.concat([df, df_u],
                         axis=0, ignore_index=True)
         del df_u
-        if not file == 'National_to_generic_transfer':
-            os.remove(f'{path}/{file}.csv')
+        if removing:
+            removing_table(f'{path}/{file}', file_format=file_format)
 
     return df
 
 
-def database_normalization():
+def normalizing_tables(stable_ids=True, save_files=False):
     '''
-    Function that looks for normalazing database
+    Function that looks for normalazing database and yields each table (name, data frame)
+    as soon as it is built, so it can be loaded without going through files. The tables
+    are yielded in the order of database_tables.yaml (parents first), and the denormalized
+    records are held until the fact table is built, as database_normalization does.
+    With stable_ids, the surrogate IDs are taken from the key registries so they do not
+    change between runs
     '''
 
+    def allocating_keys(df, keys, id_name):
+        if stable_ids:
+            return registering_keys(df, keys, id_name)
+        else:
+            return factorizing_keys(df, keys)
+
     # Calling columns for using and their names
     db_normalization_path = f'{dir_path}/../../ancillary/database_tables.yaml'
     db_normalization = config(db_normalization_path)['table']
@@ -39,14 +59,17 @@ def database_normalization():
     # Calling PRTR systems
     prtr = calling_transformed_files(f'{dir_path}/output')
     country_to_prtr = {'USA': 'TRI', 'AUS': 'NPI', 'CAN': 'NPRI'}
-    prtr['prtr_system'] = prtr.country.apply(lambda x: country_to_prtr[x])
+    prtr['prtr_system'] = prtr.country.map(country_to_prtr)
     country_to_ics = {'USA': 'USA_NAICS', 'AUS': 'ANZSIC', 'CAN': 'CAN_NAICS'}
-    prtr['industry_classification_system'] = prtr.country.apply(lambda x: country_to_ics[x])
+    prtr['industry_classification_system'] = prtr.country.map(country_to_ics)
     prtr.drop(columns=['cas_number', 'national_substance_name'], inplace=True)
     prtr.reset_index(inplace=True, drop=True)
-    prtr['transfer_record_id'] = pd.Series(prtr.index.tolist()) + 1
     prtr.reliability_score = prtr.reliability_score.astype(int)
-    prtr_columns = list(prtr.columns)
+
+    # Compact codes for the string keys repeated across the fact table
+    for col in ['national_substance_id', 'national_transfer_class_name',
+                'prtr_system', 'industry_classification_system', 'country']:
+        prtr[col] = prtr[col].astype('category')
 
     # Calling sectors
     sector = calling_transformed_files(f'{dir_path}/output',
@@ -58,7 +81,8 @@ def database_normalization():
 
     # Calling transfer classes
     t_class = calling_transformed_files(f'{dir_path}/../../ancillary',
-                                    csv_from_path=['National_to_generic_transfer'])
+                                    csv_from_path=['National_to_generic_transfer'],
+                                    file_format='csv', removing=False)
     t_class = t_class[pd.notnull(t_class.generic_transfer_class_id)]
     t_class.generic_system_comment =\
         t_class.groupby('generic_transfer_class_id')\
@@ -68,62 +92,89 @@ def database_normalization():
 
     # Calling chemicals in categories
     chem_in_category = calling_transformed_files(f'{dir_path}/../../ancillary',
-                                    csv_from_path=['Chemicals_in_categories'])
+                                    csv_from_path=['Chemicals_in_categories'],
+                                    file_format='csv', removing=False)
     chem_in_category.drop(columns='generic_substance_name', inplace=True)
 
-    # Merging dataframes
-    mergings = [
+    # Mapping the dimensions into the fact table (first record for repeated keys)
+    mappings = [
                 [sector, ['national_sector_code', 'industry_classification_system']],
                 [t_class, ['national_transfer_class_name', 'prtr_system']],
                 [substance, ['national_substance_id', 'prtr_system']]
                 ]
     del sector, substance, t_class
-    for merging in mergings:
-        prtr = pd.merge(prtr, merging[0], how='left', on=merging[1])
-    del mergings
-    prtr.drop_duplicates(keep='first', subset=prtr_columns, inplace=True)
-
-    # Creating 'national_transfer_class_prtr_system_id'
-    grouping = ['national_transfer_class_id', 'prtr_system']
-    prtr['national_transfer_class_prtr_system_id'] = pd.Series(prtr.groupby(grouping).ngroup() + 1)
-
-    # Creating 'national_sector_id'
-    grouping = ['national_sector_code', 'industry_classification_system']
-    prtr['national_sector_id'] = pd.Series(prtr.groupby(grouping).ngroup() + 1)
-
-    # Creating 'national_generic_sector_id'
-    grouping = ['national_sector_id', 'generic_sector_code']
-    prtr['national_generic_sector_id'] = pd.Series(prtr.groupby(grouping).ngroup() + 1)
-
-    # Creating 'national_substance_prtr_system_id'
-    grouping = ['national_substance_id', 'prtr_system']
-    prtr['national_substance_prtr_system_id'] = pd.Series(prtr.groupby(grouping).ngroup() + 1)
-
-    # Creating 'national_generic_substance_id'
-    grouping = ['national_substance_prtr_system_id', 'generic_substance_id']
-    prtr['national_generic_substance_id'] = pd.Series(prtr.groupby(grouping).ngroup() + 1)
-
-    # Creating 'national_facility_and_generic_sector_id'
-    grouping = ['national_facility_id', 'national_generic_sector_id']
-    prtr['national_facility_and_generic_sector_id'] = pd.Series(prtr.groupby(grouping).ngroup() + 1)
+    for mapping in mappings:
+        prtr = mapping_dimension(prtr, mapping[0], mapping[1])
+    del mappings
+
+    # Allocating the surrogate keys. The order matters because some keys are built on others
+    surrogate_keys = {
+        'national_transfer_class_prtr_system_id': ['national_transfer_class_id', 'prtr_system'],
+        'national_sector_id': ['national_sector_code', 'industry_classification_system'],
+        'national_generic_sector_id': ['national_sector_id', 'generic_sector_code'],
+        'national_substance_prtr_system_id': ['national_substance_id', 'prtr_system'],
+        'national_generic_substance_id': ['national_substance_prtr_system_id', 'generic_substance_id'],
+        'national_facility_and_generic_sector_id': ['national_facility_id', 'national_generic_sector_id']
+        }
+    for surrogate_key, grouping in surrogate_keys.items():
+        prtr[surrogate_key] = allocating_keys(prtr, grouping, surrogate_key)
+
+    # Creating 'transfer_record_id' from the natural key of each record
+    if stable_ids:
+        grouping = ['prtr_system', 'reporting_year', 'national_facility_id',
+                    'national_sector_code', 'national_substance_id',
+                    'national_transfer_class_name']
+        codes = factorizing_keys(prtr, grouping)
+        # The records sharing a natural key are numbered in the order of their content,
+        # so the same records get the same IDs whatever the order of the files
+        order = sorting_rows(prtr, grouping + [col for col in prtr.columns if col not in grouping])
+        occurrence = np.empty(prtr.shape[0], dtype='int64')
+        occurrence[order] = pd.Series(codes[order]).groupby(codes[order]).cumcount().to_numpy()
+        prtr['record_occurrence'] = occurrence
+        prtr['transfer_record_id'] = registering_keys(prtr, grouping + ['record_occurrence'],
+                                                      'transfer_record_id')
+        prtr.drop(columns=['record_occurrence'], inplace=True)
+    else:
+        prtr['transfer_record_id'] = np.arange(1, prtr.shape[0] + 1)
 
     # Creating 'generic_substance_chemical_in_category_id'
     grouping = ['chemical_in_category_cas', 'generic_substance_id']
     generic_substance_id = prtr['generic_substance_id'].unique().tolist()
     chem_in_category = chem_in_category[chem_in_category['generic_substance_id'].isin(generic_substance_id)]
-    chem_in_category['generic_substance_chemical_in_category_id'] = pd.Series(chem_in_category.groupby(grouping).ngroup() + 1)
-
-    # Creating individual tables
+    chem_in_category = chem_in_category.reset_index(drop=True)
+    chem_in_category['generic_substance_chemical_in_category_id'] = allocating_keys(chem_in_category, grouping,
+                                                                    'generic_substance_chemical_in_category_id')
+
+    # Creating individual tables from the first record of each key. The tables come after the
+    # tables they refer to, so the fact table is the last one and prtr is released before it is yielded
+    prtr_tables = [table for table in db_normalization.keys()
+                   if table not in ['generic_substance_chemical_in_category', 'chemical_in_category']]
     for table, params in db_normalization.items():
-        if table not in ['generic_substance_chemical_in_category', 'chemical_in_category']:
-            df_table = prtr[params['cols']]
+        if table in prtr_tables:
+            df_table = first_records(prtr, params['key'], params['cols'])
+            if table == prtr_tables[-1]:
+                del prtr
         else:
-            df_table = chem_in_category[params['cols']]
-        df_table = df_table.drop_duplicates(keep='first', subset=params['key']).reset_index(drop=True)
-        df_table.to_csv(f'{dir_path}/output/{table}.csv',
-                        index=False, sep=',')
-    
+            df_table = first_records(chem_in_category, params['key'], params['cols'])
+        if save_files:
+            saving_table(df_table, f'{dir_path}/output/{table}')
+        yield table, df_table
+
+
+def database_normalization(stable_ids=True):
+    '''
+    Function that saves the tables of the normalized database
+    '''
+
+    for _ in normalizing_tables(stable_ids=stable_ids, save_files=True):
+        pass
+
 
 if __name__ == '__main__':
-    
-    database_normalization()
\ No newline at end of file
+
+    parser = argparse.ArgumentParser()
+    adding_profile_arguments(parser, stages=['database_normalization'])
+    args = parser.parse_args()
+
+    with profiling_main(args, 'database_normalization'):
+        database_normalization()
\ No newline at end of file
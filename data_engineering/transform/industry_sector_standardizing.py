@@ -4,35 +4,43 @@
 # Importing libraries
 from data_engineering.transform.common import opening_files
 from data_engineering.transform.common import config
+from data_engineering.transform.storage import saving_table
+from data_engineering.transform.key_allocation import factorizing_keys
+from data_engineering.profiling import adding_profile_arguments, profiling_main
 
+import argparse
 import pandas as pd
 pd.set_option('mode.chained_assignment', None)
 import os
-import re
 
 
 dir_path = os.path.dirname(os.path.realpath(__file__)) # current directory path
 ancillary_path = f'{dir_path}/../../ancillary' # ancillary folder path
 
-def sections_to_potential_divisions(codes):
+def sections_to_potential_divisions(df, grouping, col='isic_code'):
     '''
-    Function for looking for the potential ISIC division
+    Function for looking for the potential ISIC division of each group,
+    i.e., the most frequent division (ties go to the lowest division)
     '''
 
-    codes = [str(code) for code in codes]
-    divisions = [code[0:2] if len(code) == 4 else code[0] for code in codes]
-    df_divisions = pd.DataFrame({'divisions': divisions})
-    df_divisions = df_divisions.divisions.value_counts().rename_axis('divisions').reset_index(name='counts')
-    df_divisions['divisions'] = df_divisions['divisions'].astype(int)
-    df_divisions.sort_values(by='divisions', ascending=True, inplace=True)
-    df_divisions.reset_index(drop=True, inplace=True)
-    max_count = df_divisions['counts'].max()
-    if df_divisions[df_divisions.counts != max_count].empty:
-        result_code = df_divisions.divisions.iloc[0]
-    else:
-        result_code = df_divisions.loc[df_divisions.counts.idxmax(), 'divisions']
+    # Group of each record (0 for records having a missing key)
+    groups = factorizing_keys(df, grouping)
+    valid = groups > 0
 
-    return result_code
+    # ISIC divisions from the class (4 digits) or group (3 digits) codes
+    codes = df.loc[valid, col].astype(str)
+    divisions = codes.str[0:2].where(codes.str.len() == 4, codes.str[0:1]).astype(int)
+
+    # Counting the divisions by group and keeping the most frequent one
+    df_divisions = pd.DataFrame({'group': groups[valid],
+                                 'divisions': divisions.to_numpy()})
+    df_divisions = df_divisions.groupby(['group', 'divisions']).size().reset_index(name='counts')
+    df_divisions.sort_values(by=['group', 'counts', 'divisions'],
+                             ascending=[True, False, True], inplace=True)
+    df_divisions.drop_duplicates(subset='group', keep='first', inplace=True)
+    result_codes = pd.Series(groups, index=df.index).map(df_divisions.set_index('group')['divisions'])
+
+    return result_codes
 
 
 def normalizing_sectors():
@@ -61,8 +69,8 @@ def normalizing_sectors():
 
         national_code = att['cols'][0]
         national_name = att['cols'][1]
-        df[national_code] = df[national_code].apply(lambda val: re.sub(r"[^0-9]+", "", val).lstrip('0'))
-        df['ISIC'] = df['ISIC'].apply(lambda val: re.sub(r"[^0-9]+", "", val).lstrip('0'))
+        df[national_code] = df[national_code].str.replace(r'[^0-9]+', '', regex=True).str.lstrip('0')
+        df['ISIC'] = df['ISIC'].str.replace(r'[^0-9]+', '', regex=True).str.lstrip('0')
         df[national_code] = pd.to_numeric(df[national_code])
         df = df.loc[pd.notnull(df[national_code])]
         df[national_code] = df[national_code].astype('int')
@@ -91,8 +99,7 @@ def normalizing_sectors():
 
     # Looking for ISIC divisions
     grouping = ['national_sector_code', 'national_sector_name', 'industry_classification_system']
-    df_converter['generic_sector_code'] = df_converter.groupby(grouping, as_index=False)['isic_code']\
-        .transform(lambda g: sections_to_potential_divisions(g))
+    df_converter['generic_sector_code'] = sections_to_potential_divisions(df_converter, grouping)
 
 
     # National to generic industry codes
@@ -114,10 +121,14 @@ def normalizing_sectors():
                                   on='generic_sector_code', how='left')
 
     # Saving the information
-    df_national_to_generic.to_csv(f'{dir_path}/output/national_to_generic_sector.csv',
-                                  index=False, sep=',')
+    saving_table(df_national_to_generic, f'{dir_path}/output/national_to_generic_sector')
 
 
 if __name__ == '__main__':
 
-    normalizing_sectors()
+    parser = argparse.ArgumentParser()
+    adding_profile_arguments(parser, stages=['sector_standardizing'])
+    args = parser.parse_args()
+
+    with profiling_main(args, 'sector_standardizing'):
+        normalizing_sectors()
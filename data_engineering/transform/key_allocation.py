@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for allocating the surrogate keys of the PRTR_transfers
+database. The keys are built from integer codes (pandas.factorize) instead of grouping or
+merging on the string columns of the denormalized fact table.
+'''
+
+# Importing libraries
+import numpy as np
+import pandas as pd
+
+
+def factorizing_keys(df, keys):
+    '''
+    Function to get integer codes for the unique combinations of the key columns.
+    The codes follow the sorted order of the keys (like groupby().ngroup()) and start at 1,
+    while rows with a missing key get 0
+    '''
+
+    codes = np.zeros(df.shape[0], dtype='int64')
+    missing = np.zeros(df.shape[0], dtype=bool)
+    for key in keys:
+        key_codes, uniques = pd.factorize(df[key], sort=True)
+        missing |= (key_codes == -1)
+        # Combining the codes keeps the lexicographic order of the keys
+        codes, _ = pd.factorize(codes * len(uniques) + key_codes, sort=True)
+
+    ids = np.zeros(df.shape[0], dtype='int64')
+    if (~missing).any():
+        ids[~missing] = pd.factorize(codes[~missing], sort=True)[0] + 1
+
+    return ids
+
+
+def sorting_rows(df, cols):
+    '''
+    Function to get the positions of the rows sorted by the columns (missing values first),
+    which do not depend on the order of the rows in df
+    '''
+
+    # numpy.lexsort sorts by the last array first
+    codes = [pd.factorize(df[col], sort=True)[0] for col in reversed(cols)]
+
+    return np.lexsort(codes)
+
+
+def mapping_dimension(df_fact, df_dimension, keys):
+    '''
+    Function to bring the columns of a dimension into the fact table through the
+    position of each key in the dimension. The first dimension record is used
+    when a key is repeated
+    '''
+
+    df_dimension = df_dimension.drop_duplicates(keep='first', subset=keys)
+    df_dimension = df_dimension.reset_index(drop=True)
+    # A key not in a level of a MultiIndex gets the code of the missing values, so the
+    # complete keys are only searched among the dimension records with a complete key
+    complete = np.flatnonzero(df_dimension[keys].notnull().all(axis=1).to_numpy())
+    dimension_index = pd.MultiIndex.from_frame(selecting_rows(df_dimension, keys, complete))
+
+    # Only the unique keys of the fact table are searched in the dimension
+    codes = factorizing_keys(df_fact, keys)
+    uniques, first = np.unique(codes, return_index=True)
+    first = first[uniques > 0]
+    lookup = np.full(codes.max(initial=0) + 1, -1, dtype='int64')
+    found = dimension_index.get_indexer(
+        pd.MultiIndex.from_frame(selecting_rows(df_fact, keys, first))
+        )
+    # Position -1 (key not found) takes the -1 appended to the positions
+    lookup[codes[first]] = np.append(complete, -1)[found]
+    positions = lookup[codes]
+    missing = (codes == 0)
+    if missing.any():
+        # Rows having a missing key are merged (pandas.merge matches missing values)
+        df_positions = selecting_rows(df_dimension, keys, slice(None))\
+            .assign(position=np.arange(df_dimension.shape[0]))
+        positions[missing] = selecting_rows(df_fact, keys, missing)\
+            .merge(df_positions, on=keys, how='left')['position']\
+            .fillna(-1).to_numpy(dtype='int64')
+
+    for col in df_dimension.columns:
+        if col in keys:
+            continue
+        # Position -1 (key not found) is not in the index, so it becomes a missing value
+        df_fact[col] = df_dimension[col].reindex(positions).to_numpy()
+
+    return df_fact
+
+
+def selecting_rows(df, cols, rows):
+    '''
+    Function to select rows (positions or boolean mask) and columns column by column,
+    which avoids copying the whole (wide) fact table
+    '''
+
+    df_rows = pd.DataFrame({col: df[col].iloc[rows].reset_index(drop=True) for col in cols},
+                            columns=cols)
+    # Categorical columns go back to the dtype of their values
+    for col in df_rows.select_dtypes(include='category').columns:
+        df_rows[col] = df_rows[col].astype(df_rows[col].cat.categories.dtype)
+
+    return df_rows
+
+
+def first_records(df, key, cols):
+    '''
+    Function to build a table from the first record of each key value
+    '''
+
+    return selecting_rows(df, cols, (~df[key].duplicated(keep='first')).to_numpy())
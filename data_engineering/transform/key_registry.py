@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for keeping the surrogate keys of the PRTR_transfers
+database stable across pipeline runs. A registry per surrogate key maps each natural key
+to its ID, so only the natural keys not seen in previous runs get new IDs. The registries
+of a run are kept apart (pending) until the tables are loaded, so a failed load does not
+keep the IDs it allocated.
+'''
+
+# Importing libraries
+from data_engineering.transform.key_allocation import factorizing_keys, selecting_rows
+from data_engineering.transform.storage import saving_table, reading_table, table_path
+
+import yaml
+import os
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+
+with open(f'{dir_path}/config.yaml', mode='r') as f:
+    registry_path = f"{dir_path}/{yaml.load(f, Loader=yaml.FullLoader)['key_registry']['path']}"
+
+
+def calling_registry(id_name, keys, path=registry_path):
+    '''
+    Function to call the registry of a surrogate key (empty if it does not exist yet)
+    '''
+
+    # The registries are always kept as Parquet files so the key dtypes survive between runs
+    if os.path.exists(table_path(f'{path}/{id_name}', 'parquet')):
+        return reading_table(f'{path}/{id_name}', file_format='parquet')
+    else:
+        return pd.DataFrame(columns=keys + [id_name, 'registered_at'])
+
+
+def registering_keys(df, keys, id_name, path=registry_path):
+    '''
+    Function to get the surrogate IDs for the natural keys in df. IDs already in the
+    registry are reused, and new natural keys get new IDs following their sorted order.
+    Rows with a missing key get 0
+    '''
+
+    codes = factorizing_keys(df, keys)
+    uniques, first = np.unique(codes, return_index=True)
+    first = first[uniques > 0]
+    uniques = uniques[uniques > 0]
+
+    # Natural keys in the same representation as the registry
+    df_keys = selecting_rows(df, keys, first)
+    for key in keys:
+        if df_keys[key].dtype == object:
+            df_keys[key] = df_keys[key].where(pd.isnull(df_keys[key]), df_keys[key].astype(str))
+
+    # Looking for the natural keys in the registry
+    registry = calling_registry(id_name, keys, path=path)
+    ids = np.zeros(uniques.shape[0], dtype='int64')
+    if registry.empty:
+        positions = np.full(uniques.shape[0], -1, dtype='int64')
+        next_id = 1
+    else:
+        registry_index = pd.MultiIndex.from_frame(registry[keys])
+        positions = registry_index.get_indexer(pd.MultiIndex.from_frame(df_keys))
+        ids[positions >= 0] = registry[id_name].to_numpy()[positions[positions >= 0]]
+        next_id = int(registry[id_name].max()) + 1
+
+    # Registering the new natural keys
+    new = (positions == -1)
+    if new.any():
+        ids[new] = np.arange(next_id, next_id + new.sum())
+        df_new = df_keys[new].reset_index(drop=True)
+        df_new[id_name] = ids[new]
+        df_new['registered_at'] = datetime.now()
+        if registry.empty:
+            registry = df_new
+        else:
+            registry = pd.concat([registry, df_new], ignore_index=True, axis=0)
+
+    # The registry of the run waits for the load (it is written even without new keys,
+    # so the load always has the registries of the tables it loads)
+    os.makedirs(f'{path}/pending', exist_ok=True)
+    saving_table(registry, f'{path}/pending/{id_name}', file_format='parquet')
+
+    lookup = np.zeros(codes.max(initial=0) + 1, dtype='int64')
+    lookup[uniques] = ids
+
+    return lookup[codes]
+
+
+def committing_registries(path=registry_path):
+    '''
+    Function to keep the registries of the run once its tables are loaded. The
+    registry files are replaced at once, so a reader gets the old or the new one
+    '''
+
+    if not os.path.isdir(f'{path}/pending'):
+        return
+    for filename in sorted(os.listdir(f'{path}/pending')):
+        os.replace(f'{path}/pending/{filename}', f'{path}/{filename}')
+    os.rmdir(f'{path}/pending')
@@ -7,37 +7,147 @@ from data_engineering.transform.npri_transformer import transforming_npri
 from data_engineering.transform.tri_transformer import transforming_tri
 from data_engineering.transform.chemical_standardizing import normalizing_chemicals
 from data_engineering.transform.industry_sector_standardizing import normalizing_sectors
-from data_engineering.transform.database_normalization import database_normalization
+from data_engineering.transform.database_normalization import database_normalization, normalizing_tables
+from data_engineering.transform.storage import calling_file_format, setting_file_format
+from data_engineering.monitoring import monitoring, monitoring_settings, enabling_monitoring, stage_reports, adding_stages
+from data_engineering.profiling import adding_profile_arguments, profiling_main, profiling_settings, enabling_profiling,\
+    profile_reports, adding_profiles
+from data_engineering.progress import progress_settings, enabling_progress, disabling_progress
+from data_engineering.extract.common import unresolved_items, adding_unresolved, reporting_unresolved
 
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+import traceback
+import os
+import argparse
 import logging
 logging.basicConfig(level=logging.INFO)
 
-def tramsform_pipeline():
+# Transformers of the PRTR systems. Each one reads the raw files of its system and
+# writes its own output (npi, npri and tri), so they can run at the same time
+transformers = {'npi_transformer': transforming_npi,
+                'npri_transformer': transforming_npri,
+                'tri_transformer': transforming_tri}
+
+
+def running_transformer(stage, settings):
+    '''
+    Function run by the process of a transformer. The stage is measured, profiled and
+    followed as in the main process, and its measures and profiles are returned
+    '''
+
+    setting_file_format(settings['file_format'])
+    if settings['monitoring'] is not None:
+        enabling_monitoring(**settings['monitoring'])
+    if settings['profiling'] is not None:
+        enabling_profiling(**settings['profiling'])
+    if settings['progress'] is not None:
+        enabling_progress(**settings['progress'])
+
+    error = None
+    try:
+        with monitoring(stage):
+            transformers[stage]()
+    except Exception:
+        error = traceback.format_exc()
+    finally:
+        disabling_progress()
+
+    return {'stages': stage_reports() if settings['monitoring'] is not None else [],
+            'profiles': profile_reports() if settings['profiling'] is not None else [],
+            'unresolved': unresolved_items(),
+            'error': error}
+
+
+def transforming_systems(logger):
     '''
-    Function for creating the transform pipeline for the PRTR systems
+    Function to run the transformers of the PRTR systems in parallel processes. The
+    function returns when all of them finish (the join point of the standardizing steps)
+    '''
+
+    logger.info(f' Running {", ".join(transformers.keys())} in parallel')
+    # spawn starts the processes without the threads and locks of this process (e.g., progress)
+    with ProcessPoolExecutor(max_workers=len(transformers), mp_context=mp.get_context('spawn')) as executor:
+        futures = {stage: executor.submit(running_transformer, stage,
+                                          {'file_format': calling_file_format(),
+                                           'monitoring': monitoring_settings(),
+                                           'profiling': profiling_settings(),
+                                           'progress': progress_settings(suffix=stage)})
+                   for stage in transformers.keys()}
+        results = {stage: future.result() for stage, future in futures.items()}
+
+    errors = []
+    for stage, result in results.items():
+        adding_stages(result['stages'])
+        adding_profiles(result['profiles'])
+        adding_unresolved(result['unresolved'])
+        if result['error'] is not None:
+            errors.append(stage)
+            logger.error(f' {stage} failed:\n{result["error"]}')
+    if errors:
+        raise RuntimeError(f'Error: {", ".join(errors)} failed (see the log)')
+
+
+def tramsform_pipeline(streaming=False, save_files=True, parallel=True, systems=True):
+    '''
+    Function for creating the transform pipeline for the PRTR systems.
+    With streaming, the normalized tables are not built here but returned as a
+    generator of (name, data frame) to be consumed by the load pipeline. With
+    parallel, the transformers of the PRTR systems run in parallel processes
+    (if there is more than one CPU). Without systems, the transformers of the
+    PRTR systems are not run (e.g., they ran with the scrapers)
     '''
 
     logger = logging.getLogger(' Data engineering --> Transform')
 
-    logger.info(' Running NPI transformer')
-    transforming_npi()
-    
-    logger.info(' Running NPRI transformer')
-    transforming_npri()
+    # With a single CPU, the processes would only add their start-up time
+    if systems and parallel and ((os.cpu_count() or 1) > 1):
+        transforming_systems(logger)
+    elif systems:
+        logger.info(' Running NPI transformer')
+        with monitoring('npi_transformer'):
+            transforming_npi()
+
+        logger.info(' Running NPRI transformer')
+        with monitoring('npri_transformer'):
+            transforming_npri()
 
-    logger.info(' Running TRI transformer')
-    transforming_tri()
+        logger.info(' Running TRI transformer')
+        with monitoring('tri_transformer'):
+            transforming_tri()
 
     logger.info(' Running chemical standardizing')
-    normalizing_chemicals()
+    with monitoring('chemical_standardizing'):
+        normalizing_chemicals()
 
     logger.info(' Running industry sector standardizing')
-    normalizing_sectors()
+    with monitoring('sector_standardizing'):
+        normalizing_sectors()
+
+    if streaming:
+        logger.info(' Streaming database normalization')
+        return normalizing_tables(save_files=save_files)
 
     logger.info(' Running database normalization')
-    database_normalization()
+    with monitoring('database_normalization'):
+        database_normalization()
 
 
 if __name__ == '__main__':
 
-    tramsform_pipeline()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--parallel_transform',
+                        help='Would you like to run the transformers of the PRTR systems in parallel processes',
+                        choices=['True', 'False'],
+                        type=str,
+                        default='True')
+    adding_profile_arguments(parser, stages=['transform', 'npi_transformer', 'npri_transformer', 'tri_transformer',
+                                             'chemical_standardizing', 'sector_standardizing',
+                                             'database_normalization'])
+    args = parser.parse_args()
+
+    try:
+        with profiling_main(args, 'transform'):
+            tramsform_pipeline(parallel=(args.parallel_transform == 'True'))
+    finally:
+        reporting_unresolved()
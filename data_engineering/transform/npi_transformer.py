@@ -3,7 +3,11 @@
 
 # Importing libraries
 from data_engineering.transform.common import config, dq_score
+from data_engineering.transform.storage import saving_table
+from data_engineering.monitoring import counting
+from data_engineering.profiling import adding_profile_arguments, profiling_main
 
+import argparse
 import os
 import pandas as pd
 
@@ -45,6 +49,8 @@ def transforming_npi():
                         skiprows=[0],
                         usecols=columns_for_using['transfers'].keys(),
                         names=columns_for_using['transfers'].values())
+    counting('rows_in', df_npi.shape[0])
+    counting('bytes_in', os.path.getsize(extracted_npi_path))
     
     # Excluding some substances
     id_for_excluding = [68, 83, 84]
@@ -66,6 +72,8 @@ def transforming_npi():
                                     skiprows=[0],
                                     usecols=columns_for_using['substances'].keys(),
                                     names=columns_for_using['substances'].values())
+    counting('rows_in', df_npi_substances.shape[0])
+    counting('bytes_in', os.path.getsize(extracted_npi_path))
     
     # Merging files
     df_npi = pd.merge(df_npi, df_npi_substances, how='inner', on='national_substance_id')
@@ -78,10 +86,14 @@ def transforming_npi():
     decimals = pd.Series([2, 0], index=['transfer_amount_kg', 'reliability_score'])
     df_npi[['transfer_amount_kg', 'reliability_score']] =\
         df_npi[['transfer_amount_kg', 'reliability_score']].round(decimals)
-    df_npi.to_csv(f'{dir_path}/output/npi.csv',
-                index=False, sep=',')
+    saving_table(df_npi, f'{dir_path}/output/npi')
 
 
 if __name__ == '__main__':
-    
-    transforming_npi()
\ No newline at end of file
+
+    parser = argparse.ArgumentParser()
+    adding_profile_arguments(parser, stages=['npi_transformer'])
+    args = parser.parse_args()
+
+    with profiling_main(args, 'npi_transformer'):
+        transforming_npi()
\ No newline at end of file
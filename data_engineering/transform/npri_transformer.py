@@ -4,7 +4,11 @@
 # Importing libraries
 from data_engineering.transform.common import config, dq_score
 from data_engineering.transform.naics_normalization import normalizing_naics
+from data_engineering.monitoring import counting
+from data_engineering.transform.storage import saving_table
+from data_engineering.profiling import adding_profile_arguments, profiling_main
 
+import argparse
 import os
 import pandas as pd
 
@@ -31,6 +35,8 @@ def opening_file(filename):
                      error_bad_lines=False,
                      usecols=columns_for_using[filename].keys(),
                      names=columns_for_using[filename].values())
+    counting('rows_in', df.shape[0])
+    counting('bytes_in', os.path.getsize(extracted_npi_path))
     
     return df
     
@@ -147,10 +153,14 @@ def transforming_npri():
     decimals = pd.Series([2, 0], index=['transfer_amount_kg', 'reliability_score'])
     df_npri[['transfer_amount_kg', 'reliability_score']] =\
         df_npri[['transfer_amount_kg', 'reliability_score']].round(decimals)
-    df_npri.to_csv(f'{dir_path}/output/npri.csv',
-                   index=False, sep=',')
+    saving_table(df_npri, f'{dir_path}/output/npri')
 
 
 if __name__ == '__main__':
-    
-    transforming_npri()
\ No newline at end of file
+
+    parser = argparse.ArgumentParser()
+    adding_profile_arguments(parser, stages=['npri_transformer'])
+    args = parser.parse_args()
+
+    with profiling_main(args, 'npri_transformer'):
+        transforming_npri()
\ No newline at end of file
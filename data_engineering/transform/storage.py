@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+This is a Python script written for storing the tables handed over between
+the transform and load stages. Parquet (default) and Feather keep the schema
+and dtypes of each column and allow reading only some columns, while CSV is kept as
+an export option.
+'''
+
+# Importing libraries
+from data_engineering.monitoring import counting
+
+import yaml
+import os
+import pandas as pd
+
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+
+with open(f'{dir_path}/config.yaml', mode='r') as f:
+    _storage = yaml.load(f, Loader=yaml.FullLoader)['storage']
+
+extensions = {'parquet': 'parquet',
+              'feather': 'feather',
+              'csv': 'csv'}
+
+
+def setting_file_format(file_format):
+    '''
+    Function to change the default format used for the inter-stage files
+    '''
+
+    if file_format not in extensions.keys():
+        raise ValueError(f'Error: file format {file_format} is not supported')
+    _storage['format'] = file_format
+
+
+def calling_file_format():
+    '''
+    Function to get the default format used for the inter-stage files
+    '''
+
+    return _storage['format']
+
+
+def file_extension(file_format=None):
+    '''
+    Function to get the extension of the files for a format (the default one if not given)
+    '''
+
+    return extensions[file_format or _storage['format']]
+
+
+def table_path(path, file_format=None):
+    '''
+    Function to get the full path (with extension) for a table
+    '''
+
+    file_format = file_format or _storage['format']
+
+    return f'{path}.{extensions[file_format]}'
+
+
+def saving_table(df, path, file_format=None):
+    '''
+    Function to save a table. The path is given without extension
+    '''
+
+    file_format = file_format or _storage['format']
+    compression = _storage['compression'][file_format]
+    filepath = table_path(path, file_format)
+
+    # Columns mixing numbers and strings (e.g., facility IDs across PRTR systems)
+    # are stored as strings, as they would be read back from a CSV file
+    if file_format != 'csv':
+        df = df.copy(deep=False)
+        for col in df.select_dtypes(include='object').columns:
+            if pd.api.types.infer_dtype(df[col], skipna=True).startswith('mixed'):
+                df[col] = df[col].where(pd.isnull(df[col]), df[col].astype(str))
+
+    if file_format == 'parquet':
+        df.to_parquet(filepath, index=False,
+                      compression=compression)
+    elif file_format == 'feather':
+        df.reset_index(drop=True).to_feather(filepath,
+                                             compression=compression)
+    else:
+        df.to_csv(filepath, index=False, sep=',')
+    counting('rows_out', df.shape[0])
+    counting('bytes_out', os.path.getsize(filepath))
+
+
+def reading_table(path, columns=None, dtype=None, file_format=None):
+    '''
+    Function to read a table (or only some of its columns). The path is given without extension
+    '''
+
+    file_format = file_format or _storage['format']
+    filepath = table_path(path, file_format)
+    counting('bytes_in', os.path.getsize(filepath))
+
+    if file_format == 'csv':
+        df = pd.read_csv(filepath, usecols=columns, dtype=dtype)
+        counting('rows_in', df.shape[0])
+        return df
+
+    if file_format == 'parquet':
+        df = pd.read_parquet(filepath, columns=columns)
+    else:
+        df = pd.read_feather(filepath, columns=columns)
+
+    # The columnar formats keep their own dtypes, so only the requested ones are enforced
+    for col, col_type in (dtype or {}).items():
+        if col not in df.columns:
+            continue
+        if col_type in [object, str, 'object', 'str']:
+            df[col] = df[col].where(pd.isnull(df[col]), df[col].astype(str))
+            df[col] = df[col].astype(object)
+        else:
+            df[col] = df[col].astype(col_type)
+    counting('rows_in', df.shape[0])
+
+    return df
+
+
+def removing_table(path, file_format=None):
+    '''
+    Function to remove a table. The path is given without extension
+    '''
+
+    os.remove(table_path(path, file_format))
@@ -5,7 +5,12 @@
 from data_engineering.transform.common import config, dq_score
 from data_engineering.transform.naics_normalization import normalizing_naics
 from data_engineering.extract.srs_scraper import get_cas_by_alternative_id
+from data_engineering.monitoring import counting
+from data_engineering.progress import progressing
+from data_engineering.transform.storage import saving_table, reading_table, removing_table
+from data_engineering.profiling import adding_profile_arguments, profiling_main
 
+import argparse
 import os
 import pandas as pd
 import numpy as np
@@ -46,6 +51,8 @@ def opening_file(key, year):
                      error_bad_lines=False,
                      usecols=columns_for_using[key].keys(),
                      names=columns_for_using[key].values())
+    counting('rows_in', df.shape[0])
+    counting('bytes_in', os.path.getsize(extracted_npi_path))
     
     # Dropping records for mixtures and trade secrets
     df = df[~(df.national_substance_id.isin(['TRD SECRT', 'MIXTURE']))]
@@ -130,120 +137,122 @@ def organizing_landfill_surface_impoundment(group, df):
     df_f_chem.reset_index(drop=True, inplace=True)
     group['national_transfer_class_name'] = df_f_chem['national_transfer_class_name'].iloc[0]
 
-    group.to_csv(f'{dir_path}/output/tri.csv',
-                index=False, sep=',',
-                mode='a', header=False)
+    return group
 
 
-def transforming_tri():
+def transforming_tri_year(year, df_cas_searched=None):
     '''
-    Function to transform TRI raw data into the structure for the
-    generic database
+    Function to transform the TRI files of a year. df_cas_searched has the CAS numbers
+    searched for the years before, and it is returned with the ones of this year
     '''
 
-    # Looking for TRI years extracted from internet
-    regex = re.compile(r'US_3a_([0-9]{4}).csv')
-    years = [int(re.search(regex, file).group(1)) for file in os.listdir(f'{dir_path}/../extract/output/') if file.startswith('US_3a')]
-    years.sort()
+    if df_cas_searched is None:
+        df_cas_searched = pd.DataFrame(columns=['national_substance_id',
+                                                'cas_number'])
 
     # Concatenating files
-    df_cas_searched = pd.DataFrame(columns=['national_substance_id',
-                                            'cas_number'])
-    for year in years:
-        df_tri = pd.DataFrame()
-        for key in ['3a', '3b', '3c']:
-            if (key == '3a') or ((key == '3b') and (int(year) <= 2010)) or ((key == '3c') and (int(year) >= 2011)):
-                df = opening_file(key, year)
-                df = organizing_columns(df, key, year)
-                df_tri = pd.concat([df_tri, df], ignore_index=True, axis=0)
-
-        # Dropping 0 for transfer_amount_kg
-        def checking_basis_estimate(bs):
-            try:
-                if bs:
-                    return bs.strip()
-                else:
-                    return bs
-            except AttributeError:
-                return None
-        to_keep = ['O', 'C', 'E', 'E1', 'E2', 'M', 'M1', 'M2']
-        df_tri['transfer_amount_kg'] = pd.to_numeric(df_tri['transfer_amount_kg'],
-                                                    errors='coerce',
-                                                    downcast='float')
-        df_tri = df_tri.where(pd.notnull(df_tri), None)
-        df_tri['reliability_score'] = df_tri['reliability_score'].apply(lambda x: checking_basis_estimate(x))
-        df_tri = df_tri[(df_tri['transfer_amount_kg'] != 0) | (df_tri['reliability_score'].isin(to_keep))]
-        df_tri = df_tri[pd.notnull(df_tri['transfer_amount_kg'])]
-
-        # Converting to kg
-        func = lambda quanity, units: quanity*conversion_factor[units.capitalize()]
-        df_tri['transfer_amount_kg'] = df_tri.apply(lambda row: \
-            func(row['transfer_amount_kg'],
-                row['Units']), axis=1)
-        df_tri.drop(columns=['Units'], inplace=True)
-            
-        # Calling values for reliability score
-        dq_matrix = dq_score('TRI')
-
-        # Giving the reliability scores for the off-site transfers reported by facilities
-        df_tri['reliability_score'] = df_tri['reliability_score'].where(df_tri['reliability_score'].isin(dq_matrix.keys()), None)
-        df_tri['reliability_score'] = df_tri['reliability_score'].apply(lambda s: dq_matrix[s] if s else 5)
-
-        # Aggregation of flow and reliability
-        wm = lambda x: weight_mean(x, df_tri.loc[x.index, 'transfer_amount_kg'])
-        grouping_vars = ['national_substance_name', 'reporting_year',
-                        'national_sector_code', 'national_transfer_class_name',
-                        'national_substance_id', 'national_facility_id']
-        df_tri = df_tri.groupby(grouping_vars).agg({'transfer_amount_kg':'sum',
-                                                    'reliability_score': wm})
-        df_tri = df_tri.reset_index()
+    df_tri = pd.DataFrame()
+    for key in ['3a', '3b', '3c']:
+        if (key == '3a') or ((key == '3b') and (int(year) <= 2010)) or ((key == '3c') and (int(year) >= 2011)):
+            df = opening_file(key, year)
+            df = organizing_columns(df, key, year)
+            df_tri = pd.concat([df_tri, df], ignore_index=True, axis=0)
+
+    # Dropping 0 for transfer_amount_kg
+    def checking_basis_estimate(bs):
+        try:
+            if bs:
+                return bs.strip()
+            else:
+                return bs
+        except AttributeError:
+            return None
+    to_keep = ['O', 'C', 'E', 'E1', 'E2', 'M', 'M1', 'M2']
+    df_tri['transfer_amount_kg'] = pd.to_numeric(df_tri['transfer_amount_kg'],
+                                                errors='coerce',
+                                                downcast='float')
+    df_tri = df_tri.where(pd.notnull(df_tri), None)
+    df_tri['reliability_score'] = df_tri['reliability_score'].apply(lambda x: checking_basis_estimate(x))
+    df_tri = df_tri[(df_tri['transfer_amount_kg'] != 0) | (df_tri['reliability_score'].isin(to_keep))]
+    df_tri = df_tri[pd.notnull(df_tri['transfer_amount_kg'])]
+
+    # Converting to kg
+    func = lambda quanity, units: quanity*conversion_factor[units.capitalize()]
+    df_tri['transfer_amount_kg'] = df_tri.apply(lambda row: \
+        func(row['transfer_amount_kg'],
+            row['Units']), axis=1)
+    df_tri.drop(columns=['Units'], inplace=True)
         
-        # Adding country column
-        df_tri['country'] = 'USA'
-
-        # Organizing list of CAS numbers to search for
-        df_tri['national_substance_id'] = df_tri['national_substance_id'].str.lstrip('0')
-        tri_ids = df_tri[['national_substance_id', 'national_substance_name']]\
-            .drop_duplicates(subset=['national_substance_id'], keep='first')\
-            .reset_index(drop=True)
-        cas_list = df_cas_searched['national_substance_id'].tolist()
-        tri_ids = tri_ids.loc[~tri_ids['national_substance_id'].isin(cas_list)]
-        del cas_list
-        if not tri_ids.empty:
-            tri_ids['cas_number'] = tri_ids.apply(lambda x:
-                                        get_cas_by_alternative_id(altId=x['national_substance_id'],
-                                                                substanceName=x['national_substance_name']),
-                                            axis=1)
-            tri_ids.drop(columns=['national_substance_name'], inplace=True)
-            df_cas_searched = df_cas_searched.set_index('national_substance_id')\
-                    .combine_first(tri_ids.set_index('national_substance_id')).reset_index()
-
-        # Adding CAS number column
-        df_tri = pd.merge(df_tri, df_cas_searched, on='national_substance_id', how='left')
-
-        # Crosswalking NAICS codes
-        df_tri = normalizing_naics(df_tri)
-
-        # Saving the transformed data
-        decimals = pd.Series([2, 0], index=['transfer_amount_kg', 'reliability_score'])
-        df_tri[['transfer_amount_kg', 'reliability_score']] =\
-            df_tri[['transfer_amount_kg', 'reliability_score']].round(decimals)
-        df_tri.to_csv(f'{dir_path}/output/tri_{year}.csv',
-                    index=False, sep=',')
-
-        del df_tri, tri_ids
+    # Calling values for reliability score
+    dq_matrix = dq_score('TRI')
+
+    # Giving the reliability scores for the off-site transfers reported by facilities
+    df_tri['reliability_score'] = df_tri['reliability_score'].where(df_tri['reliability_score'].isin(dq_matrix.keys()), None)
+    df_tri['reliability_score'] = df_tri['reliability_score'].apply(lambda s: dq_matrix[s] if s else 5)
+
+    # Aggregation of flow and reliability
+    wm = lambda x: weight_mean(x, df_tri.loc[x.index, 'transfer_amount_kg'])
+    grouping_vars = ['national_substance_name', 'reporting_year',
+                    'national_sector_code', 'national_transfer_class_name',
+                    'national_substance_id', 'national_facility_id']
+    df_tri = df_tri.groupby(grouping_vars).agg({'transfer_amount_kg':'sum',
+                                                'reliability_score': wm})
+    df_tri = df_tri.reset_index()
+    
+    # Adding country column
+    df_tri['country'] = 'USA'
+
+    # Organizing list of CAS numbers to search for
+    df_tri['national_substance_id'] = df_tri['national_substance_id'].str.lstrip('0')
+    tri_ids = df_tri[['national_substance_id', 'national_substance_name']]\
+        .drop_duplicates(subset=['national_substance_id'], keep='first')\
+        .reset_index(drop=True)
+    cas_list = df_cas_searched['national_substance_id'].tolist()
+    tri_ids = tri_ids.loc[~tri_ids['national_substance_id'].isin(cas_list)]
+    del cas_list
+    if not tri_ids.empty:
+        tri_ids['cas_number'] = [get_cas_by_alternative_id(altId=altId, substanceName=substanceName)
+                                 for altId, substanceName in progressing(
+                                    zip(tri_ids['national_substance_id'], tri_ids['national_substance_name']),
+                                    f'TRI {year} CAS numbers (SRS)',
+                                    total=tri_ids.shape[0])]
+        tri_ids.drop(columns=['national_substance_name'], inplace=True)
+        df_cas_searched = df_cas_searched.set_index('national_substance_id')\
+                .combine_first(tri_ids.set_index('national_substance_id')).reset_index()
+
+    # Adding CAS number column
+    df_tri = pd.merge(df_tri, df_cas_searched, on='national_substance_id', how='left')
+
+    # Crosswalking NAICS codes
+    df_tri = normalizing_naics(df_tri)
+
+    # Saving the transformed data
+    decimals = pd.Series([2, 0], index=['transfer_amount_kg', 'reliability_score'])
+    df_tri[['transfer_amount_kg', 'reliability_score']] =\
+        df_tri[['transfer_amount_kg', 'reliability_score']].round(decimals)
+    saving_table(df_tri, f'{dir_path}/output/tri_{year}')
+
+    del df_tri, tri_ids
+
+    return df_cas_searched
 
 
+def combining_tri_years(years):
+    '''
+    Function to combine the TRI years transformed and impute the transfer class
+    of the off-site landfills/disposal surface impoundment
+    '''
+
     # Cross-year search for Off-site - landfills/disposal surface impoundment
     df_tri = pd.DataFrame()
     for year in years:
-        df_year = pd.read_csv(f'{dir_path}/output/tri_{year}.csv')
+        df_year = reading_table(f'{dir_path}/output/tri_{year}')
         df_tri = pd.concat([df_tri, df_year],
                             ignore_index=True,
                             sort=False,
                             axis=0)
         del df_year
-        os.remove(f'{dir_path}/output/tri_{year}.csv')
+        removing_table(f'{dir_path}/output/tri_{year}')
     
     decimals = pd.Series([2, 0], index=['transfer_amount_kg', 'reliability_score'])
     df_tri[['transfer_amount_kg', 'reliability_score']] =\
@@ -251,11 +260,7 @@ def transforming_tri():
     df_landfill_surface = df_tri[df_tri.national_transfer_class_name == 'Off-site - landfills/disposal surface impoundment']
     df_landfill_surface.reset_index(drop=True, inplace=True)
     df_tri = df_tri[df_tri.national_transfer_class_name != 'Off-site - landfills/disposal surface impoundment']
-
-    # Saving the tri records
-    df_tri.to_csv(f'{dir_path}/output/tri.csv',
-                    index=False, sep=',')
-
+    df_tri_records = df_tri.copy()
 
     df_tri = df_tri[df_tri.national_transfer_class_name.isin(['Off-site - surface impoundment',
                                                             'Off-site - RCRA subtitle c surface impoundment',
@@ -275,11 +280,39 @@ def transforming_tri():
     df_tri = df_tri.loc[df_tri.groupby(grouping).reporting_year.idxmin()].reset_index(drop=True)
     df_tri['times'] = 1
     grouping.pop(0)
-    df_landfill_surface\
-        .groupby(grouping, as_index=False)\
-            .apply(lambda g: organizing_landfill_surface_impoundment(g, df_tri.copy()))
+    groups = df_landfill_surface.groupby(grouping)
+    df_landfill_surface = [organizing_landfill_surface_impoundment(group, df_tri.copy())
+                           for _, group in progressing(groups, 'TRI landfill imputation', total=groups.ngroups)]
+
+    # Saving the tri records
+    df_tri_records = pd.concat([df_tri_records] + df_landfill_surface,
+                               ignore_index=True, sort=False, axis=0)
+    saving_table(df_tri_records, f'{dir_path}/output/tri')
+
+
+def transforming_tri():
+    '''
+    Function to transform TRI raw data into the structure for the
+    generic database
+    '''
+
+    # Looking for TRI years extracted from internet
+    regex = re.compile(r'US_3a_([0-9]{4}).csv')
+    years = [int(re.search(regex, file).group(1)) for file in os.listdir(f'{dir_path}/../extract/output/') if file.startswith('US_3a')]
+    years.sort()
+
+    df_cas_searched = None
+    for year in years:
+        df_cas_searched = transforming_tri_year(year, df_cas_searched)
+
+    combining_tri_years(years)
 
 
 if __name__ == '__main__':
-    
-    transforming_tri()
\ No newline at end of file
+
+    parser = argparse.ArgumentParser()
+    adding_profile_arguments(parser, stages=['tri_transformer'])
+    args = parser.parse_args()
+
+    with profiling_main(args, 'tri_transformer'):
+        transforming_tri()
\ No newline at end of file
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Importing libraries
+from data_engineering.extract import common, srs_scraper
+from data_engineering.extract.common import requesting, unresolving, reporting_unresolved, SourceUnavailable
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import time
+import threading
+import pytest
+import requests
+
+
+class Handler(BaseHTTPRequestHandler):
+    '''
+    Handler answering /ok with 200 and the other paths with 503
+    '''
+
+    def do_GET(self):
+        self.server.hits += 1
+        self.send_response(200 if self.path == '/ok' else 503)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    # Each test starts without breakers, deadlines or unresolved items
+    monkeypatch.setattr(common, '_settings', {})
+    monkeypatch.setattr(common, '_hosts', {})
+    monkeypatch.setattr(common, '_sources', {})
+    monkeypatch.setattr(common, '_unresolved', [])
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.hits = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def setting_source(server, **settings):
+    '''
+    Function to give the local server the settings of a source
+    '''
+
+    host = f'127.0.0.1:{server.server_port}'
+    common._settings[host] = ('Local', {'connect_timeout': 1, 'read_timeout': 1, 'deadline': None,
+                                        'failures': 2, 'cooldown': 300, **settings})
+
+    return f'http://{host}'
+
+
+def test_the_circuit_opens_after_consecutive_failures(server):
+    url = setting_source(server)
+
+    assert requesting(f'{url}/fail').status_code == 503
+    assert requesting(f'{url}/fail').status_code == 503
+    with pytest.raises(SourceUnavailable):
+        requesting(f'{url}/ok')
+    # The open circuit fails fast, without sending the request
+    assert server.hits == 2
+
+
+def test_a_success_resets_the_failures(server):
+    url = setting_source(server)
+
+    requesting(f'{url}/fail')
+    requesting(f'{url}/ok')
+    requesting(f'{url}/fail')
+
+    assert requesting(f'{url}/ok').status_code == 200
+
+
+def test_a_request_is_tried_again_after_the_cooldown(server):
+    url = setting_source(server, cooldown=0.2)
+
+    requesting(f'{url}/fail')
+    requesting(f'{url}/fail')
+    with pytest.raises(SourceUnavailable):
+        requesting(f'{url}/ok')
+    time.sleep(0.3)
+
+    assert requesting(f'{url}/ok').status_code == 200
+    assert common._hosts[f'127.0.0.1:{server.server_port}'] == {'failures': 0, 'opened_at': None}
+
+
+def test_the_requests_fail_fast_after_the_deadline(server):
+    url = setting_source(server, deadline=0.2)
+
+    assert requesting(f'{url}/ok').status_code == 200
+    time.sleep(0.3)
+    with pytest.raises(SourceUnavailable):
+        requesting(f'{url}/ok')
+    assert server.hits == 1
+
+
+def test_the_unresolved_items_are_reported_by_source_and_reason(server, tmp_path):
+    unresolving('SRS', 'Name of 50-00-0', requests.exceptions.ReadTimeout('http://srs/50-00-0 timed out'))
+    unresolving('SRS', 'Name of 71-43-2', requests.exceptions.ReadTimeout('http://srs/71-43-2 timed out'))
+    unresolving('NLM', 'SMILES of 71-43-2', ValueError('Error: 404'))
+
+    with open(reporting_unresolved(path=str(tmp_path)), 'r') as file:
+        items = json.load(file)
+
+    assert [(item['source'], item['reason']) for item in items] == [('SRS', 'ReadTimeout'),
+                                                                    ('SRS', 'ReadTimeout'),
+                                                                    ('NLM', 'Error: 404')]
+
+
+def test_the_failed_srs_names_are_searched_again(server, monkeypatch):
+    class Response:
+        status_code = 200
+
+        def json(self):
+            return [{'systematicName': 'Formaldehyde'}]
+
+    calls = []
+
+    def requesting(url):
+        calls.append(url)
+        if len(calls) == 1:
+            raise requests.exceptions.ConnectionError('Error: connection refused')
+        return Response()
+
+    monkeypatch.setattr(srs_scraper, 'requesting', requesting)
+    monkeypatch.setattr(srs_scraper, '_generic_names', {})
+
+    assert srs_scraper.get_generic_name_by_cas(casNum='50-00-0') is None
+    assert srs_scraper.get_generic_name_by_cas(casNum='50-00-0') == 'Formaldehyde'
+    # The name found is kept for the rest of the run
+    assert srs_scraper.get_generic_name_by_cas(casNum='50-00-0') == 'Formaldehyde'
+    assert len(calls) == 2
+    assert [item['source'] for item in common.unresolved_items()] == ['SRS']
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Importing libraries
+from data_engineering.load.main import Dic_tables, selecting_partitions
+from data_engineering.load.incremental import incremental_loading
+
+from sqlalchemy import create_engine
+import pandas as pd
+import pytest
+
+db_tables = {filename: Object.__table__ for filename, Object in Dic_tables.items()}
+
+national_substance = pd.DataFrame({'national_substance_prtr_system_id': [1, 2],
+                                   'national_substance_id': ['50-00-0', '50-00-0'],
+                                   'national_substance_name': ['Formaldehyde', 'Formaldehyde'],
+                                   'prtr_system': ['TRI', 'NPRI']})
+national_generic_substance = pd.DataFrame({'national_generic_substance_id': [10, 20],
+                                           'national_substance_prtr_system_id': [1, 2],
+                                           'generic_substance_id': ['50000', '50000']})
+
+
+def transfer_records(ids, years, substances, amounts):
+    return pd.DataFrame({'transfer_record_id': ids,
+                         'reporting_year': years,
+                         'national_generic_substance_id': substances,
+                         'national_facility_and_generic_sector_id': [1] * len(ids),
+                         'national_generic_transfer_class_id': [1] * len(ids),
+                         'transfer_amount_kg': amounts,
+                         'reliability_score': [1] * len(ids)})
+
+
+def reading_records(Engine):
+    return pd.read_sql('SELECT transfer_record_id, reporting_year, national_generic_substance_id, '
+                       'transfer_amount_kg FROM transfer_record ORDER BY transfer_record_id', Engine)
+
+
+@pytest.fixture
+def Engine(tmp_path):
+    Engine = create_engine(f'sqlite:///{tmp_path}/PRTR_transfers.db')
+    for name in ['national_substance', 'national_generic_substance', 'transfer_record']:
+        db_tables[name].create(Engine)
+    incremental_loading(national_substance, db_tables['national_substance'], Engine)
+    incremental_loading(national_generic_substance, db_tables['national_generic_substance'], Engine)
+    # TRI (substance 10) and NPRI (substance 20) in 2019 and 2020
+    incremental_loading(transfer_records([1, 2, 3, 4], [2019, 2020, 2019, 2020], [10, 10, 20, 20],
+                                         [1.0, 2.0, 3.0, 4.0]),
+                        db_tables['transfer_record'], Engine)
+    return Engine
+
+
+def test_upserting_updates_the_existing_keys_and_inserts_the_new_ones(Engine):
+    df = national_substance.assign(national_substance_name=['Methanal', 'Methanal'])
+    df = pd.concat([df, pd.DataFrame({'national_substance_prtr_system_id': [3],
+                                      'national_substance_id': ['71-43-2'],
+                                      'national_substance_name': ['Benzene'],
+                                      'prtr_system': ['NPI']})])
+
+    incremental_loading(df, db_tables['national_substance'], Engine)
+
+    names = pd.read_sql('SELECT national_substance_name FROM national_substance '
+                        'ORDER BY national_substance_prtr_system_id', Engine)
+    assert names.national_substance_name.tolist() == ['Methanal', 'Methanal', 'Benzene']
+
+
+def test_only_the_refreshed_partitions_are_replaced(Engine):
+    # The new TRI 2020 file drops record 2 and brings record 5; the other years and systems are kept
+    df = transfer_records([5, 3], [2020, 2019], [10, 20], [5.0, 30.0])
+    df, partitions = selecting_partitions(df, national_generic_substance, national_substance,
+                                          reporting_years=[2020], prtr_systems=['TRI'])
+
+    assert partitions == [(2020, 'TRI')]
+    incremental_loading(df, db_tables['transfer_record'], Engine, partitions=partitions)
+
+    records = reading_records(Engine)
+    assert records.transfer_record_id.tolist() == [1, 3, 4, 5]
+    assert records.transfer_amount_kg.tolist() == [1.0, 3.0, 4.0, 5.0]
+
+
+def test_a_failed_upsert_keeps_the_deleted_partitions(Engine):
+    # A record without its reporting year fails after the partition is deleted
+    df = transfer_records([5], [None], [10], [5.0])
+
+    with pytest.raises(Exception):
+        incremental_loading(df, db_tables['transfer_record'], Engine, partitions=[(2020, 'TRI')])
+
+    assert reading_records(Engine).transfer_record_id.tolist() == [1, 2, 3, 4]
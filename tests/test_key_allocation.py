@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Importing libraries
+from data_engineering.transform.key_allocation import factorizing_keys, mapping_dimension
+
+import numpy as np
+import pandas as pd
+
+
+def test_factorizing_keys_follows_groupby_ngroup():
+    df = pd.DataFrame({'country': ['US', 'CA', 'US', 'AU', 'CA', 'US'],
+                       'year': [2010, 2011, 2010, 2010, 2010, 2009]})
+
+    expected = df.groupby(['country', 'year']).ngroup().to_numpy() + 1
+
+    np.testing.assert_array_equal(factorizing_keys(df, ['country', 'year']), expected)
+
+
+def test_factorizing_keys_gives_zero_to_missing_keys():
+    df = pd.DataFrame({'country': ['US', None, 'CA', 'US'],
+                       'year': [2010, 2010, np.nan, 2010]})
+
+    np.testing.assert_array_equal(factorizing_keys(df, ['country', 'year']), [1, 0, 0, 1])
+
+
+def test_mapping_dimension_matches_a_left_merge():
+    df_fact = pd.DataFrame({'cas': ['50-00-0', '71-43-2', None, '50-00-0', '7439-92-1'],
+                            'amount': [1.0, 2.0, 3.0, 4.0, 5.0]})
+    df_dimension = pd.DataFrame({'cas': ['71-43-2', '50-00-0', '50-00-0', None],
+                                 'name': ['Benzene', 'Formaldehyde', 'Duplicate', 'Unknown']})
+
+    expected = pd.merge(df_fact, df_dimension.drop_duplicates(subset=['cas']), on='cas', how='left')
+    result = mapping_dimension(df_fact.copy(), df_dimension, ['cas'])
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+
+def test_mapping_dimension_matches_a_left_merge_on_several_keys():
+    df_fact = pd.DataFrame({'system': ['TRI', 'TRI', None, 'NPI', 'NPRI'],
+                            'code': ['A', None, None, 'B', 'Z'],
+                            'amount': [1.0, 2.0, 3.0, 4.0, 5.0]})
+    df_dimension = pd.DataFrame({'system': ['TRI', 'NPI', 'TRI', None, 'NPRI'],
+                                 'code': ['A', 'B', None, None, None],
+                                 'name': ['a', 'b', 'tri', 'unknown', 'npri']})
+
+    expected = pd.merge(df_fact, df_dimension, on=['system', 'code'], how='left')
+    result = mapping_dimension(df_fact.copy(), df_dimension, ['system', 'code'])
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_mapping_dimension_without_complete_dimension_keys():
+    df_fact = pd.DataFrame({'cas': ['50-00-0', None]})
+    df_dimension = pd.DataFrame({'cas': [None], 'name': ['Unknown']})
+
+    result = mapping_dimension(df_fact.copy(), df_dimension, ['cas'])
+
+    assert result['name'].isnull().tolist() == [True, False]
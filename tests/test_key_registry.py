@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Importing libraries
+from data_engineering.transform.key_registry import registering_keys, committing_registries, calling_registry
+from data_engineering.transform.key_allocation import sorting_rows
+
+import os
+import numpy as np
+import pandas as pd
+
+
+def facilities():
+    return pd.DataFrame({'prtr_system': ['TRI', 'NPRI', 'TRI', 'NPI', None, 'NPRI'],
+                         'national_facility_id': ['T2', 'N1', 'T1', 'A1', 'X1', 'N1']})
+
+
+def registering_run(df, path):
+    ids = registering_keys(df, ['prtr_system', 'national_facility_id'], 'facility_id', path=str(path))
+    committing_registries(path=str(path))
+    return pd.Series(ids, index=df['prtr_system'].fillna('') + '/' + df['national_facility_id'])
+
+
+def test_ids_are_unchanged_on_a_second_run(tmp_path):
+    first = registering_run(facilities(), tmp_path)
+    second = registering_run(facilities(), tmp_path)
+
+    pd.testing.assert_series_equal(first, second)
+    # Rows with a missing key get 0 and the others follow the sorted keys
+    assert first.to_dict() == {'NPI/A1': 1, 'NPRI/N1': 2, 'TRI/T1': 3, 'TRI/T2': 4, '/X1': 0}
+
+
+def test_ids_do_not_depend_on_the_row_order(tmp_path):
+    first = registering_run(facilities(), tmp_path)
+    shuffled = registering_run(facilities().sample(frac=1, random_state=5), tmp_path)
+
+    assert first.to_dict() == shuffled.to_dict()
+
+
+def test_new_keys_get_new_ids(tmp_path):
+    first = registering_run(facilities(), tmp_path)
+    df = pd.concat([facilities(), pd.DataFrame({'prtr_system': ['NPI'], 'national_facility_id': ['A0']})])
+    second = registering_run(df, tmp_path)
+
+    assert second['NPI/A0'] == first.max() + 1
+    assert second.drop('NPI/A0').to_dict() == first.to_dict()
+
+
+def test_registries_are_pending_until_committed(tmp_path):
+    keys = ['prtr_system', 'national_facility_id']
+    registering_keys(facilities(), keys, 'facility_id', path=str(tmp_path))
+
+    # A failed load does not commit the IDs of the run
+    assert calling_registry('facility_id', keys, path=str(tmp_path)).empty
+    df = pd.DataFrame({'prtr_system': ['NPI'], 'national_facility_id': ['A0']})
+    np.testing.assert_array_equal(registering_keys(df, keys, 'facility_id', path=str(tmp_path)), [1])
+
+    committing_registries(path=str(tmp_path))
+    assert calling_registry('facility_id', keys, path=str(tmp_path)).shape[0] == 1
+    assert not os.path.exists(f'{tmp_path}/pending')
+
+
+def test_sorting_rows_does_not_depend_on_the_row_order():
+    df = pd.DataFrame({'key': ['b', 'a', 'b', 'a'], 'amount': [2.0, 1.0, 1.0, None]})
+    shuffled = df.sample(frac=1, random_state=3).reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(df.iloc[sorting_rows(df, ['key', 'amount'])].reset_index(drop=True),
+                                  shuffled.iloc[sorting_rows(shuffled, ['key', 'amount'])].reset_index(drop=True))
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Importing libraries
+from data_engineering.load.main import Dic_tables
+from data_engineering.load.parallel import dependency_graph, parallel_loading
+
+import time
+import random
+import threading
+import pytest
+
+db_tables = {filename: Object.__table__ for filename, Object in Dic_tables.items()}
+
+
+def recording_loads(fail=None):
+    '''
+    Function to get a loading function recording when each table starts and ends
+    '''
+
+    lock = threading.Lock()
+    events = {}
+
+    def loading_function(name, df):
+        with lock:
+            events[name] = [time.perf_counter(), None]
+        time.sleep(random.uniform(0.001, 0.01))
+        if name == fail:
+            raise ValueError(f'Error: {name} failed')
+        with lock:
+            events[name][1] = time.perf_counter()
+
+    return loading_function, events
+
+
+def test_dependency_graph_follows_the_foreign_keys():
+    graph = dependency_graph(db_tables)
+
+    assert graph['generic_sector'] == set()
+    assert graph['transfer_record'] == {'national_generic_substance',
+                                        'facility',
+                                        'national_generic_transfer_class'}
+    assert all(parents <= set(db_tables.keys()) for parents in graph.values())
+
+
+@pytest.mark.parametrize('order', ['parents_first', 'children_first', 'shuffled'])
+def test_a_table_is_never_loaded_before_its_parents(order):
+    names = list(db_tables.keys())
+    if order == 'children_first':
+        names = names[::-1]
+    elif order == 'shuffled':
+        random.Random(11).shuffle(names)
+    loading_function, events = recording_loads()
+
+    parallel_loading(db_tables, loading_function, n_workers=4, items=((name, None) for name in names))
+
+    assert set(events.keys()) == set(db_tables.keys())
+    for name, parents in dependency_graph(db_tables).items():
+        for parent in parents:
+            assert events[parent][1] <= events[name][0], f'{name} started before {parent} was loaded'
+
+
+def test_the_children_of_a_failed_table_are_not_loaded():
+    loading_function, events = recording_loads(fail='facility')
+
+    with pytest.raises(ValueError):
+        parallel_loading(db_tables, loading_function, n_workers=4)
+
+    assert 'transfer_record' not in events.keys()